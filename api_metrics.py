@@ -0,0 +1,70 @@
+"""
+In-memory accounting of API calls, flushed to the api_usage tables.
+
+Every HTTP attempt is recorded per (hour, method): request and failure
+counts, prompt/completion tokens from the response's usage block, total
+latency and time spent waiting for the rate limiter, plus a latency
+histogram. drain() hands the accumulated rows to
+QuoteDatabase.record_api_usage, which adds them to the hourly rows.
+"""
+import time
+import bisect
+import threading
+from typing import Dict, List, Tuple
+
+# Histogram upper bounds (ms); slower requests land in the LATENCY_OVERFLOW bucket
+LATENCY_BUCKETS_MS = (250, 500, 1000, 2000, 5000, 10000, 30000, 60000)
+LATENCY_OVERFLOW = -1
+COUNTERS = ('requests', 'failures', 'prompt_tokens', 'completion_tokens', 'latency_ms', 'wait_ms')
+
+
+def latency_bucket(latency_ms: float) -> int:
+    """Upper bound of the histogram bucket holding latency_ms"""
+    index = bisect.bisect_left(LATENCY_BUCKETS_MS, latency_ms)
+    return LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS) else LATENCY_OVERFLOW
+
+
+def _empty_counters() -> Dict:
+    counters = dict.fromkeys(COUNTERS, 0)
+    counters['histogram'] = {}
+    return counters
+
+
+class ApiMetrics:
+    """Thread-safe counters: recorded on the HTTP client loop, drained by a bot job"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, str], Dict] = {}
+
+    def record(self, method: str, latency: float, waited: float = 0.0, ok: bool = True,
+               prompt_tokens: int = 0, completion_tokens: int = 0):
+        """One finished HTTP attempt (latency and waited in seconds)"""
+        hour = time.strftime('%Y-%m-%d %H:00', time.gmtime())
+        latency_ms = latency * 1000
+        with self._lock:
+            counters = self._counters.setdefault((hour, method), _empty_counters())
+            counters['requests'] += 1
+            counters['failures'] += 0 if ok else 1
+            counters['prompt_tokens'] += prompt_tokens
+            counters['completion_tokens'] += completion_tokens
+            counters['latency_ms'] += latency_ms
+            counters['wait_ms'] += waited * 1000
+            bucket = latency_bucket(latency_ms)
+            counters['histogram'][bucket] = counters['histogram'].get(bucket, 0) + 1
+
+    def drain(self) -> List[Dict]:
+        """Take everything recorded so far as rows (hour, method, counters..., histogram)"""
+        with self._lock:
+            counters, self._counters = self._counters, {}
+        return [{'hour': hour, 'method': method, **values} for (hour, method), values in counters.items()]
+
+    def restore(self, rows: List[Dict]):
+        """Put drained rows back (their write failed) so they go out with the next flush"""
+        with self._lock:
+            for row in rows:
+                counters = self._counters.setdefault((row['hour'], row['method']), _empty_counters())
+                for name in COUNTERS:
+                    counters[name] += row[name]
+                for bucket, count in row['histogram'].items():
+                    counters['histogram'][bucket] = counters['histogram'].get(bucket, 0) + count
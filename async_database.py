@@ -0,0 +1,310 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from database import QuoteDatabase
+from deepseek_generator import MAX_BATCH_QUOTES, deepseek_gen
+from db_maintenance import run_maintenance
+from usage_log import UsageRecorder
+from rate_limiter import PRIORITY_BACKGROUND, PRIORITY_NORMAL
+from resilience import Deadline
+
+
+class AsyncQuoteDatabase:
+    """
+    Awaitable facade over QuoteDatabase for bot handlers.
+
+    Reads run on a bounded thread pool; the shared ConnectionPool gives every
+    worker thread its own read connection. Writes go through a single writer
+    thread, so they queue here instead of contending for the pool's write
+    lock. AI generation (network + duplicate check) runs on its own pool and
+    only the final insert touches the writer, so a slow API never blocks
+    other users' queries.
+    """
+
+    def __init__(self, db_path: str = None, max_readers: int = 4, max_ai_workers: int = 2,
+                 cache_corpus: bool = False, reserve_low: int = 3, reserve_high: int = 10):
+        self._db = QuoteDatabase(db_path, cache_corpus=cache_corpus)
+        self.db_path = self._db.db_path
+
+        self._read_executor = ThreadPoolExecutor(max_workers=max_readers, thread_name_prefix='quote-db-read')
+        self._write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='quote-db-write')
+        self._ai_executor = ThreadPoolExecutor(max_workers=max_ai_workers, thread_name_prefix='quote-db-ai')
+        self._usage = UsageRecorder(self._db)
+
+        # AI quote reserve is refilled up to reserve_high once it drops below reserve_low
+        self.reserve_low = reserve_low
+        self.reserve_high = reserve_high
+        self._refill_task: Optional[asyncio.Task] = None
+
+    async def _run(self, executor, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+
+    async def _read(self, method: str, *args, **kwargs):
+        return await self._run(self._read_executor, getattr(self._db, method), *args, **kwargs)
+
+    async def _write(self, method: str, *args, **kwargs):
+        return await self._run(self._write_executor, getattr(self._db, method), *args, **kwargs)
+
+    # ==================== READS ====================
+
+    async def is_interaction_processed(self, platform: str, interaction_type: str, target_id: str) -> bool:
+        return await self._read('is_interaction_processed', platform, interaction_type, target_id)
+
+    async def get_random_quote_for_button(self) -> Optional[Dict]:
+        return await self._read('get_random_quote_for_button')
+
+    async def get_least_used_quote(self) -> Optional[Dict]:
+        return await self._read('get_least_used_quote')
+
+    async def get_quote_by_category(self, category: str) -> Optional[Dict]:
+        return await self._read('get_quote_by_category', category)
+
+    async def get_quote(self, quote_id: int) -> Optional[Dict]:
+        return await self._read('get_quote', quote_id)
+
+    async def search_quotes(self, query: str, limit: int = 5, field: str = None) -> List[Dict]:
+        return await self._read('search_quotes', query, limit=limit, field=field)
+
+    async def search_quotes_page(self, query: str, field: str = None, cursor: str = None,
+                                 page_size: int = 5, backward: bool = False) -> Dict:
+        return await self._read('search_quotes_page', query, field=field, cursor=cursor,
+                                page_size=page_size, backward=backward)
+
+    async def get_category_catalog(self) -> Dict[str, int]:
+        return await self._read('get_category_catalog')
+
+    async def get_quotes_by_tag(self, tag: str, limit: int = 5) -> List[Dict]:
+        return await self._read('get_quotes_by_tag', tag, limit)
+
+    async def get_quotes_by_tags(self, tags: List[str], limit: int = 5) -> List[Dict]:
+        return await self._read('get_quotes_by_tags', tags, limit)
+
+    async def get_quotes_by_tags_page(self, tags: List[str], cursor: str = None,
+                                      page_size: int = 5, backward: bool = False) -> Dict:
+        return await self._read('get_quotes_by_tags_page', tags, cursor=cursor,
+                                page_size=page_size, backward=backward)
+
+    async def get_tag_cloud(self, limit: int = 30) -> List[Dict]:
+        return await self._read('get_tag_cloud', limit)
+
+    async def get_user_favorites(self, user_id: int) -> List[Dict]:
+        return await self._read('get_user_favorites', user_id)
+
+    async def get_user_favorites_page(self, user_id: int, cursor: str = None,
+                                      page_size: int = 5, backward: bool = False) -> Dict:
+        return await self._read('get_user_favorites_page', user_id, cursor=cursor,
+                                page_size=page_size, backward=backward)
+
+    async def get_daily_stats(self) -> Dict:
+        return await self._read('get_daily_stats')
+
+    async def is_quote_similar(self, text: str, threshold: float = 0.85) -> bool:
+        return await self._read('is_quote_similar', text, threshold)
+
+    async def get_ai_generation_stats(self) -> Dict:
+        return await self._read('get_ai_generation_stats')
+
+    async def reserve_size(self) -> int:
+        return await self._read('reserve_size')
+
+    async def get_quote_usage(self, quote_id: int, days: int = 30) -> Dict[str, int]:
+        return await self._read('get_quote_usage', quote_id, days)
+
+    async def get_top_quotes(self, days: int = 7, limit: int = 10) -> List[Dict]:
+        return await self._read('get_top_quotes', days, limit)
+
+    async def get_hourly_usage(self, hours: int = 24) -> Dict[str, Dict[str, int]]:
+        return await self._read('get_hourly_usage', hours)
+
+    async def get_api_usage(self, hours: int = 24) -> Dict[str, Dict]:
+        return await self._read('get_api_usage', hours)
+
+    # ==================== WRITES ====================
+
+    async def log_interaction(self, platform: str, interaction_type: str, target_id: str):
+        return await self._write('log_interaction', platform, interaction_type, target_id)
+
+    async def add_to_favorites(self, user_id: int, quote_id: int) -> bool:
+        return await self._write('add_to_favorites', user_id, quote_id)
+
+    async def get_next_quote(self) -> Optional[Dict]:
+        return await self._write('get_next_quote')
+
+    async def add_quote(self, text: str, author: str, category: str, tags: List[str] = None) -> int:
+        return await self._write('add_quote', text, author, category, tags)
+
+    async def delete_quote(self, quote_id: int) -> bool:
+        return await self._write('delete_quote', quote_id)
+
+    async def save_ai_quote(self, quote_data: Dict) -> Optional[Dict]:
+        return await self._write('save_ai_quote', quote_data)
+
+    async def save_ai_quotes(self, quotes: List[Dict]) -> List[Dict]:
+        return await self._write('save_ai_quotes', quotes)
+
+    def record_manual_request(self):
+        """Count a user's quote request; buffered like record_usage, returns immediately"""
+        self._usage.record_manual_request()
+
+    async def rollup_usage(self) -> int:
+        return await self._write('rollup_usage')
+
+    async def flush_api_metrics(self) -> int:
+        """Write the generator's accumulated API usage counters; returns rows written"""
+        rows = deepseek_gen.metrics.drain()
+        if not rows:
+            return 0
+        try:
+            await self._write('record_api_usage', rows)
+        except Exception:
+            deepseek_gen.metrics.restore(rows)
+            raise
+        return len(rows)
+
+    def record_usage(self, quote_id: int, context: str):
+        """Buffer a usage event; returns immediately (flushed in batches by UsageRecorder)"""
+        self._usage.record(quote_id, context)
+
+    async def run_maintenance(self, **options) -> Dict:
+        """Retention + vacuum pass (db_maintenance.run_maintenance).
+
+        Runs on the loop's default executor, not the writer thread: the job takes
+        the write lock one small batch at a time, so queued writes interleave.
+        """
+        return await self._run(None, run_maintenance, self._db, **options)
+
+    # ==================== AI GENERATION ====================
+
+    async def generate_unique_ai_quote(self, topic: str = None, style: str = None, deadline: float = None,
+                                       priority: int = PRIORITY_NORMAL) -> Optional[Dict]:
+        return await self._run(self._ai_executor, self._db.generate_unique_ai_quote,
+                               topic, style, deadline, priority)
+
+    async def generate_and_save_ai_quote(self, topic: str = None, style: str = None, deadline: float = None,
+                                         priority: int = PRIORITY_NORMAL) -> Optional[Dict]:
+        """
+        Take a quote from the AI reserve; generate inline (off the writer thread)
+        only if it is empty, within deadline seconds (default: the generator's)
+        """
+        if not topic and not style:
+            quote = await self._write('claim_reserved_ai_quote')
+            self.schedule_reserve_refill()
+            if quote:
+                return quote
+
+        quote_data = await self.generate_unique_ai_quote(topic, style, deadline, priority)
+        if not quote_data:
+            return None
+        return await self.save_ai_quote(quote_data)
+
+    async def stream_and_save_ai_quote(self, on_text: Callable[[str], Awaitable], deadline: float = None,
+                                       priority: int = PRIORITY_NORMAL) -> Optional[Dict]:
+        """
+        generate_and_save_ai_quote for a user watching the answer appear: after
+        the reserve, the quote is streamed with on_text(text so far) awaited as
+        it grows. A streamed duplicate is replaced by an ordinary generation
+        within what is left of deadline.
+        """
+        quote = await self._write('claim_reserved_ai_quote')
+        self.schedule_reserve_refill()
+        if quote:
+            return quote
+        if not deepseek_gen.available:
+            return None
+
+        budget = Deadline(deadline if deadline is not None else deepseek_gen.deadline)
+        quote_data = await deepseek_gen.agenerate_motivational_quote(deadline=budget.remaining(),
+                                                                     priority=priority, on_text=on_text)
+        if not quote_data or quote_data.get('source') == 'fallback':
+            return None
+        # save_ai_quote rejects it if a similar quote exists
+        quote = await self.save_ai_quote(quote_data)
+        if quote or budget.expired:
+            return quote
+        quote_data = await self.generate_unique_ai_quote(deadline=budget.remaining(), priority=priority)
+        return await self.save_ai_quote(quote_data) if quote_data else None
+
+    async def generate_ai_quotes(self, count: int, batch_size: int = 10, concurrency: int = None,
+                                 progress: Callable[[Dict], Awaitable] = None) -> Dict:
+        """
+        Generate and save count AI quotes in batches of batch_size quotes per
+        request, at most concurrency requests in flight (default: the
+        generator's connection limit). Each batch is deduped and saved in one
+        transaction as it arrives; progress (if given) is awaited after every
+        batch with the running totals, which are also returned.
+        """
+        batch_size = max(1, min(batch_size, MAX_BATCH_QUOTES))
+        stats = {'requested': count, 'generated': 0, 'saved': 0, 'duplicates': 0, 'failed_batches': 0}
+        if not deepseek_gen.enabled or count <= 0:
+            return stats
+
+        semaphore = asyncio.Semaphore(concurrency or deepseek_gen.max_concurrency)
+        sizes = [min(batch_size, count - start) for start in range(0, count, batch_size)]
+
+        async def run_batch(size: int):
+            async with semaphore:
+                quotes = await deepseek_gen.agenerate_quote_batch(size)
+            saved = await self.save_ai_quotes(quotes) if quotes else []
+            if not quotes:
+                stats['failed_batches'] += 1
+            stats['generated'] += len(quotes)
+            stats['saved'] += len(saved)
+            stats['duplicates'] += len(quotes) - len(saved)
+            if progress:
+                await progress(dict(stats))
+
+        await asyncio.gather(*(run_batch(size) for size in sizes))
+        return stats
+
+    async def refill_ai_reserve(self) -> int:
+        """Top the reserve up to reserve_high if it fell below reserve_low; returns quotes added"""
+        if not deepseek_gen.available:
+            return 0
+        size = await self._read('reserve_size')
+        if size >= self.reserve_low:
+            return 0
+
+        added = 0
+        # Each generate_unique_ai_quote already retries; stop on repeated failures
+        for _ in range((self.reserve_high - size) * 2):
+            if size + added >= self.reserve_high or not deepseek_gen.available:
+                break
+            quote_data = await self.generate_unique_ai_quote(priority=PRIORITY_BACKGROUND)
+            if quote_data and await self._write('add_to_reserve', quote_data):
+                added += 1
+        if added:
+            print(f"🧠 AI reserve refilled: +{added} ({size + added} ready)")
+        return added
+
+    def schedule_reserve_refill(self):
+        """Start a background refill unless one is already running"""
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = asyncio.get_running_loop().create_task(self.refill_ai_reserve())
+
+    async def get_next_quote_with_ai_fallback(self) -> Optional[Dict]:
+        """Get next quote, generate AI if manual quotes are exhausted"""
+        quote = await self.get_next_quote()
+
+        if not quote:
+            print("📝 Manual quotes exhausted, generating AI...")
+            quote = await self.generate_and_save_ai_quote()
+            if not quote:
+                # If AI failed, get any old quote
+                quote = await self.get_least_used_quote()
+
+        return quote
+
+    def close(self):
+        """Flush usage events, stop worker threads and close the shared pool"""
+        if self._refill_task is not None:
+            self._refill_task.cancel()
+        self._usage.close()
+        rows = deepseek_gen.metrics.drain()
+        if rows:
+            self._db.record_api_usage(rows)
+        for executor in (self._read_executor, self._ai_executor, self._write_executor):
+            executor.shutdown(wait=True)
+        self._db.close()
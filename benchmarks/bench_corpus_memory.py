@@ -0,0 +1,75 @@
+"""
+Benchmark: memory footprint and read speed of the quote_cache corpus.
+
+Builds N synthetic quotes (default 1M) and measures, with tracemalloc, the
+QuoteCorpus snapshot against the same rows held as a list of dicts (what
+dict(row) per quote would cost). Then times random / by-category / by-id
+reads from the corpus.
+
+Usage:
+    python benchmarks/bench_corpus_memory.py [rows]
+"""
+import os
+import sys
+import time
+import random
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from quote_cache import COLUMNS, QuoteCorpus
+
+CATEGORIES = ['motivation', 'wisdom', 'success', 'life', 'business', 'philosophy', 'health', 'love']
+WORDS = ['жизнь', 'успех', 'путь', 'время', 'сила', 'мечта', 'труд', 'шаг', 'цель', 'вера', 'день', 'свет']
+
+
+def make_rows(rows: int):
+    """Synthetic rows shaped like SELECT <COLUMNS> FROM quotes"""
+    rnd = random.Random(7)
+    for i in range(1, rows + 1):
+        text = ' '.join(rnd.choice(WORDS) for _ in range(rnd.randint(8, 20))).capitalize() + '.'
+        yield {
+            'id': i, 'text': text, 'author': f'Автор {i % 5000}', 'category': rnd.choice(CATEGORIES),
+            'tags': '["мотивация", "успех"]', 'source': 'manual', 'ai_model': None,
+            'created_at': '2026-01-01 00:00:00', 'used_count': 0,
+        }
+
+
+def measure(build):
+    """(result, bytes allocated by build())"""
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    # Same text objects for both layouts, so only the per-quote structures differ
+    source = list(make_rows(rows))
+
+    dicts, dicts_size = measure(lambda: [{name: row[name] for name in COLUMNS} for row in source])
+    del dicts
+    corpus, corpus_size = measure(lambda: QuoteCorpus(source))
+
+    print(f"{rows:,} quotes")
+    print(f"  list of dicts : {dicts_size / 2**20:8.1f} MB ({dicts_size / rows:.0f} B/quote, excluding strings)")
+    print(f"  QuoteCorpus   : {corpus_size / 2**20:8.1f} MB ({corpus_size / rows:.0f} B/quote, excluding strings)")
+
+    reads = 200_000
+    for label, read in (
+        ('random', lambda: corpus.random()),
+        ('by category', lambda: corpus.random('wisdom')),
+        ('by id', lambda: corpus.get(random.randint(1, rows))),
+    ):
+        start = time.perf_counter()
+        for _ in range(reads):
+            read()
+        elapsed = time.perf_counter() - start
+        print(f"  {label:<12}: {reads / elapsed:,.0f} reads/s")
+
+
+if __name__ == "__main__":
+    main()
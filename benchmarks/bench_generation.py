@@ -0,0 +1,171 @@
+"""
+Benchmark: AI generation pipeline against the local DeepSeek stub.
+
+Starts benchmarks/deepseek_stub.py in-process and drives,
+at a fixed concurrency:
+  generator - deepseek_gen.agenerate_motivational_quote (HTTP + parsing)
+  stream    - the same call streamed (on_text), also timing the first text
+  pipeline  - AsyncQuoteDatabase.generate_and_save_ai_quote on a temporary
+              database (generation + duplicate check + insert)
+  batch     - AsyncQuoteDatabase.generate_ai_quotes (batched requests)
+and reports throughput, p50/p99 latency per operation, failures and, for
+the pipeline, duplicate retries (extra API requests per saved quote);
+for the stream, time to first content next to time to the whole quote.
+
+Usage:
+    python benchmarks/bench_generation.py [--mode all] [--requests 200] [--concurrency 8]
+        [--latency lognormal:300:0.5] [--error-rate 0.02] [--duplicate-rate 0.2]
+        [--burst-every 20 --burst-length 2] [--stream-interval 20] [--rpm 0 --tpm 0]
+"""
+import os
+import io
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+import contextlib
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from deepseek_stub import add_stub_arguments, start_stub, stub_options
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q * len(ordered)) - 1))]
+
+
+async def drive(operation, total: int, concurrency: int) -> Dict:
+    """Run operation(i) total times, at most concurrency at once; (latencies, results, seconds)"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, results = [], []
+
+    async def one(i: int):
+        async with semaphore:
+            started = time.perf_counter()
+            results.append(await operation(i))
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    # Generator/DB progress messages would drown the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        await asyncio.gather(*(one(i) for i in range(total)))
+    return {'latencies': latencies, 'results': results, 'seconds': time.perf_counter() - started}
+
+
+def report(label: str, run: Dict, ops: int, extra: str = ''):
+    latencies = run['latencies']
+    print(f"{label:<10}: {ops / run['seconds']:8.1f} ops/s | "
+          f"p50 {percentile(latencies, 0.50) * 1000:7.1f} ms | p99 {percentile(latencies, 0.99) * 1000:7.1f} ms"
+          f"{' | ' + extra if extra else ''}")
+
+
+async def bench_generator(gen, backend, args):
+    before = backend.stats['requests']
+    run = await drive(lambda i: gen.agenerate_motivational_quote(), args.requests, args.concurrency)
+    fallbacks = sum(1 for quote in run['results'] if quote.get('source') == 'fallback')
+    report('generator', run, args.requests,
+           f"fallbacks {fallbacks} | HTTP requests {backend.stats['requests'] - before}")
+
+
+async def bench_stream(gen, backend, args):
+    first_text = []
+
+    async def operation(i: int):
+        started = time.perf_counter()
+        seen = []
+
+        async def on_text(text: str):
+            if not seen:
+                seen.append(True)
+                first_text.append(time.perf_counter() - started)
+
+        return await gen.agenerate_motivational_quote(on_text=on_text)
+
+    run = await drive(operation, args.requests, args.concurrency)
+    fallbacks = sum(1 for quote in run['results'] if quote.get('source') == 'fallback')
+    report('stream', run, args.requests,
+           f"first text p50 {percentile(first_text, 0.50) * 1000:.1f} ms, "
+           f"p99 {percentile(first_text, 0.99) * 1000:.1f} ms | fallbacks {fallbacks}")
+
+
+async def bench_pipeline(db, backend, args):
+    before = backend.stats['requests']
+    # A topic bypasses the AI reserve, so every call generates
+    run = await drive(lambda i: db.generate_and_save_ai_quote(topic='успех'), args.requests, args.concurrency)
+    saved = sum(1 for quote in run['results'] if quote)
+    requests = backend.stats['requests'] - before
+    retries = max(0, requests - args.requests)
+    report('pipeline', run, args.requests,
+           f"saved {saved} | failed {args.requests - saved} | "
+           f"duplicate/error retries {retries / args.requests:.1%}")
+
+
+async def bench_batch(db, backend, args):
+    before = backend.stats['requests']
+    run = await drive(lambda i: db.generate_ai_quotes(args.requests, batch_size=args.batch_size,
+                                                      concurrency=args.concurrency), 1, 1)
+    stats = run['results'][0]
+    print(f"{'batch':<10}: {stats['saved'] / run['seconds']:8.1f} quotes/s | "
+          f"saved {stats['saved']}/{args.requests} | duplicates {stats['duplicates']} | "
+          f"HTTP requests {backend.stats['requests'] - before} (batches of {args.batch_size})")
+
+
+async def main_async(args, url: str, backend):
+    # The generator reads its configuration from the environment at import time
+    os.environ.update({
+        'DEEPSEEK_API_KEY': 'stub', 'DEEPSEEK_API_URL': url,
+        'DEEPSEEK_MAX_CONCURRENCY': str(args.concurrency),
+        'DEEPSEEK_RPM': str(args.rpm), 'DEEPSEEK_TPM': str(args.tpm),
+    })
+    from deepseek_generator import deepseek_gen
+    from async_database import AsyncQuoteDatabase
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = AsyncQuoteDatabase(os.path.join(tmp, 'bench.db'), max_ai_workers=args.concurrency,
+                                reserve_low=0)
+        try:
+            print(f"{args.requests} operations, concurrency {args.concurrency}, latency {args.latency}, "
+                  f"errors {args.error_rate:.0%}, duplicates {args.duplicate_rate:.0%}")
+            if args.mode in ('generator', 'all'):
+                await bench_generator(deepseek_gen, backend, args)
+            if args.mode in ('stream', 'all'):
+                await bench_stream(deepseek_gen, backend, args)
+            if args.mode in ('generator', 'stream', 'all'):
+                # Those quotes were never saved: duplicates of them would not be retried
+                backend.forget()
+            if args.mode in ('pipeline', 'all'):
+                await bench_pipeline(db, backend, args)
+            if args.mode in ('batch', 'all'):
+                await bench_batch(db, backend, args)
+            print(f"stub: {backend.stats} | breaker {deepseek_gen.breaker.state}")
+        finally:
+            db.close()
+            deepseek_gen.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI generation pipeline load benchmark")
+    parser.add_argument('--mode', choices=('generator', 'stream', 'pipeline', 'batch', 'all'), default='all')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--batch-size', type=int, default=10)
+    parser.add_argument('--rpm', type=float, default=0, help="client-side requests/min limit (0 = none)")
+    parser.add_argument('--tpm', type=float, default=0, help="client-side tokens/min limit (0 = none)")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    server, backend, url = start_stub(**stub_options(args))
+    try:
+        asyncio.run(main_async(args, url, backend))
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Benchmark: quote image renders per second, cold vs cached assets.
+
+"cold" builds a new RenderContext for every image: the font path probe,
+three ImageFont.truetype loads and the background are paid per render, as
+create_quote_image did before the shared context. "cached" reuses one
+context (fonts from its LRU cache, background template copy()'d). Each is
+measured for rendering alone and with the JPEG encode create_quote_image
+does when it saves.
+
+Usage:
+    python benchmarks/bench_image.py [renders]
+"""
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from image_generator import BACKGROUNDS, RenderContext
+
+QUOTE = ("Дорогу осилит идущий, а сидящий дома так и останется сидеть.", "Народная мудрость", "мотивация")
+
+
+def measure(render, count: int, save: bool) -> float:
+    """Renders per second"""
+    start = time.perf_counter()
+    for _ in range(count):
+        img = render()
+        if save:
+            img.save(io.BytesIO(), format='JPEG')
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    shared = RenderContext()
+    print(f"{count} renders per cell, font: {shared.font_path or 'Pillow default'}")
+    print(f"{'background':>10} {'cold':>10} {'cached':>10} {'cold+jpeg':>10} {'cached+jpeg':>12}")
+
+    for background in BACKGROUNDS:
+        cold = lambda: RenderContext().render(*QUOTE, background=background)
+        cached = lambda: shared.render(*QUOTE, background=background)
+        cached()  # build the template outside the measurement
+        results = [measure(cold, count, False), measure(cached, count, False),
+                   measure(cold, count, True), measure(cached, count, True)]
+        print(f"{background:>10} {results[0]:>8.1f}/s {results[1]:>8.1f}/s {results[2]:>8.1f}/s "
+              f"{results[3]:>10.1f}/s")
+
+
+if __name__ == "__main__":
+    main()
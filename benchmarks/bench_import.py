@@ -0,0 +1,68 @@
+"""
+Benchmark: bulk import/export throughput (rows per second).
+
+Generates a synthetic JSONL corpus, streams it into a fresh database with
+quote_io.import_quotes (near-duplicate filtering on) and exports it back.
+
+Usage:
+    python benchmarks/bench_import.py [rows]
+"""
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import QuoteDatabase
+from quote_io import import_quotes, export_quotes
+
+SYLLABLES = ['ра', 'то', 'ми', 'ла', 'ко', 'ве', 'ду', 'сна', 'про', 'жи', 'мо', 'ре', 'ти', 'ны', 'сло', 'да']
+
+
+def make_corpus(path: str, rows: int):
+    """Write rows of random pseudo-Russian quotes (plus ~2% near-duplicates)"""
+    rnd = random.Random(42)
+    vocabulary = [''.join(rnd.choice(SYLLABLES) for _ in range(rnd.randint(2, 4))) for _ in range(20000)]
+    written = []
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(rows):
+            if written and rnd.random() < 0.02:
+                text = rnd.choice(written) + '!'
+            else:
+                text = ' '.join(rnd.choice(vocabulary) for _ in range(rnd.randint(8, 16))).capitalize()
+                if len(written) < 1000:
+                    written.append(text)
+            record = {'text': text, 'author': f'Автор {i % 300}', 'category': rnd.choice(['жизнь', 'успех', 'мудрость']),
+                      'tags': '#' + ' #'.join(rnd.sample(vocabulary[:50], 3))}
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    workdir = tempfile.mkdtemp()
+    source = os.path.join(workdir, 'corpus.jsonl')
+    make_corpus(source, rows)
+
+    db = QuoteDatabase(os.path.join(workdir, 'bench.db'))
+
+    start = time.perf_counter()
+    stats = import_quotes(
+        db, source,
+        progress=lambda s: print(f"  imported {s['imported']:>8} / processed {s['processed']:>8}", end='\r')
+    )
+    elapsed = time.perf_counter() - start
+    print(f"\nimport: {stats} in {elapsed:.1f}s -> {stats['processed'] / elapsed:,.0f} rows/s")
+
+    start = time.perf_counter()
+    exported = export_quotes(db, os.path.join(workdir, 'export.jsonl'))
+    elapsed = time.perf_counter() - start
+    print(f"export: {exported} rows in {elapsed:.1f}s -> {exported / elapsed:,.0f} rows/s")
+
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
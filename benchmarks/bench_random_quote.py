@@ -0,0 +1,63 @@
+"""
+Benchmark: random quote selection latency vs corpus size.
+
+Compares the sampler index used by QuoteDatabase.get_random_quote_for_button /
+get_quote_by_category with the old ORDER BY RANDOM() query.
+
+Usage:
+    python benchmarks/bench_random_quote.py [max_rows]
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import QuoteDatabase
+
+CATEGORIES = ['motivation', 'wisdom', 'success', 'life', 'productivity']
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+
+def fill(db: QuoteDatabase, rows: int):
+    """Insert synthetic quotes (the sampler triggers fire for each row)"""
+    with db.pool.writer() as conn:
+        conn.executemany(
+            "INSERT INTO quotes (text, author, category, tags, source) VALUES (?, ?, ?, '[]', 'manual')",
+            ((f'Quote number {i}', f'Author {i % 500}', random.choice(CATEGORIES)) for i in range(rows))
+        )
+
+
+def measure(func, repeat: int) -> float:
+    """Average call latency in microseconds"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    max_rows = int(sys.argv[1]) if len(sys.argv) > 1 else SIZES[-1]
+    print(f"{'rows':>10} {'sampler':>12} {'by category':>12} {'ORDER BY RANDOM()':>18}")
+    
+    for rows in [size for size in SIZES if size <= max_rows]:
+        path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+        db = QuoteDatabase(path)
+        fill(db, rows)
+        
+        sampler = measure(db.get_random_quote_for_button, 2000)
+        by_category = measure(lambda: db.get_quote_by_category('wisdom'), 2000)
+        legacy = measure(
+            lambda: db.conn.execute("SELECT * FROM quotes ORDER BY RANDOM() LIMIT 1").fetchone(),
+            max(5, 20000 // rows)
+        )
+        print(f"{rows:>10} {sampler:>10.1f}us {by_category:>10.1f}us {legacy:>16.1f}us")
+        
+        db.close()
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+Local DeepSeek/OpenAI-compatible chat completions server for load tests.
+
+Answers POST <any path> with a chat.completion body (including a usage
+block) and never spends real tokens. Responses follow the request shape:
+a quotes batch ({"quotes": [...]}) for batch prompts, {"replies": [...]}
+for reply prompts, a generic JSON object for other JSON-mode prompts and
+'"text" — Author' plain text otherwise. With "stream": true the content
+comes as server-sent chat.completion.chunk events: the sampled latency is
+the time to the first chunk, then one chunk every stream_interval ms.
+
+Quotes are deterministic for a given seed; duplicate_rate of them are
+near-duplicates (one extra word) of earlier ones, to exercise the dedupe
+path. Latency, error rate and periodic 429 bursts are configurable.
+
+Usage:
+    python benchmarks/deepseek_stub.py [--port 8800] [--latency lognormal:300:0.5]
+        [--error-rate 0.02] [--burst-every 30 --burst-length 3] [--duplicate-rate 0.1] [--stream-interval 20]
+    DEEPSEEK_API_URL=http://127.0.0.1:8800/v1/chat/completions DEEPSEEK_API_KEY=stub python bot.py
+"""
+import re
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+
+WORDS = ['жизнь', 'успех', 'путь', 'время', 'сила', 'мечта', 'труд', 'шаг', 'цель', 'вера', 'день', 'свет',
+         'сердце', 'разум', 'воля', 'знание', 'смелость', 'рост', 'утро', 'выбор', 'ошибка', 'опыт', 'мир', 'дело']
+AUTHORS = ['Сенека', 'Конфуций', 'Марк Аврелий', 'Лао-цзы', 'Сократ', 'Народная мудрость']
+# Characters per streamed chunk (about one token)
+STREAM_CHUNK_CHARS = 4
+
+
+def parse_latency(spec: str):
+    """'fixed:MS', 'uniform:MIN:MAX' or 'lognormal:MEDIAN_MS:SIGMA' -> sampler(rnd) in seconds"""
+    kind, *args = spec.split(':')
+    values = [float(arg) for arg in args]
+    if kind == 'fixed':
+        return lambda rnd: values[0] / 1000
+    if kind == 'uniform':
+        return lambda rnd: rnd.uniform(values[0], values[1]) / 1000
+    if kind == 'lognormal':
+        return lambda rnd: rnd.lognormvariate(math.log(values[0]), values[1]) / 1000
+    raise ValueError(f"Unknown latency distribution: {spec!r}")
+
+
+class StubBackend:
+    """Deterministic quote source plus the failure model; shared by all handler threads"""
+
+    def __init__(self, seed: int = 1, latency: str = 'fixed:0', error_rate: float = 0.0,
+                 burst_every: float = 0.0, burst_length: float = 0.0, duplicate_rate: float = 0.0,
+                 stream_interval: float = 20.0):
+        self.latency = parse_latency(latency)
+        self.stream_interval = stream_interval / 1000
+        self.error_rate = error_rate
+        self.burst_every = burst_every
+        self.burst_length = burst_length
+        self.duplicate_rate = duplicate_rate
+
+        self._lock = threading.Lock()
+        self._rnd = random.Random(seed)
+        self._started = time.monotonic()
+        self._texts: List[str] = []
+        self.stats = {'requests': 0, 'ok': 0, 'errors': 0, 'rate_limited': 0, 'quotes': 0, 'duplicates': 0}
+
+    def next_quote(self) -> str:
+        """New quote text, or a near-duplicate of an earlier one with probability duplicate_rate"""
+        with self._lock:
+            self.stats['quotes'] += 1
+            if self._texts and self._rnd.random() < self.duplicate_rate:
+                self.stats['duplicates'] += 1
+                return self._rnd.choice(self._texts) + ' ' + self._rnd.choice(WORDS)
+            text = ' '.join(self._rnd.choice(WORDS) for _ in range(self._rnd.randint(8, 14))).capitalize()
+            text = f"{text} {len(self._texts)}."
+            self._texts.append(text)
+            return text
+
+    def forget(self):
+        """Drop the quote history, so later near-duplicates only copy quotes issued from now on"""
+        with self._lock:
+            self._texts.clear()
+
+    def author(self) -> str:
+        with self._lock:
+            return self._rnd.choice(AUTHORS)
+
+    def outcome(self) -> Tuple[float, int]:
+        """(delay in seconds, HTTP status) for the next request"""
+        with self._lock:
+            self.stats['requests'] += 1
+            delay = max(0.0, self.latency(self._rnd))
+            elapsed = time.monotonic() - self._started
+            # Bursts close every period, so a run never starts inside one
+            if self.burst_every and elapsed % self.burst_every >= self.burst_every - self.burst_length:
+                self.stats['rate_limited'] += 1
+                return 0.0, 429
+            if self._rnd.random() < self.error_rate:
+                self.stats['errors'] += 1
+                return delay, self._rnd.choice((500, 503))
+            self.stats['ok'] += 1
+            return delay, 200
+
+    def retry_after(self) -> int:
+        """Seconds until the current 429 burst ends"""
+        elapsed = time.monotonic() - self._started
+        return max(1, math.ceil(self.burst_every - elapsed % self.burst_every))
+
+    def content(self, prompt: str, json_mode: bool) -> str:
+        """Answer shaped like what the prompt asks for"""
+        if json_mode and '"quotes"' in prompt:
+            match = re.search(r'Сгенерируй (\d+)', prompt)
+            count = int(match.group(1)) if match else 5
+            return json.dumps({'quotes': [
+                {'text': self.next_quote(), 'author': self.author(), 'category': 'мотивация',
+                 'tags': ['успех', 'путь', 'сила']}
+                for _ in range(count)
+            ]}, ensure_ascii=False)
+        if json_mode and '"replies"' in prompt:
+            return json.dumps({'replies': ['Спасибо! 🙏', 'Рады, что откликнулось ✨', 'Вперед к цели! 🚀']},
+                              ensure_ascii=False)
+        if json_mode:
+            return json.dumps({'quote': self.next_quote(), 'author': self.author(),
+                               'explanation': 'Маленькие шаги складываются в большой путь.',
+                               'category': 'мотивация', 'tags': ['успех']}, ensure_ascii=False)
+        return f'"{self.next_quote()}" — {self.author()}\nХэштеги: #успех #путь #сила'
+
+
+def make_handler(backend: StubBackend):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status: int, body: Dict = None, headers: Dict = None):
+            payload = json.dumps(body or {}, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _stream(self, model: str, content: str, usage: Dict):
+            """Server-sent events: content in small chunks, then the usage block and [DONE]"""
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            # No Content-Length: the body ends when the connection closes
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            self.close_connection = True
+            chunk_id = f'stub-{time.monotonic_ns()}'
+
+            def event(body: Dict):
+                self.wfile.write(f"data: {json.dumps(body, ensure_ascii=False)}\n\n".encode('utf-8'))
+                self.wfile.flush()
+
+            try:
+                for start in range(0, len(content), STREAM_CHUNK_CHARS):
+                    if start:
+                        time.sleep(backend.stream_interval)
+                    event({'id': chunk_id, 'object': 'chat.completion.chunk', 'model': model,
+                           'choices': [{'index': 0, 'finish_reason': None,
+                                        'delta': {'content': content[start:start + STREAM_CHUNK_CHARS]}}]})
+                event({'id': chunk_id, 'object': 'chat.completion.chunk', 'model': model,
+                       'choices': [{'index': 0, 'finish_reason': 'stop', 'delta': {}}]})
+                event({'id': chunk_id, 'object': 'chat.completion.chunk', 'model': model, 'choices': [],
+                       'usage': usage})
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                # The client stopped reading (deadline, cancelled)
+                pass
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            delay, status = backend.outcome()
+            time.sleep(delay)
+            if status == 429:
+                self._send(429, {'error': {'message': 'rate limited'}},
+                           {'Retry-After': str(backend.retry_after())})
+                return
+            if status != 200:
+                self._send(status, {'error': {'message': 'stub failure'}})
+                return
+
+            prompt = '\n'.join(message.get('content', '') for message in request.get('messages', []))
+            json_mode = (request.get('response_format') or {}).get('type') == 'json_object'
+            content = backend.content(prompt, json_mode)
+            prompt_tokens, completion_tokens = len(prompt) // 3 + 1, len(content) // 3 + 1
+            usage = {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                     'total_tokens': prompt_tokens + completion_tokens}
+            if request.get('stream'):
+                self._stream(request.get('model', 'deepseek-chat'), content, usage)
+                return
+            self._send(200, {
+                'id': f'stub-{time.monotonic_ns()}',
+                'object': 'chat.completion',
+                'model': request.get('model', 'deepseek-chat'),
+                'choices': [{'index': 0, 'finish_reason': 'stop',
+                             'message': {'role': 'assistant', 'content': content}}],
+                'usage': usage,
+            })
+
+    return Handler
+
+
+def start_stub(port: int = 0, **options) -> Tuple[ThreadingHTTPServer, StubBackend, str]:
+    """Serve in a daemon thread; returns (server, backend, completions URL)"""
+    backend = StubBackend(**options)
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(backend))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='deepseek-stub', daemon=True).start()
+    return server, backend, f'http://127.0.0.1:{server.server_port}/v1/chat/completions'
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--latency', default='lognormal:300:0.5',
+                        help="fixed:MS | uniform:MIN:MAX | lognormal:MEDIAN_MS:SIGMA")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of 500/503 answers")
+    parser.add_argument('--burst-every', type=float, default=0.0, help="429 burst period (s), 0 = none")
+    parser.add_argument('--burst-length', type=float, default=0.0, help="429 burst length (s)")
+    parser.add_argument('--duplicate-rate', type=float, default=0.0, help="share of near-duplicate quotes")
+    parser.add_argument('--stream-interval', type=float, default=20.0, help="ms between streamed chunks")
+
+
+def stub_options(args) -> Dict:
+    return {'seed': args.seed, 'latency': args.latency, 'error_rate': args.error_rate,
+            'burst_every': args.burst_every, 'burst_length': args.burst_length,
+            'duplicate_rate': args.duplicate_rate, 'stream_interval': args.stream_interval}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--port', type=int, default=8800)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    server, backend, url = start_stub(args.port, **stub_options(args))
+    print(f"DeepSeek stub listening on {url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(10)
+            print(f"  {backend.stats}")
+    except KeyboardInterrupt:
+        server.shutdown()
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import os
+import html
 import logging
 import asyncio
 
@@ -15,18 +16,21 @@ from telegram.ext import (
 from telegram.error import TelegramError
 from dotenv import load_dotenv
 
-from database import QuoteDatabase
+from async_database import AsyncQuoteDatabase
+from rate_limiter import PRIORITY_INTERACTIVE
+from live_message import LiveMessage
+from api_metrics import LATENCY_BUCKETS_MS, LATENCY_OVERFLOW
 from keyboards import (
     get_main_keyboard, 
     get_categories_keyboard, 
     get_search_options_keyboard,
     get_quote_actions_keyboard,
+    get_pagination_keyboard,
     get_admin_keyboard
 )
 
 from deepseek_generator import deepseek_gen
 
-from database import QuoteDatabase
 from image_generator import create_quote_image
 from instagram_uploader import InstagramUploader
 from video_generator import create_quote_video
@@ -43,17 +47,59 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 class WisdomBotWithButtons:
+    # Кнопки поиска -> подсказка пользователю
+    SEARCH_PROMPTS = {
+        'search_author': "✍️ *Поиск по автору:*\nВведите имя или фамилию автора:",
+        'search_tag': "🏷️ *Поиск по тегу:*\nВведите тег (например: успех):",
+        'search_text': "📝 *Поиск по тексту:*\nВведите слово или фразу из цитаты:",
+    }
+    
+    # Состояние пользователя -> поле полнотекстового поиска
+    SEARCH_STATE_FIELDS = {
+        'searching_author': 'author',
+        'searching_tag': 'tags',
+        'searching_text': 'text',
+    }
+    
+    # Цитат на странице избранного / результатов поиска
+    PAGE_SIZE = 5
+    
+    # /generate N: по умолчанию и максимум за одну команду
+    GENERATE_DEFAULT = 20
+    GENERATE_MAX = 500
+    
+    # Интервал правок сообщения при потоковой генерации в группах (лимит Telegram ~20 правок в минуту)
+    GROUP_EDIT_INTERVAL = 3.0
+    
     def __init__(self):
         self.token = os.getenv('BOT_TOKEN')
         self.channel_id = os.getenv('CHANNEL_ID')
         self.admin_id = os.getenv('ADMIN_CHAT_ID')
         
+        # Хранение старых данных (дни) и каталог архива удаленных взаимодействий
+        self.maintenance_options = {
+            'interactions_days': int(os.getenv('INTERACTIONS_RETENTION_DAYS', '365')),
+            'usage_days': int(os.getenv('USAGE_RETENTION_DAYS', '90')),
+            'archive_dir': os.getenv('ARCHIVE_DIR', 'archive'),
+        }
+        
+        # Сколько секунд ответ пользователю может ждать генерацию AI (текст виден по мере генерации)
+        # и интервал между правками сообщения с этим текстом в личном чате
+        self.stream_deadline = float(os.getenv('AI_STREAM_DEADLINE', '20'))
+        self.stream_edit_interval = float(os.getenv('STREAM_EDIT_INTERVAL', '1.0'))
+        
         if not self.token:
             raise ValueError("BOT_TOKEN не установлен в .env файле")
         
         # self.bot удален, так как Application создает своего бота
         # self.bot = Bot(token=self.token)
-        self.db = QuoteDatabase()
+        # QUOTE_CACHE=0 отключает кэш цитат в памяти
+        self.db = AsyncQuoteDatabase(
+            cache_corpus=os.getenv('QUOTE_CACHE', '1') == '1',
+            # Запас заранее сгенерированных AI-цитат: пополняется до HIGH, когда падает ниже LOW
+            reserve_low=int(os.getenv('AI_RESERVE_LOW', '3')),
+            reserve_high=int(os.getenv('AI_RESERVE_HIGH', '10'))
+        )
         self.instagram = InstagramUploader()
         self.tiktok = TikTokUploader()
         
@@ -81,6 +127,7 @@ class WisdomBotWithButtons:
 
 🎯 *Используй кнопки ниже или команды:*
 /quote - случайная цитата
+/wisdom - мудрость дня
 /categories - выбрать категорию
 /search - поиск цитат
 /stats - статистика бота
@@ -109,6 +156,7 @@ class WisdomBotWithButtons:
 *Основные:*
 /start - Запустить бота
 /quote - Получить случайную цитату
+/wisdom - Мудрость дня с заданием
 /categories - Выбрать категорию
 /search - Поиск цитат
 /stats - Статистика бота
@@ -117,6 +165,8 @@ class WisdomBotWithButtons:
 /admin - Админ-панель
 /force_post - Опубликовать сейчас
 /add_quote - Добавить цитату
+/generate N - Сгенерировать N AI-цитат
+/api - Расход токенов DeepSeek
 
 *Управление:*
 /cancel - Отменить текущее действие
@@ -137,33 +187,68 @@ class WisdomBotWithButtons:
         user_id = update.effective_user.id if update.effective_user else 0
         
         # Получаем случайную цитату
-        quote = self.db.get_random_quote_for_button()
-        
-        # Если цитат нет, пробуем сгенерировать через AI
-        if not quote:
-            await update.message.reply_chat_action('typing')
-            # Генерируем новую
-            quote = self.db.generate_and_save_ai_quote()
+        self.db.record_manual_request()
+        quote = await self.db.get_random_quote_for_button()
+        
+        # Если цитат нет, генерируем через AI: заглушка сразу, затем текст по мере генерации.
+        # Когда AI недоступен, стримить нечего - заглушку не отправляем, остается только резерв
+        live = None
+        if not quote and deepseek_gen.available:
+            live = await self.start_live_message(update, "✨ Генерирую цитату...")
+            quote = await self.db.stream_and_save_ai_quote(live.update, deadline=self.stream_deadline,
+                                                           priority=PRIORITY_INTERACTIVE)
+        elif not quote:
+            quote = await self.db.generate_and_save_ai_quote(deadline=self.stream_deadline,
+                                                             priority=PRIORITY_INTERACTIVE)
         
         if quote:
+            self.db.record_usage(quote['id'], 'random')
             # Форматируем ответ
             response = self.format_quote_response(quote)
             
             # Отправляем с кнопками действий
-            await update.message.reply_text(
-                response,
-                parse_mode='HTML',
-                reply_markup=get_quote_actions_keyboard(quote['id'])
-            )
+            if live:
+                await live.finish(response, parse_mode='HTML',
+                                  reply_markup=get_quote_actions_keyboard(quote['id']))
+            else:
+                await update.message.reply_text(
+                    response,
+                    parse_mode='HTML',
+                    reply_markup=get_quote_actions_keyboard(quote['id'])
+                )
             
             # Логируем запрос
             logger.info(f"Пользователь {user_id} запросил случайную цитату: {quote['id']}")
+        elif live:
+            await live.finish("😔 Не удалось найти или сгенерировать цитату. Попробуйте позже!")
         else:
             await update.message.reply_text(
                 "😔 Не удалось найти или сгенерировать цитату. Попробуйте позже!",
                 reply_markup=get_main_keyboard()
             )
     
+    # ==================== МУДРОСТЬ ДНЯ ====================
+    
+    async def wisdom_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Обработчик команды /wisdom: мудрость дня появляется по мере генерации"""
+        if not deepseek_gen.available:
+            # Без AI сразу отвечаем запасной мудростью, без заглушки
+            wisdom = await deepseek_gen.agenerate_daily_wisdom(deadline=self.stream_deadline,
+                                                               priority=PRIORITY_INTERACTIVE)
+            await update.message.reply_text(self.format_wisdom_response(wisdom), parse_mode='HTML')
+            return
+        live = await self.start_live_message(update, "🧠 Готовлю мудрость дня...")
+        wisdom = await deepseek_gen.agenerate_daily_wisdom(deadline=self.stream_deadline,
+                                                           priority=PRIORITY_INTERACTIVE, on_text=live.update)
+        await live.finish(self.format_wisdom_response(wisdom), parse_mode='HTML')
+    
+    async def start_live_message(self, update: Update, placeholder: str) -> LiveMessage:
+        """Отправляет заглушку, которую затем правят по мере генерации ответа"""
+        message = await update.message.reply_text(placeholder)
+        private = update.effective_chat and update.effective_chat.type == 'private'
+        interval = self.stream_edit_interval if private else max(self.stream_edit_interval, self.GROUP_EDIT_INTERVAL)
+        return LiveMessage(message, interval)
+    
     # ==================== КНОПКА "ПО КАТЕГОРИЯМ" ====================
     
     async def handle_categories_button(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -178,7 +263,7 @@ class WisdomBotWithButtons:
         await update.message.reply_text(
             categories_text,
             parse_mode='Markdown',
-            reply_markup=get_categories_keyboard()
+            reply_markup=get_categories_keyboard(await self.db.get_category_catalog())
         )
     
     # ==================== КНОПКА "ПОИСК" ====================
@@ -209,7 +294,7 @@ class WisdomBotWithButtons:
     
     async def handle_stats_button(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработка кнопки "Статистика" """
-        stats = self.db.get_daily_stats()
+        stats = await self.db.get_daily_stats()
         
         stats_text = f"""
 📊 *Статистика бота:*
@@ -256,24 +341,44 @@ class WisdomBotWithButtons:
     
     async def favorites_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Показать избранные цитаты"""
-        user_id = update.effective_user.id
-        favorites = self.db.get_user_favorites(user_id)
-        
-        if favorites:
-            response = "❤️ <b>Ваши избранные цитаты:</b>\n\n"
-            for quote in favorites[:5]:  # Показываем первые 5
-                response += f"• {quote['text'][:80]}...\n\n"
-            
-            if len(favorites) > 5:
-                response += f"\n📚 И еще {len(favorites) - 5} цитат..."
-        else:
-            response = "📭 У вас пока нет избранных цитат"
-        
+        response, keyboard = await self.render_favorites_page(update.effective_user.id)
         await update.message.reply_text(
             response,
             parse_mode='HTML',
-            reply_markup=get_main_keyboard()
+            reply_markup=keyboard or get_main_keyboard()
         )
+    
+    async def render_favorites_page(self, user_id: int, cursor: str = None, backward: bool = False):
+        """Текст и клавиатура одной страницы избранного (клавиатура None, если пусто)"""
+        page = await self.db.get_user_favorites_page(user_id, cursor=cursor, page_size=self.PAGE_SIZE,
+                                                     backward=backward)
+        if not page['results']:
+            return "📭 У вас пока нет избранных цитат", None
+        
+        response = "❤️ <b>Ваши избранные цитаты:</b>\n\n"
+        for quote in page['results']:
+            response += f"• {quote['text'][:80]}...\n\n"
+        return response, get_pagination_keyboard('fv', page['prev_cursor'], page['next_cursor'])
+    
+    async def render_search_page(self, search: dict, cursor: str = None, backward: bool = False):
+        """Текст и клавиатура одной страницы результатов поиска (клавиатура None, если пусто)"""
+        if search.get('tags'):
+            page = await self.db.get_quotes_by_tags_page(search['tags'], cursor=cursor,
+                                                         page_size=self.PAGE_SIZE, backward=backward)
+            if not page['results'] and cursor is None:
+                # Точных тегов нет: дальше этот поиск идет по началу слов
+                del search['tags']
+        if not search.get('tags'):
+            page = await self.db.search_quotes_page(search['query'], field=search['field'], cursor=cursor,
+                                                    page_size=self.PAGE_SIZE, backward=backward)
+        if not page['results']:
+            return f"😔 По запросу '{search['query']}' ничего не найдено", None
+        
+        response = "🔍 *Найдены цитаты:*\n\n"
+        for quote in page['results']:
+            response += f"• {quote['text'][:100]}... — *{quote['author']}*\n\n"
+        return response, get_pagination_keyboard('sr', page['prev_cursor'], page['next_cursor'])
+    
         # ==================== ОБРАБОТЧИКИ INLINE КНОПОК ====================
     
     async def handle_callback_query(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -287,9 +392,11 @@ class WisdomBotWithButtons:
         # Обработка категорий
         if data.startswith('cat_'):
             category = data.replace('cat_', '')
-            quote = self.db.get_quote_by_category(category)
+            self.db.record_manual_request()
+            quote = await self.db.get_quote_by_category(category)
             
             if quote:
+                self.db.record_usage(quote['id'], 'category')
                 response = self.format_quote_response(quote, show_category=True)
                 await query.edit_message_text(
                     response,
@@ -299,13 +406,15 @@ class WisdomBotWithButtons:
             else:
                 await query.edit_message_text(
                     f"😔 В категории '{category}' пока нет цитат",
-                    reply_markup=get_categories_keyboard()
+                    reply_markup=get_categories_keyboard(await self.db.get_category_catalog())
                 )
         
         # Еще одна цитата
         elif data == 'another_quote':
-            quote = self.db.get_random_quote_for_button()
+            self.db.record_manual_request()
+            quote = await self.db.get_random_quote_for_button()
             if quote:
+                self.db.record_usage(quote['id'], 'another')
                 response = self.format_quote_response(quote)
                 await query.edit_message_text(
                     response,
@@ -336,19 +445,36 @@ class WisdomBotWithButtons:
             await query.delete_message()
             await self.start_manual_post_flow(update, context)
 
-        # Поиск по автору
-        elif data == 'search_author':
+        # Поиск по автору / тегу / тексту
+        elif data in self.SEARCH_PROMPTS:
             await query.edit_message_text(
-                "✍️ *Поиск по автору:*\nВведите имя или фамилию автора:",
+                self.SEARCH_PROMPTS[data],
                 parse_mode='Markdown'
             )
-            self.user_states[user_id] = 'searching_author'
+            self.user_states[user_id] = data.replace('search_', 'searching_')
+        
+        # Страницы избранного: fv:<n|p>:<cursor>
+        elif data.startswith('fv:'):
+            _, direction, cursor = data.split(':', 2)
+            response, keyboard = await self.render_favorites_page(user_id, cursor, backward=direction == 'p')
+            await query.edit_message_text(response, parse_mode='HTML', reply_markup=keyboard)
+        
+        # Страницы поиска: sr:<n|p>:<cursor>, сам запрос хранится в user_data
+        elif data.startswith('sr:'):
+            search = context.user_data.get('last_search')
+            if not search:
+                await query.edit_message_text("⌛ Поиск устарел, повторите запрос")
+                return
+            _, direction, cursor = data.split(':', 2)
+            response, keyboard = await self.render_search_page(search, cursor, backward=direction == 'p')
+            await query.edit_message_text(response, parse_mode='Markdown', reply_markup=keyboard)
         
         # Добавить в избранное
         elif data.startswith('fav_'):
             quote_id = int(data.replace('fav_', ''))
-            # Здесь можно добавить логику избранного
-            await query.answer("✅ Добавлено в избранное!", show_alert=True)
+            added = await self.db.add_to_favorites(user_id, quote_id)
+            self.db.record_usage(quote_id, 'favorite')
+            await query.answer("✅ Добавлено в избранное!" if added else "❤️ Уже в избранном", show_alert=True)
     
     # ==================== ОБРАБОТКА ТЕКСТОВЫХ СООБЩЕНИЙ ====================
     
@@ -361,27 +487,20 @@ class WisdomBotWithButtons:
         if user_id in self.user_states:
             state = self.user_states[user_id]
             
-            # Поиск по автору
-            if state == 'searching_author':
-                quotes = self.db.search_quotes(text, limit=3)
+            # Поиск по автору / тегу / тексту
+            if state in self.SEARCH_STATE_FIELDS:
+                search = {'query': text, 'field': self.SEARCH_STATE_FIELDS[state]}
+                if state == 'searching_tag':
+                    # Сначала точные теги (по индексу), если их нет - поиск по началу слов
+                    search['tags'] = text.replace(',', ' ').split()
+                context.user_data['last_search'] = search
+                response, keyboard = await self.render_search_page(search)
                 
-                if quotes:
-                    response = "🔍 *Найдены цитаты:*\n\n"
-                    for quote in quotes:
-                        response += f"• {quote['text'][:100]}... — *{quote['author']}*\n\n"
-                    
-                    response += "\nДля подробного просмотра используйте кнопки ниже."
-                    
-                    await update.message.reply_text(
-                        response,
-                        parse_mode='Markdown',
-                        reply_markup=get_main_keyboard()
-                    )
-                else:
-                    await update.message.reply_text(
-                        f"😔 Цитаты автора '{text}' не найдены",
-                        reply_markup=get_main_keyboard()
-                    )
+                await update.message.reply_text(
+                    response,
+                    parse_mode='Markdown',
+                    reply_markup=keyboard or get_main_keyboard()
+                )
                 
                 # Сбрасываем состояние
                 del self.user_states[user_id]
@@ -439,6 +558,64 @@ class WisdomBotWithButtons:
             reply_markup=get_admin_keyboard()
         )
     
+    async def generate_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """/generate N - пакетная генерация AI-цитат (только админ)"""
+        if str(update.effective_user.id) != self.admin_id:
+            await update.message.reply_text("⛔ Команда доступна только администратору")
+            return
+        
+        try:
+            count = int(context.args[0]) if context.args else self.GENERATE_DEFAULT
+        except ValueError:
+            await update.message.reply_text("Использование: /generate N (например, /generate 50)")
+            return
+        count = max(1, min(count, self.GENERATE_MAX))
+        
+        status = await update.message.reply_text(f"⏳ Генерация {count} цитат...")
+        
+        async def report(stats: dict):
+            try:
+                await status.edit_text(
+                    f"⏳ Генерация: {stats['generated']}/{count}\n"
+                    f"✅ Сохранено: {stats['saved']} | ♻️ Дубликаты: {stats['duplicates']}"
+                )
+            except TelegramError as e:
+                # Правки слишком часто / текст не изменился - не мешают генерации
+                logger.debug(f"Прогресс генерации не обновлен: {e}")
+        
+        stats = await self.db.generate_ai_quotes(count, progress=report)
+        await status.edit_text(
+            f"🧠 Генерация завершена\n\n"
+            f"Запрошено: {stats['requested']}\n"
+            f"Получено от AI: {stats['generated']}\n"
+            f"✅ Сохранено: {stats['saved']}\n"
+            f"♻️ Дубликаты: {stats['duplicates']}\n"
+            f"❌ Неудачных запросов: {stats['failed_batches']}"
+        )
+    
+    async def api_usage_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """/api - расход токенов и задержки DeepSeek за сутки (только админ)"""
+        if str(update.effective_user.id) != self.admin_id:
+            await update.message.reply_text("⛔ Команда доступна только администратору")
+            return
+        
+        await self.db.flush_api_metrics()
+        usage = await self.db.get_api_usage(hours=24)
+        if not usage:
+            await update.message.reply_text("📡 За последние 24 часа запросов к DeepSeek не было")
+            return
+        
+        lines = ["📡 DeepSeek за 24 часа:\n"]
+        for method, stats in usage.items():
+            p95 = stats.get('p95_ms')
+            lines.append(
+                f"• {method}: {stats['requests']} запр. ({stats['failures']} ошибок), "
+                f"токены {stats['prompt_tokens']} + {stats['completion_tokens']}, "
+                f"в среднем {stats['avg_latency_ms']} мс, p95 ≤ {p95 if p95 != LATENCY_OVERFLOW else f'>{LATENCY_BUCKETS_MS[-1]}'} мс, "
+                f"ожидание лимита {stats['avg_wait_ms']} мс"
+            )
+        await update.message.reply_text('\n'.join(lines))
+    
     async def handle_admin_buttons(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработка админских кнопок"""
         if str(update.effective_user.id) != self.admin_id:
@@ -465,7 +642,7 @@ class WisdomBotWithButtons:
         """Начало процесса ручной публикации с превью"""
         try:
             # Получаем цитату
-            quote = self.db.get_next_quote_with_ai_fallback()
+            quote = await self.db.get_next_quote_with_ai_fallback()
             if not quote:
                 await update.message.reply_text("❌ Не удалось получить цитату.")
                 return
@@ -548,6 +725,7 @@ class WisdomBotWithButtons:
             # Примечание: publish_to_instagram сейчас делает и то и то.
             
             # Логируем
+            self.db.record_usage(quote['id'], 'manual_post')
             logger.info(f"Ручная публикация подтверждена: {quote['id']}")
             
             await update.callback_query.edit_message_caption(
@@ -584,6 +762,21 @@ class WisdomBotWithButtons:
         
         return response
     
+    def format_wisdom_response(self, wisdom: dict) -> str:
+        """Форматирует мудрость дня (поля ответа AI экранируются для HTML)"""
+        fields = {name: html.escape(str(wisdom.get(name) or '').strip())
+                  for name in ('emoji', 'quote', 'analysis', 'task', 'key_thought')}
+        response = f"{fields['emoji'] or '🧠'} <b>Мудрость дня</b>\n\n"
+        if fields['quote']:
+            response += f"«{fields['quote']}»\n\n"
+        if fields['analysis']:
+            response += f"📖 {fields['analysis']}\n\n"
+        if fields['task']:
+            response += f"✅ <b>Задание:</b> {fields['task']}\n\n"
+        if fields['key_thought']:
+            response += f"💡 <i>{fields['key_thought']}</i>"
+        return response.strip()
+    
     def _publish_to_instagram_sync(self, quote: dict):
         """Синхронная функция публикации в Instagram и TikTok"""
         try:
@@ -633,7 +826,7 @@ class WisdomBotWithButtons:
     async def post_to_channel_manual(self, bot: Bot):
         """Ручная публикация в канал (для админа)"""
         try:
-            quote = self.db.get_next_quote_with_ai_fallback()
+            quote = await self.db.get_next_quote_with_ai_fallback()
             if not quote:
                 return False
             
@@ -658,6 +851,7 @@ class WisdomBotWithButtons:
             # Публикация в Instagram
             await self.publish_to_instagram(quote)
             
+            self.db.record_usage(quote['id'], 'manual_post')
             logger.info(f"Ручная публикация: {quote['id']}")
             return True
             
@@ -671,19 +865,49 @@ class WisdomBotWithButtons:
         """Задача для обработки комментариев и подписок"""
         loop = asyncio.get_running_loop()
         await loop.run_in_executor(None, self.instagram.process_interactions)
+    
+    async def maintenance_job(self, context: ContextTypes.DEFAULT_TYPE):
+        """Удаляет старые данные (с архивом) и сжимает базу"""
+        try:
+            await self.db.run_maintenance(**self.maintenance_options)
+        except Exception as e:
+            logger.error(f"Ошибка обслуживания БД: {e}")
+    
+    async def ai_reserve_job(self, context: ContextTypes.DEFAULT_TYPE):
+        """Поддерживает запас AI-цитат, чтобы публикация не ждала API"""
+        try:
+            self.db.schedule_reserve_refill()
+        except Exception as e:
+            logger.error(f"Ошибка пополнения запаса AI-цитат: {e}")
+    
+    async def usage_rollup_job(self, context: ContextTypes.DEFAULT_TYPE):
+        """Сводит сырые события использования в почасовую/дневную статистику"""
+        events = await self.db.rollup_usage()
+        if events:
+            logger.info(f"Usage rollup: {events} событий")
+        # Счетчики токенов и задержек DeepSeek
+        await self.db.flush_api_metrics()
 
     # ==================== ЗАПУСК БОТА ====================
     
     def run_bot(self):
         """Запускает бота с обработчиками"""
-        application = Application.builder().token(self.token).build()
+        application = (
+            Application.builder()
+            .token(self.token)
+            .post_shutdown(self.on_shutdown)
+            .build()
+        )
         
         # Команды
         application.add_handler(CommandHandler("start", self.start_command))
         application.add_handler(CommandHandler("help", self.help_command))
         application.add_handler(CommandHandler("admin", self.admin_command))
         application.add_handler(CommandHandler("quote", self.handle_random_quote_button))
+        application.add_handler(CommandHandler("wisdom", self.wisdom_command))
         application.add_handler(CommandHandler("stats", self.handle_stats_button))
+        application.add_handler(CommandHandler("generate", self.generate_command))
+        application.add_handler(CommandHandler("api", self.api_usage_command))
         
         # Обработчики кнопок
         application.add_handler(CallbackQueryHandler(self.handle_callback_query))
@@ -713,6 +937,15 @@ class WisdomBotWithButtons:
             # Задача обработки взаимодействий (каждые 30 минут)
             job_queue.run_repeating(self.interactions_job, interval=1800, first=60)
             
+            # Запас AI-цитат (каждые 15 минут, первый раз сразу после старта)
+            job_queue.run_repeating(self.ai_reserve_job, interval=900, first=10)
+            
+            # Сводка событий использования (каждые 10 минут)
+            job_queue.run_repeating(self.usage_rollup_job, interval=600, first=120)
+            
+            # Обслуживание БД: очистка, архив, vacuum (ночью, 03:00 МСК = 00:00 UTC)
+            job_queue.run_daily(self.maintenance_job, time=datetime.strptime("00:00", "%H:%M").time())
+            
             print("⏰ Планировщик настроен (JobQueue)")
         
         # Запуск
@@ -722,12 +955,17 @@ class WisdomBotWithButtons:
         
         application.run_polling(allowed_updates=Update.ALL_TYPES)
     
+    async def on_shutdown(self, application: Application):
+        """Останавливает потоки БД и HTTP-клиент DeepSeek при завершении работы"""
+        self.db.close()
+        deepseek_gen.close()
+    
     # ==================== АВТОМАТИЧЕСКАЯ ПУБЛИКАЦИЯ (JobQueue) ====================
     
     async def scheduled_post_job(self, context: ContextTypes.DEFAULT_TYPE):
         """Задача для автоматической публикации"""
         try:
-            quote = self.db.get_next_quote_with_ai_fallback()
+            quote = await self.db.get_next_quote_with_ai_fallback()
             if not quote:
                 return
             
@@ -753,6 +991,7 @@ class WisdomBotWithButtons:
             # Публикация в Instagram
             await self.publish_to_instagram(quote)
             
+            self.db.record_usage(quote['id'], 'scheduled_post')
             logger.info(f"Автопубликация: {quote['id']}")
             
             # Уведомление админу
@@ -1,24 +1,240 @@
+import os
+import re
 import sqlite3
 import json
 import difflib
-from typing import Dict, List, Optional
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
 from datetime import datetime, timedelta
+from db_pool import get_pool
 from deepseek_generator import deepseek_gen
+from resilience import Deadline
+from rate_limiter import PRIORITY_NORMAL
+from quote_similarity import lsh_keys
+from interaction_filter import InteractionFilter, interaction_key
+from quote_cache import COLUMNS as CORPUS_COLUMNS, QuoteCorpus
+
+
+# Random sampler buckets: '*' holds every quote, 'c:<category>' holds one category.
+# Each bucket is a dense array of positions 0..size-1, so a uniform pick is
+# a single primary-key lookup instead of ORDER BY RANDOM() over the table.
+SAMPLER_ALL = '*'
+
+
+def _sampler_append_sql(bucket: str, quote_id: str) -> str:
+    """SQL that appends a quote to the end of a sampler bucket"""
+    return f'''
+            INSERT OR IGNORE INTO quote_sampler_size (category, size)
+                SELECT {bucket}, 0 WHERE {bucket} IS NOT NULL;
+            INSERT INTO quote_sampler (category, pos, quote_id)
+                SELECT category, size, {quote_id} FROM quote_sampler_size WHERE category = {bucket};
+            UPDATE quote_sampler_size SET size = size + 1 WHERE category = {bucket};
+    '''
+
+
+def _sampler_remove_sql(bucket: str, quote_id: str) -> str:
+    """SQL that removes a quote from a sampler bucket by moving the last slot into its place"""
+    return f'''
+            UPDATE quote_sampler SET pos = -1 - pos
+                WHERE category = {bucket} AND quote_id = {quote_id};
+            UPDATE quote_sampler
+                SET pos = (SELECT -1 - pos FROM quote_sampler WHERE category = {bucket} AND pos < 0)
+                WHERE category = {bucket}
+                  AND pos = (SELECT size - 1 FROM quote_sampler_size WHERE category = {bucket});
+            UPDATE quote_sampler_size SET size = size - 1
+                WHERE category = {bucket}
+                  AND EXISTS (SELECT 1 FROM quote_sampler WHERE category = {bucket} AND pos < 0);
+            DELETE FROM quote_sampler WHERE category = {bucket} AND pos < 0;
+            DELETE FROM quote_sampler_size WHERE category = {bucket} AND size <= 0;
+    '''
+
+
+# Full-text search over quotes_fts (FTS5, external content = quotes)
+SEARCH_FIELDS = ('text', 'author', 'tags')
+# bm25 column weights: text, author, tags
+SEARCH_WEIGHTS = (1.0, 3.0, 2.0)
+
+# Common Russian/English inflection endings, longest first. Search terms are
+# cut down to a stem and matched as FTS5 prefixes, so "Толстого" finds "Толстой".
+_SEARCH_ENDINGS = sorted([
+    'иями', 'ями', 'ами', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'ых', 'их',
+    'ах', 'ях', 'ов', 'ев', 'ей', 'ий', 'ый', 'ой', 'ая', 'яя', 'ое', 'ее', 'ые', 'ие',
+    'ую', 'юю', 'ом', 'ем', 'ам', 'ям', 'ать', 'ять', 'ить', 'еть', 'ть', 'ся', 'сь',
+    'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й',
+    'ing', 'ed', 'es', 's'
+], key=len, reverse=True)
+_SEARCH_MIN_STEM = 3
+
+
+def _fts_tags_sql(column: str) -> str:
+    """SQL expression that flattens a JSON tags column into plain words for FTS"""
+    return (f"CASE WHEN json_valid({column}) "
+            f"THEN (SELECT group_concat(value, ' ') FROM json_each({column})) "
+            f"ELSE {column} END")
+
+
+def _stem_search_term(term: str) -> str:
+    """Strip an inflection ending, keeping at least a few characters of stem"""
+    for ending in _SEARCH_ENDINGS:
+        if term.endswith(ending) and len(term) - len(ending) >= _SEARCH_MIN_STEM:
+            return term[:-len(ending)]
+    return term
+
+
+def build_search_match(query: str, field: str = None) -> Optional[str]:
+    """Turn user input into an FTS5 MATCH expression (AND of stem prefixes)"""
+    terms = [_stem_search_term(word) for word in re.findall(r'\w+', query.lower())]
+    if not terms:
+        return None
+    
+    expression = ' AND '.join(f'"{term}"*' for term in terms)
+    if field:
+        if field not in SEARCH_FIELDS:
+            raise ValueError(f"Unknown search field: {field}")
+        expression = f'{{{field}}} : ({expression})'
+    return expression
+
+
+def normalize_tags(tags) -> List[str]:
+    """Lowercase tags, strip '#' and whitespace, drop empties and duplicates (order kept)"""
+    result = []
+    for tag in tags or []:
+        tag = str(tag).strip().lstrip('#').strip().lower()
+        if tag and tag not in result:
+            result.append(tag)
+    return result
+
+
+def texts_similar(text: str, other: str, threshold: float = 0.85) -> bool:
+    """Exact (normalized) match or difflib ratio above threshold"""
+    if text.strip().lower() == other.strip().lower():
+        return True
+    # Cheap upper bounds first: most candidates are rejected without ratio()
+    matcher = difflib.SequenceMatcher(None, text, other)
+    return (matcher.real_quick_ratio() > threshold
+            and matcher.quick_ratio() > threshold
+            and matcher.ratio() > threshold)
+
+
+def filter_similar(cursor, texts: List[str], keys: List[List[int]], threshold: float = 0.85) -> List[int]:
+    """Indexes of texts that are not near-duplicates of the corpus or of each other"""
+    # One query for the whole batch: every stored quote sharing an LSH key
+    all_keys = sorted({key for text_keys in keys for key in text_keys})
+    cursor.execute('''
+        SELECT l.key, q.text FROM quote_lsh l
+        JOIN quotes q ON q.id = l.quote_id
+        WHERE l.key IN (SELECT value FROM json_each(?))
+    ''', (json.dumps(all_keys),))
+    corpus_by_key: Dict[int, List[str]] = {}
+    for row in cursor.fetchall():
+        corpus_by_key.setdefault(row['key'], []).append(row['text'])
+
+    accepted = []
+    batch_by_key: Dict[int, List[str]] = {}
+    for index, (text, text_keys) in enumerate(zip(texts, keys)):
+        candidates = set()
+        for key in text_keys:
+            candidates.update(corpus_by_key.get(key, ()))
+            candidates.update(batch_by_key.get(key, ()))
+
+        if any(texts_similar(text, other, threshold) for other in candidates):
+            continue
+
+        accepted.append(index)
+        for key in text_keys:
+            batch_by_key.setdefault(key, []).append(text)
+    return accepted
+
+
+def _load_tags(value: str) -> List[str]:
+    """Tags from the JSON tags column (legacy rows may hold a plain string)"""
+    try:
+        tags = json.loads(value)
+    except (TypeError, json.JSONDecodeError):
+        return str(value).replace(',', ' ').split()
+    if isinstance(tags, str):
+        return [tags]
+    return tags if isinstance(tags, list) else []
+
+
+def _keyset_page(rows: List[Dict], page_size: int, cursor: Optional[str],
+                 backward: bool, make_cursor) -> Dict:
+    """
+    Turn up to page_size + 1 rows fetched past a cursor into a page with
+    next/prev cursors. Backward pages were fetched in reverse order.
+    """
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if backward:
+        rows.reverse()
+    
+    more_before, more_after = (has_more, cursor is not None) if backward else (cursor is not None, has_more)
+    return {
+        'results': rows,
+        'next_cursor': make_cursor(rows[-1]) if rows and more_after else None,
+        'prev_cursor': make_cursor(rows[0]) if rows and more_before else None,
+    }
+
+
+# Counters maintained by triggers (stats_counters). Day '' holds all-time totals.
+STATS_TOTAL = ''
+
+
+def _stats_bump_sql(day: str, name: str, delta: int, condition: str = '1') -> str:
+    """SQL that adds delta to a stats counter when condition holds"""
+    return f'''
+            INSERT INTO stats_counters (day, name, value)
+                SELECT {day}, '{name}', {delta} WHERE {condition} AND {day} IS NOT NULL
+                ON CONFLICT (day, name) DO UPDATE SET value = value + excluded.value;
+    '''
+
+
+def _stats_model_sql(model: str, delta: int, condition: str) -> str:
+    """SQL that adds delta to the per-model AI quote counter"""
+    return f'''
+            INSERT INTO stats_ai_models (model, quotes)
+                SELECT {model}, {delta} WHERE {condition} AND {model} IS NOT NULL
+                ON CONFLICT (model) DO UPDATE SET quotes = quotes + excluded.quotes;
+    '''
 
 
 class QuoteDatabase:
     """Database manager for quotes"""
     
-    def __init__(self, db_path: str = 'quotes.db'):
-        """Initialize database connection"""
-        self.db_path = db_path
-        self.conn = sqlite3.connect(db_path, check_same_thread=False)
-        self.conn.row_factory = sqlite3.Row
-        self._create_tables()
+    def __init__(self, db_path: str = None, cache_corpus: bool = False):
+        """
+        Attach to the shared connection pool for db_path (default: env DB_PATH
+        or quotes.db; cache_corpus: load quote_cache snapshot)
+        """
+        self.db_path = db_path = db_path or os.getenv('DB_PATH', 'quotes.db')
+        # The WAL and shm files live next to the database, so its directory must be durable
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.pool = get_pool(db_path)
+        # key -> row buffered by interaction_batch(), None outside a batch
+        self._pending_interactions: Optional[Dict[str, tuple]] = None
+        
+        with self.pool.writer() as conn:
+            if not self.pool.schema_ready:
+                self._create_tables(conn.cursor())
+                self.pool.schema_ready = True
+            
+            if cache_corpus and self.pool.corpus is None:
+                self._load_corpus(conn)
     
-    def _create_tables(self):
+    def _load_corpus(self, conn: sqlite3.Connection):
+        """(Re)build the shared corpus snapshot (under the write lock: no insert lands between load and publish)"""
+        self.pool.corpus = QuoteCorpus(
+            conn.execute(f"SELECT {', '.join(CORPUS_COLUMNS)} FROM quotes ORDER BY id")
+        )
+    
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Read connection for the current thread"""
+        return self.pool.reader()
+    
+    def _create_tables(self, cursor):
         """Create database tables if they don't exist"""
-        cursor = self.conn.cursor()
         
         # Quotes table
         cursor.execute('''
@@ -32,9 +248,11 @@ class QuoteDatabase:
                 ai_model TEXT,
                 used_count INTEGER DEFAULT 0,
                 last_used_at DATETIME,
+                last_used_day TEXT,
                 created_at DATETIME DEFAULT CURRENT_TIMESTAMP
             )
         ''')
+        self._migrate_usage_columns(cursor)
         
         # User favorites table
         cursor.execute('''
@@ -47,6 +265,11 @@ class QuoteDatabase:
                 UNIQUE(user_id, quote_id)
             )
         ''')
+        # Keyset pagination of a user's favorites, newest first
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_user_favorites_recent
+            ON user_favorites(user_id, created_at, id)
+        ''')
         
         # Usage stats table
         cursor.execute('''
@@ -71,62 +294,731 @@ class QuoteDatabase:
             )
         ''')
         
-        self.conn.commit()
+        self._create_sampler_index(cursor)
+        self._create_search_index(cursor)
+        self._create_similarity_index(cursor)
+        self._create_stats_counters(cursor)
+        self._create_rotation_deck(cursor)
+        self._create_tag_index(cursor)
+        self._create_usage_rollups(cursor)
+        self._create_ai_reserve(cursor)
+        self._create_reply_cache(cursor)
+        self._create_api_usage(cursor)
+    
+    def _migrate_usage_columns(self, cursor):
+        """Add the indexed last_used_day column ('YYYY-MM-DD', UTC) to older databases"""
+        cursor.execute("PRAGMA table_info(quotes)")
+        columns = {row['name'] for row in cursor.fetchall()}
+        if 'last_used_day' not in columns:
+            cursor.execute("ALTER TABLE quotes ADD COLUMN last_used_day TEXT")
+            cursor.execute('''
+                UPDATE quotes SET last_used_day = date(last_used_at)
+                WHERE last_used_at IS NOT NULL
+            ''')
+        
+        # Plain column comparisons (no date() wrapper) so these are range scans:
+        # get_next_quote's "anything left today" check and the 'used' counter rebuild
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_quotes_last_used_day ON quotes(last_used_day)")
+        # Served the old least-used selection, replaced by the rotation deck; only cost writes
+        cursor.execute("DROP INDEX IF EXISTS idx_quotes_usage")
+    
+    def _create_sampler_index(self, cursor):
+        """Create the random sampler index and the triggers that keep it in sync"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS quote_sampler (
+                category TEXT NOT NULL,
+                pos INTEGER NOT NULL,
+                quote_id INTEGER NOT NULL,
+                PRIMARY KEY (category, pos),
+                UNIQUE (category, quote_id)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS quote_sampler_size (
+                category TEXT PRIMARY KEY,
+                size INTEGER NOT NULL
+            ) WITHOUT ROWID
+        ''')
+        
+        all_bucket = f"'{SAMPLER_ALL}'"
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS quotes_sampler_ai AFTER INSERT ON quotes BEGIN
+                {_sampler_append_sql(all_bucket, 'new.id')}
+                {_sampler_append_sql("'c:' || new.category", 'new.id')}
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS quotes_sampler_ad AFTER DELETE ON quotes BEGIN
+                {_sampler_remove_sql(all_bucket, 'old.id')}
+                {_sampler_remove_sql("'c:' || old.category", 'old.id')}
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS quotes_sampler_au AFTER UPDATE OF category ON quotes
+            WHEN old.category IS NOT new.category BEGIN
+                {_sampler_remove_sql("'c:' || old.category", 'old.id')}
+                {_sampler_append_sql("'c:' || new.category", 'new.id')}
+            END
+        ''')
+        
+        # Backfill existing databases (or repair after out-of-band edits)
+        cursor.execute("SELECT size FROM quote_sampler_size WHERE category = ?", (SAMPLER_ALL,))
+        row = cursor.fetchone()
+        indexed = row['size'] if row else 0
+        cursor.execute("SELECT COUNT(*) AS total FROM quotes")
+        if cursor.fetchone()['total'] != indexed:
+            self._rebuild_sampler_index(cursor)
+    
+    def _rebuild_sampler_index(self, cursor):
+        """Rebuild the random sampler index from the quotes table"""
+        cursor.execute("DELETE FROM quote_sampler")
+        cursor.execute("DELETE FROM quote_sampler_size")
+        cursor.execute('''
+            INSERT INTO quote_sampler (category, pos, quote_id)
+            SELECT ?, ROW_NUMBER() OVER (ORDER BY id) - 1, id FROM quotes
+        ''', (SAMPLER_ALL,))
+        cursor.execute('''
+            INSERT INTO quote_sampler (category, pos, quote_id)
+            SELECT 'c:' || category, ROW_NUMBER() OVER (PARTITION BY category ORDER BY id) - 1, id
+            FROM quotes WHERE category IS NOT NULL
+        ''')
+        cursor.execute('''
+            INSERT INTO quote_sampler_size (category, size)
+            SELECT category, COUNT(*) FROM quote_sampler GROUP BY category
+        ''')
+    
+    def _create_search_index(self, cursor):
+        """Create the FTS5 search index and the triggers that keep it in sync"""
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'quotes_fts'")
+        exists = cursor.fetchone() is not None
+        
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS quotes_fts USING fts5(
+                text, author, tags,
+                content='quotes', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2',
+                prefix='2 3 4'
+            )
+        ''')
+        
+        # Tags are indexed as words, so 'delete' must pass the same flattened value
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS quotes_fts_ai AFTER INSERT ON quotes BEGIN
+                INSERT INTO quotes_fts (rowid, text, author, tags)
+                VALUES (new.id, new.text, new.author, {_fts_tags_sql('new.tags')});
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS quotes_fts_ad AFTER DELETE ON quotes BEGIN
+                INSERT INTO quotes_fts (quotes_fts, rowid, text, author, tags)
+                VALUES ('delete', old.id, old.text, old.author, {_fts_tags_sql('old.tags')});
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS quotes_fts_au AFTER UPDATE OF text, author, tags ON quotes BEGIN
+                INSERT INTO quotes_fts (quotes_fts, rowid, text, author, tags)
+                VALUES ('delete', old.id, old.text, old.author, {_fts_tags_sql('old.tags')});
+                INSERT INTO quotes_fts (rowid, text, author, tags)
+                VALUES (new.id, new.text, new.author, {_fts_tags_sql('new.tags')});
+            END
+        ''')
+        
+        if not exists:
+            cursor.execute(f'''
+                INSERT INTO quotes_fts (rowid, text, author, tags)
+                SELECT id, text, author, {_fts_tags_sql('tags')} FROM quotes
+            ''')
+    
+    def _create_similarity_index(self, cursor):
+        """Create the MinHash-LSH near-duplicate index (see quote_similarity)"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS quote_lsh (
+                key INTEGER NOT NULL,
+                quote_id INTEGER NOT NULL,
+                PRIMARY KEY (key, quote_id)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_quote_lsh_quote ON quote_lsh(quote_id)")
+        
+        # Keys are computed in Python, so changed texts are dropped here and
+        # re-indexed by the backfill below on the next start
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS quotes_lsh_ad AFTER DELETE ON quotes BEGIN
+                DELETE FROM quote_lsh WHERE quote_id = old.id;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS quotes_lsh_au AFTER UPDATE OF text ON quotes BEGIN
+                DELETE FROM quote_lsh WHERE quote_id = old.id;
+            END
+        ''')
+        
+        cursor.execute('''
+            SELECT id, text FROM quotes
+            WHERE NOT EXISTS (SELECT 1 FROM quote_lsh WHERE quote_id = quotes.id)
+        ''')
+        missing = cursor.fetchall()
+        if missing:
+            print(f"🔎 Indexing {len(missing)} quotes for duplicate detection...")
+            for row in missing:
+                self._index_quote_similarity(cursor, row['id'], row['text'])
+    
+    def _index_quote_similarity(self, cursor, quote_id: int, text: str):
+        """Add a quote's LSH keys to the near-duplicate index"""
+        cursor.executemany(
+            "INSERT OR IGNORE INTO quote_lsh (key, quote_id) VALUES (?, ?)",
+            [(key, quote_id) for key in lsh_keys(text)]
+        )
+    
+    def _create_stats_counters(self, cursor):
+        """Create trigger-maintained counters behind get_daily_stats / get_ai_generation_stats"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS stats_counters (
+                day TEXT NOT NULL,
+                name TEXT NOT NULL,
+                value INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (day, name)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS stats_ai_models (
+                model TEXT PRIMARY KEY,
+                quotes INTEGER NOT NULL DEFAULT 0
+            ) WITHOUT ROWID
+        ''')
+        
+        total = f"'{STATS_TOTAL}'"
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS quotes_stats_ai AFTER INSERT ON quotes BEGIN
+                {_stats_bump_sql(total, 'quotes', 1)}
+                {_stats_bump_sql(total, 'ai_quotes', 1, "new.source = 'ai'")}
+                {_stats_bump_sql('date(new.created_at)', 'ai_generated', 1, "new.source = 'ai'")}
+                {_stats_bump_sql('date(new.created_at)', 'manual_added', 1, "new.source = 'manual'")}
+                {_stats_model_sql('new.ai_model', 1, "new.source = 'ai'")}
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS quotes_stats_ad AFTER DELETE ON quotes BEGIN
+                {_stats_bump_sql(total, 'quotes', -1)}
+                {_stats_bump_sql(total, 'ai_quotes', -1, "old.source = 'ai'")}
+                {_stats_bump_sql('date(old.created_at)', 'ai_generated', -1, "old.source = 'ai'")}
+                {_stats_bump_sql('date(old.created_at)', 'manual_added', -1, "old.source = 'manual'")}
+                {_stats_bump_sql('old.last_used_day', 'used', -1)}
+                {_stats_model_sql('old.ai_model', -1, "old.source = 'ai'")}
+            END
+        ''')
+        # 'used' per day = number of quotes whose last_used_day is that day
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS quotes_stats_au AFTER UPDATE OF last_used_day ON quotes
+            WHEN old.last_used_day IS NOT new.last_used_day BEGIN
+                {_stats_bump_sql('old.last_used_day', 'used', -1)}
+                {_stats_bump_sql('new.last_used_day', 'used', 1)}
+            END
+        ''')
+        
+        # Backfill on first run, or repair if the total drifted from the sampler size
+        cursor.execute('''
+            SELECT
+                (SELECT value FROM stats_counters WHERE day = ? AND name = 'quotes') AS counted,
+                (SELECT size FROM quote_sampler_size WHERE category = ?) AS indexed
+        ''', (STATS_TOTAL, SAMPLER_ALL))
+        row = cursor.fetchone()
+        if row['counted'] is None or row['counted'] != (row['indexed'] or 0):
+            self._rebuild_stats_counters(cursor)
+    
+    def _rebuild_stats_counters(self, cursor):
+        """Recompute derived counters from the quotes table (manual_requests is kept)"""
+        cursor.execute("DELETE FROM stats_counters WHERE name != 'manual_requests'")
+        cursor.execute("DELETE FROM stats_ai_models")
+        cursor.execute('''
+            INSERT INTO stats_counters (day, name, value)
+            SELECT ?, 'quotes', COUNT(*) FROM quotes
+        ''', (STATS_TOTAL,))
+        cursor.execute('''
+            INSERT INTO stats_counters (day, name, value)
+            SELECT ?, 'ai_quotes', COUNT(*) FROM quotes WHERE source = 'ai'
+        ''', (STATS_TOTAL,))
+        cursor.execute('''
+            INSERT INTO stats_counters (day, name, value)
+            SELECT date(created_at), 'ai_generated', COUNT(*) FROM quotes
+            WHERE source = 'ai' AND created_at IS NOT NULL GROUP BY date(created_at)
+        ''')
+        cursor.execute('''
+            INSERT INTO stats_counters (day, name, value)
+            SELECT date(created_at), 'manual_added', COUNT(*) FROM quotes
+            WHERE source = 'manual' AND created_at IS NOT NULL GROUP BY date(created_at)
+        ''')
+        cursor.execute('''
+            INSERT INTO stats_counters (day, name, value)
+            SELECT last_used_day, 'used', COUNT(*) FROM quotes
+            WHERE last_used_day IS NOT NULL GROUP BY last_used_day
+        ''')
+        cursor.execute('''
+            INSERT INTO stats_ai_models (model, quotes)
+            SELECT ai_model, COUNT(*) FROM quotes
+            WHERE source = 'ai' AND ai_model IS NOT NULL GROUP BY ai_model
+        ''')
+    
+    def _read_stats_counters(self) -> Dict:
+        """All-time totals and today's counters in one primary-key range read"""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT CASE WHEN day = ? THEN 'total_' ELSE 'today_' END || name AS key, value
+            FROM stats_counters WHERE day IN (?, date('now'))
+        ''', (STATS_TOTAL, STATS_TOTAL))
+        return {row['key']: row['value'] for row in cursor.fetchall()}
+    
+    def _create_rotation_deck(self, cursor):
+        """Create the shuffled posting deck used by get_next_quote"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS rotation_deck (
+                pos INTEGER PRIMARY KEY,
+                quote_id INTEGER NOT NULL UNIQUE
+            )
+        ''')
+        # cursor = position of the last claimed card
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS rotation_state (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                cursor INTEGER NOT NULL
+            )
+        ''')
+        
+        # New quotes are shuffled into the unclaimed part of the deck (inside-out
+        # Fisher-Yates): the new card is parked at -j for a random slot j in
+        # (cursor, end + 1], the card at j moves to the end, the new one takes j.
+        # Slots left empty by deletions just get filled. Deleted quotes leave the deck.
+        cursor.execute("DROP TRIGGER IF EXISTS quotes_deck_ai")
+        cursor.execute('''
+            CREATE TRIGGER quotes_deck_ai AFTER INSERT ON quotes BEGIN
+                INSERT OR IGNORE INTO rotation_deck (pos, quote_id)
+                SELECT -(cursor + 1 + abs(random() % (max(cursor, coalesce(
+                    (SELECT max(pos) FROM rotation_deck), 0)) - cursor + 1))), new.id
+                FROM rotation_state WHERE id = 1;
+                UPDATE rotation_deck SET pos = (SELECT max(pos) + 1 FROM rotation_deck)
+                WHERE pos = (SELECT -pos FROM rotation_deck WHERE quote_id = new.id AND pos < 0);
+                UPDATE rotation_deck SET pos = -pos WHERE quote_id = new.id AND pos < 0;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS quotes_deck_ad AFTER DELETE ON quotes BEGIN
+                DELETE FROM rotation_deck WHERE quote_id = old.id;
+            END
+        ''')
+        
+        cursor.execute("INSERT OR IGNORE INTO rotation_state (id, cursor) VALUES (1, 0)")
+        if cursor.rowcount:
+            self._refill_rotation_deck(cursor)
+    
+    def _refill_rotation_deck(self, cursor):
+        """Shuffle every quote into a fresh deck in one statement; quotes used today go last"""
+        cursor.execute("DELETE FROM rotation_deck")
+        cursor.execute('''
+            INSERT INTO rotation_deck (pos, quote_id)
+            SELECT ROW_NUMBER() OVER (
+                ORDER BY coalesce(last_used_day >= date('now'), 0), random()
+            ), id
+            FROM quotes
+        ''')
+        cursor.execute("UPDATE rotation_state SET cursor = 0 WHERE id = 1")
+    
+    def _claim_from_deck(self, cursor) -> Optional[int]:
+        """Atomically advance the deck cursor; returns the claimed position or None if exhausted"""
+        cursor.execute('''
+            UPDATE rotation_state
+            SET cursor = (SELECT MIN(pos) FROM rotation_deck WHERE pos > rotation_state.cursor)
+            WHERE id = 1 AND EXISTS (SELECT 1 FROM rotation_deck WHERE pos > rotation_state.cursor)
+            RETURNING cursor
+        ''')
+        row = cursor.fetchone()
+        return row['cursor'] if row else None
+    
+    def _create_tag_index(self, cursor):
+        """Create the quote_tags index (one row per tag) and the triggers that keep it in sync"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS quote_tags (
+                tag TEXT NOT NULL,
+                quote_id INTEGER NOT NULL,
+                PRIMARY KEY (tag, quote_id)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_quote_tags_quote ON quote_tags(quote_id, tag)")
+        
+        # quotes.tags stays the display copy; writers store it already normalized
+        insert_tags = '''
+                INSERT OR IGNORE INTO quote_tags (tag, quote_id)
+                SELECT value, new.id FROM json_each(CASE WHEN json_valid(new.tags) THEN new.tags ELSE '[]' END)
+                WHERE type = 'text' AND value != '';
+        '''
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS quotes_tags_ai AFTER INSERT ON quotes BEGIN
+                {insert_tags}
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS quotes_tags_ad AFTER DELETE ON quotes BEGIN
+                DELETE FROM quote_tags WHERE quote_id = old.id;
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS quotes_tags_au AFTER UPDATE OF tags ON quotes BEGIN
+                DELETE FROM quote_tags WHERE quote_id = old.id;
+                {insert_tags}
+            END
+        ''')
+        
+        # Backfill: rewriting tags in normalized form fires quotes_tags_au.
+        # SQLite's lower() is ASCII-only, so normalization happens in Python.
+        cursor.execute('''
+            SELECT id, tags FROM quotes
+            WHERE tags IS NOT NULL AND tags NOT IN ('', '[]')
+              AND NOT EXISTS (SELECT 1 FROM quote_tags WHERE quote_id = quotes.id)
+        ''')
+        missing = cursor.fetchall()
+        if missing:
+            print(f"🏷️ Indexing tags of {len(missing)} quotes...")
+            cursor.executemany(
+                "UPDATE quotes SET tags = ? WHERE id = ?",
+                [(json.dumps(normalize_tags(_load_tags(row['tags']))), row['id']) for row in missing]
+            )
+    
+    def _create_usage_rollups(self, cursor):
+        """Create hourly/daily aggregates of usage_stats and the rollup watermark"""
+        for table, period in (('usage_hourly', 'hour'), ('usage_daily', 'day')):
+            cursor.execute(f'''
+                CREATE TABLE IF NOT EXISTS {table} (
+                    {period} TEXT NOT NULL,
+                    quote_id INTEGER NOT NULL,
+                    context TEXT NOT NULL,
+                    events INTEGER NOT NULL,
+                    PRIMARY KEY ({period}, quote_id, context)
+                ) WITHOUT ROWID
+            ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_usage_daily_quote ON usage_daily(quote_id, day)")
+        
+        # last_event_id = highest usage_stats.id already counted in the rollups
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS usage_rollup_state (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                last_event_id INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute("INSERT OR IGNORE INTO usage_rollup_state (id, last_event_id) VALUES (1, 0)")
+    
+    def _create_ai_reserve(self, cursor):
+        """Create the reserve of pre-generated AI quotes (status: ready / claimed / used / rejected)"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ai_quote_reserve (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                text TEXT NOT NULL,
+                author TEXT,
+                category TEXT,
+                tags TEXT,
+                ai_model TEXT,
+                status TEXT NOT NULL DEFAULT 'ready',
+                quote_id INTEGER,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_ai_reserve_status ON ai_quote_reserve(status, id)")
+        # A claim interrupted by a restart goes back to the reserve
+        cursor.execute("UPDATE ai_quote_reserve SET status = 'ready' WHERE status = 'claimed'")
+    
+    def _create_reply_cache(self, cursor):
+        """Create the cache of AI replies to comments, keyed on normalized text (see reply_cache)"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS reply_cache (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                key TEXT NOT NULL,
+                reply TEXT NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                last_used_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        # Rotation picks the least used reply of a key
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_reply_cache_key ON reply_cache(key, hits, id)")
+    
+    def _create_api_usage(self, cursor):
+        """Create hourly DeepSeek usage counters and latency histograms (see api_metrics)"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS api_usage (
+                hour TEXT NOT NULL,
+                method TEXT NOT NULL,
+                requests INTEGER NOT NULL,
+                failures INTEGER NOT NULL,
+                prompt_tokens INTEGER NOT NULL,
+                completion_tokens INTEGER NOT NULL,
+                latency_ms REAL NOT NULL,
+                wait_ms REAL NOT NULL,
+                PRIMARY KEY (hour, method)
+            ) WITHOUT ROWID
+        ''')
+        # le_ms: bucket upper bound, -1 for requests slower than every bucket
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS api_latency (
+                hour TEXT NOT NULL,
+                method TEXT NOT NULL,
+                le_ms INTEGER NOT NULL,
+                requests INTEGER NOT NULL,
+                PRIMARY KEY (hour, method, le_ms)
+            ) WITHOUT ROWID
+        ''')
+    
+    def _sample_quote(self, bucket: str) -> Optional[Dict]:
+        """Pick a uniformly random quote from a sampler bucket"""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT q.* FROM quote_sampler_size z
+            JOIN quote_sampler s
+                ON s.category = z.category
+               AND s.pos = (random() & 9223372036854775807) % z.size
+            JOIN quotes q ON q.id = s.quote_id
+            WHERE z.category = ?
+        ''', (bucket,))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+    
+    def get_category_catalog(self) -> Dict[str, int]:
+        """
+        Category -> number of quotes, most populated first.
+        
+        Kept in memory on the shared pool and recomputed (from the sampler
+        bucket sizes) only after quotes were added or removed.
+        """
+        self._refresh_if_changed_elsewhere()
+        version = self.pool.catalog_version
+        cached = self.pool.catalog
+        if cached and cached[0] == version:
+            return cached[1]
+        
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT substr(category, 3) AS category, size FROM quote_sampler_size
+            WHERE category LIKE 'c:%' AND size > 0
+            ORDER BY size DESC, category
+        ''')
+        catalog = {row['category']: row['size'] for row in cursor.fetchall()}
+        self.pool.catalog = (version, catalog)
+        return catalog
+    
+    def get_categories(self) -> List[str]:
+        """Category names, most populated first"""
+        return list(self.get_category_catalog())
+    
+    def invalidate_category_catalog(self):
+        """Drop the cached catalog (see quotes_changed)"""
+        self.pool.catalog_version += 1
+    
+    def quotes_changed(self, added: Iterable[int] = (), deleted: Iterable[int] = ()):
+        """Change hook: call after committing quote inserts/deletes to refresh in-memory caches"""
+        self.invalidate_category_catalog()
+        
+        corpus = self.pool.corpus
+        if corpus is None:
+            return
+        corpus.remove(deleted)
+        added = list(added)
+        if added:
+            cursor = self.conn.cursor()
+            cursor.execute(f'''
+                SELECT {', '.join(CORPUS_COLUMNS)} FROM quotes
+                WHERE id IN (SELECT value FROM json_each(?))
+            ''', (json.dumps(added),))
+            corpus.add(cursor.fetchall())
+    
+    def _refresh_if_changed_elsewhere(self):
+        """Rebuild the per-process caches after another process (quote_io, sqlite3 shell) wrote the file"""
+        if not self.pool.changed_elsewhere():
+            return
+        self.invalidate_category_catalog()
+        if self.pool.corpus is not None:
+            with self.pool.writer() as conn:
+                self._load_corpus(conn)
+    
+    def _interaction_filter(self) -> InteractionFilter:
+        """Shared in-memory filter over the interactions table, (re)built on demand"""
+        interactions = self.pool.interactions
+        if interactions is None or interactions.saturated:
+            # Under the write lock, so no interaction is logged between load and publish
+            with self.pool.writer() as conn:
+                interactions = self.pool.interactions
+                if interactions is None or interactions.saturated:
+                    count = conn.execute("SELECT COUNT(*) FROM interactions").fetchone()[0]
+                    rows = conn.execute("SELECT platform, interaction_type, target_id FROM interactions")
+                    interactions = InteractionFilter((interaction_key(*row) for row in rows), count)
+                    self.pool.interactions = interactions
+        return interactions
     
     def is_interaction_processed(self, platform: str, interaction_type: str, target_id: str) -> bool:
-        """Check if interaction was already processed"""
+        """Check if interaction was already processed (SQL only for Bloom filter hits)"""
+        key = interaction_key(platform, interaction_type, target_id)
+        if self._pending_interactions and key in self._pending_interactions:
+            return True
+        
+        interactions = self._interaction_filter()
+        if interactions.known(key):
+            return True
+        if not interactions.might_contain(key):
+            return False
+        
         cursor = self.conn.cursor()
         cursor.execute('''
             SELECT 1 FROM interactions 
             WHERE platform = ? AND interaction_type = ? AND target_id = ?
         ''', (platform, interaction_type, str(target_id)))
-        return bool(cursor.fetchone())
+        if cursor.fetchone():
+            interactions.remember(key)
+            return True
+        return False
 
     def log_interaction(self, platform: str, interaction_type: str, target_id: str):
-        """Log processed interaction"""
-        cursor = self.conn.cursor()
+        """Log processed interaction (buffered inside interaction_batch())"""
+        row = (platform, interaction_type, str(target_id))
+        key = interaction_key(*row)
+        
+        if self._pending_interactions is not None:
+            self._pending_interactions[key] = row
+        else:
+            with self.pool.writer() as conn:
+                conn.execute('''
+                    INSERT OR IGNORE INTO interactions (platform, interaction_type, target_id)
+                    VALUES (?, ?, ?)
+                ''', row)
+        self._interaction_filter().remember(key)
+    
+    @contextmanager
+    def interaction_batch(self):
+        """Buffer log_interaction calls and write them in one transaction on exit"""
+        if self._pending_interactions is not None:
+            yield
+            return
+        
+        self._pending_interactions = {}
         try:
-            cursor.execute('''
-                INSERT INTO interactions (platform, interaction_type, target_id)
-                VALUES (?, ?, ?)
-            ''', (platform, interaction_type, str(target_id)))
-            self.conn.commit()
-        except sqlite3.IntegrityError:
-            pass # Already logged
+            yield
+        finally:
+            pending, self._pending_interactions = self._pending_interactions, None
+            if pending:
+                with self.pool.writer() as conn:
+                    conn.executemany('''
+                        INSERT OR IGNORE INTO interactions (platform, interaction_type, target_id)
+                        VALUES (?, ?, ?)
+                    ''', list(pending.values()))
     
     def get_random_quote_for_button(self) -> Optional[Dict]:
         """Get a random quote for button press"""
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            SELECT * FROM quotes 
-            ORDER BY RANDOM()
-            LIMIT 1
-        ''')
-        row = cursor.fetchone()
-        return dict(row) if row else None
+        self._refresh_if_changed_elsewhere()
+        if self.pool.corpus is not None:
+            return self.pool.corpus.random()
+        return self._sample_quote(SAMPLER_ALL)
     
     def get_quote_by_category(self, category: str) -> Optional[Dict]:
         """Get a random quote from specific category"""
+        self._refresh_if_changed_elsewhere()
+        if self.pool.corpus is not None:
+            return self.pool.corpus.random(category)
+        return self._sample_quote(f'c:{category}')
+    
+    def get_quote(self, quote_id: int) -> Optional[Dict]:
+        """Get a quote by id"""
+        self._refresh_if_changed_elsewhere()
+        if self.pool.corpus is not None:
+            return self.pool.corpus.get(quote_id)
         cursor = self.conn.cursor()
-        cursor.execute('''
-            SELECT * FROM quotes 
-            WHERE category = ?
-            ORDER BY RANDOM()
-            LIMIT 1
-        ''', (category,))
+        cursor.execute("SELECT * FROM quotes WHERE id = ?", (quote_id,))
         row = cursor.fetchone()
         return dict(row) if row else None
     
-    def search_quotes(self, query: str, limit: int = 5) -> List[Dict]:
-        """Search quotes by author or text"""
+    def search_quotes(self, query: str, limit: int = 5, field: str = None) -> List[Dict]:
+        """Search quotes by author, text or tags, best matches first"""
+        return self.search_quotes_page(query, field=field, page_size=limit)['results']
+    
+    def search_quotes_page(self, query: str, field: str = None, cursor: str = None,
+                           page_size: int = 5, backward: bool = False) -> Dict:
+        """
+        Relevance-ranked (bm25) search page.
+        
+        Returns {'results': [...], 'next_cursor': str or None, 'prev_cursor':
+        str or None}; pass a cursor back to get the following page, with
+        backward=True for prev_cursor. field limits the match to one of
+        SEARCH_FIELDS.
+        """
+        match = build_search_match(query, field)
+        if not match:
+            return {'results': [], 'next_cursor': None, 'prev_cursor': None}
+        
+        score_sql = f"bm25(quotes_fts, {', '.join(map(str, SEARCH_WEIGHTS))})"
+        sql = f'''
+            SELECT q.*, {score_sql} AS score FROM quotes_fts
+            JOIN quotes q ON q.id = quotes_fts.rowid
+            WHERE quotes_fts MATCH ?
+        '''
+        params = [match]
+        
+        after, order = ('<', 'DESC') if backward else ('>', 'ASC')
+        if cursor:
+            after_score, after_id = cursor.rsplit(':', 1)
+            sql += f" AND ({score_sql} {after} ? OR ({score_sql} = ? AND q.id {after} ?))"
+            params += [float(after_score), float(after_score), int(after_id)]
+        
+        sql += f" ORDER BY score {order}, q.id {order} LIMIT ?"
+        params.append(page_size + 1)
+        
+        db_cursor = self.conn.cursor()
+        db_cursor.execute(sql, params)
+        rows = [dict(row) for row in db_cursor.fetchall()]
+        
+        page = _keyset_page(rows, page_size, cursor, backward,
+                            lambda row: f"{row['score']!r}:{row['id']}")
+        for row in page['results']:
+            row.pop('score')
+        return page
+    
+    def get_quotes_by_tag(self, tag: str, limit: int = 5) -> List[Dict]:
+        """Newest quotes with the given tag"""
+        return self.get_quotes_by_tags([tag], limit)
+    
+    def get_quotes_by_tags(self, tags: List[str], limit: int = 5) -> List[Dict]:
+        """Newest quotes that have every one of the given tags"""
+        return self.get_quotes_by_tags_page(tags, page_size=limit)['results']
+    
+    def get_quotes_by_tags_page(self, tags: List[str], cursor: str = None, page_size: int = 5,
+                                backward: bool = False) -> Dict:
+        """Keyset page of get_quotes_by_tags, newest first (same shape as search_quotes_page)"""
+        tags = normalize_tags(tags)
+        if not tags:
+            return {'results': [], 'next_cursor': None, 'prev_cursor': None}
+        
+        sql = f'''
+            SELECT * FROM quotes WHERE id IN (
+                SELECT quote_id FROM quote_tags
+                WHERE tag IN ({', '.join('?' * len(tags))})
+                GROUP BY quote_id HAVING COUNT(*) = ?
+            )
+        '''
+        params = [*tags, len(tags)]
+        
+        after, order = ('>', 'ASC') if backward else ('<', 'DESC')
+        if cursor:
+            sql += f" AND id {after} ?"
+            params.append(int(cursor))
+        sql += f" ORDER BY id {order} LIMIT ?"
+        params.append(page_size + 1)
+        
+        db_cursor = self.conn.cursor()
+        db_cursor.execute(sql, params)
+        rows = [dict(row) for row in db_cursor.fetchall()]
+        return _keyset_page(rows, page_size, cursor, backward, lambda row: str(row['id']))
+    
+    def get_tag_cloud(self, limit: int = 30) -> List[Dict]:
+        """Most used tags with their quote counts ({'tag', 'count'}), most frequent first"""
         cursor = self.conn.cursor()
-        search_pattern = f'%{query}%'
         cursor.execute('''
-            SELECT * FROM quotes 
-            WHERE author LIKE ? OR text LIKE ?
-            ORDER BY used_count ASC
-            LIMIT ?
-        ''', (search_pattern, search_pattern, limit))
+            SELECT tag, COUNT(*) AS count FROM quote_tags
+            GROUP BY tag ORDER BY count DESC, tag LIMIT ?
+        ''', (limit,))
         return [dict(row) for row in cursor.fetchall()]
     
     def get_user_favorites(self, user_id: int) -> List[Dict]:
@@ -140,112 +1032,332 @@ class QuoteDatabase:
         ''', (user_id,))
         return [dict(row) for row in cursor.fetchall()]
     
+    def get_user_favorites_page(self, user_id: int, cursor: str = None,
+                                page_size: int = 5, backward: bool = False) -> Dict:
+        """
+        One page of a user's favorites, newest first.
+        
+        Same contract as search_quotes_page. Cursors are '<unix time>:<row id>'
+        of the favorite, short enough for callback_data.
+        """
+        sql = '''
+            SELECT q.*, CAST(strftime('%s', uf.created_at) AS INTEGER) AS fav_time, uf.id AS fav_id
+            FROM user_favorites uf
+            JOIN quotes q ON q.id = uf.quote_id
+            WHERE uf.user_id = ?
+        '''
+        params = [user_id]
+        
+        before, order = ('>', 'ASC') if backward else ('<', 'DESC')
+        if cursor:
+            fav_time, fav_id = cursor.split(':')
+            sql += f" AND (uf.created_at, uf.id) {before} (datetime(?, 'unixepoch'), ?)"
+            params += [int(fav_time), int(fav_id)]
+        
+        sql += f" ORDER BY uf.created_at {order}, uf.id {order} LIMIT ?"
+        params.append(page_size + 1)
+        
+        db_cursor = self.conn.cursor()
+        db_cursor.execute(sql, params)
+        rows = [dict(row) for row in db_cursor.fetchall()]
+        
+        page = _keyset_page(rows, page_size, cursor, backward,
+                            lambda row: f"{row['fav_time']}:{row['fav_id']}")
+        for row in page['results']:
+            del row['fav_time'], row['fav_id']
+        return page
+    
     def add_to_favorites(self, user_id: int, quote_id: int) -> bool:
         """Add quote to user's favorites"""
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute('''
-                INSERT INTO user_favorites (user_id, quote_id)
+        with self.pool.writer() as conn:
+            cursor = conn.execute('''
+                INSERT OR IGNORE INTO user_favorites (user_id, quote_id)
                 VALUES (?, ?)
             ''', (user_id, quote_id))
-            self.conn.commit()
-            return True
-        except sqlite3.IntegrityError:
-            return False  # Already in favorites
+            return cursor.rowcount > 0  # 0 if already in favorites
     
     def get_daily_stats(self) -> Dict:
         """Get daily statistics"""
-        cursor = self.conn.cursor()
-        
-        # Total quotes
-        cursor.execute("SELECT COUNT(*) as total FROM quotes")
-        total = cursor.fetchone()['total']
-        
-        # Available quotes (not used today)
-        cursor.execute('''
-            SELECT COUNT(*) as available FROM quotes 
-            WHERE date(last_used_at) != date('now') OR last_used_at IS NULL
-        ''')
-        available = cursor.fetchone()['available']
-        
-        # Used today
-        cursor.execute('''
-            SELECT COUNT(*) as used_today FROM quotes 
-            WHERE date(last_used_at) = date('now')
-        ''')
-        used_today = cursor.fetchone()['used_today']
+        counters = self._read_stats_counters()
+        total = counters.get('total_quotes', 0)
+        used_today = counters.get('today_used', 0)
         
         return {
             'total': total,
-            'available': available,
+            'available': total - used_today,  # not used today
             'used_today': used_today,
-            'manual_requests': 0  # Can be tracked separately
+            'manual_requests': counters.get('today_manual_requests', 0)
         }
     
-    def get_next_quote(self) -> Optional[Dict]:
-        """Get next quote for scheduled posting"""
+    def record_manual_request(self):
+        """Count a user's quote request (button or command) for today's stats"""
+        self.record_manual_requests({None: 1})
+    
+    def record_manual_requests(self, counts: Dict[Optional[str], int]):
+        """Add buffered user quote request counts per day (YYYY-MM-DD, None = today)"""
+        with self.pool.writer() as conn:
+            conn.executemany('''
+                INSERT INTO stats_counters (day, name, value)
+                VALUES (coalesce(?, date('now')), 'manual_requests', ?)
+                ON CONFLICT (day, name) DO UPDATE SET value = value + excluded.value
+            ''', list(counts.items()))
+    
+    def log_usage_events(self, events: List[tuple]):
+        """Append (quote_id, used_at, context) events to usage_stats in one transaction"""
+        with self.pool.writer() as conn:
+            conn.executemany(
+                "INSERT INTO usage_stats (quote_id, used_at, context) VALUES (?, ?, ?)",
+                events
+            )
+    
+    def rollup_usage(self) -> int:
+        """Fold usage events logged since the last run into usage_hourly/usage_daily"""
+        with self.pool.writer() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT s.last_event_id AS start, coalesce(max(u.id), s.last_event_id) AS stop
+                FROM usage_rollup_state s LEFT JOIN usage_stats u ON u.id > s.last_event_id
+                WHERE s.id = 1
+            ''')
+            row = cursor.fetchone()
+            start, stop = row['start'], row['stop']
+            if stop == start:
+                return 0
+            
+            for table, period in (('usage_hourly', "strftime('%Y-%m-%d %H:00', used_at)"),
+                                  ('usage_daily', 'date(used_at)')):
+                cursor.execute(f'''
+                    INSERT INTO {table}
+                    SELECT {period}, quote_id, coalesce(context, ''), COUNT(*) FROM usage_stats
+                    WHERE id > ? AND id <= ?
+                    GROUP BY 1, 2, 3
+                    ON CONFLICT DO UPDATE SET events = events + excluded.events
+                ''', (start, stop))
+            cursor.execute("UPDATE usage_rollup_state SET last_event_id = ? WHERE id = 1", (stop,))
+            return stop - start
+    
+    def get_quote_usage(self, quote_id: int, days: int = 30) -> Dict[str, int]:
+        """Events per day for one quote over the last days (from the daily rollup)"""
         cursor = self.conn.cursor()
         cursor.execute('''
-            SELECT * FROM quotes 
-            WHERE date(last_used_at) != date('now') OR last_used_at IS NULL
-            ORDER BY used_count ASC, RANDOM()
-            LIMIT 1
-        ''')
-        row = cursor.fetchone()
+            SELECT day, SUM(events) AS events FROM usage_daily
+            WHERE quote_id = ? AND day >= date('now', ?)
+            GROUP BY day ORDER BY day
+        ''', (quote_id, f'-{days} days'))
+        return {row['day']: row['events'] for row in cursor.fetchall()}
+    
+    def get_top_quotes(self, days: int = 7, limit: int = 10) -> List[Dict]:
+        """Most used quotes over the last days, with their event counts"""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT q.*, t.events FROM (
+                SELECT quote_id, SUM(events) AS events FROM usage_daily
+                WHERE day >= date('now', ?)
+                GROUP BY quote_id ORDER BY events DESC LIMIT ?
+            ) t JOIN quotes q ON q.id = t.quote_id
+            ORDER BY t.events DESC
+        ''', (f'-{days} days', limit))
+        return [dict(row) for row in cursor.fetchall()]
+    
+    def get_hourly_usage(self, hours: int = 24) -> Dict[str, Dict[str, int]]:
+        """Events per hour and context over the last hours (from the hourly rollup)"""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT hour, context, SUM(events) AS events FROM usage_hourly
+            WHERE hour >= strftime('%Y-%m-%d %H:00', 'now', ?)
+            GROUP BY hour, context ORDER BY hour
+        ''', (f'-{hours} hours',))
+        result = {}
+        for row in cursor.fetchall():
+            result.setdefault(row['hour'], {})[row['context']] = row['events']
+        return result
+    
+    def record_api_usage(self, rows: List[Dict]):
+        """Add drained ApiMetrics rows to the hourly api_usage / api_latency counters"""
+        with self.pool.writer() as conn:
+            conn.executemany('''
+                INSERT INTO api_usage (hour, method, requests, failures, prompt_tokens,
+                                       completion_tokens, latency_ms, wait_ms)
+                VALUES (:hour, :method, :requests, :failures, :prompt_tokens,
+                        :completion_tokens, :latency_ms, :wait_ms)
+                ON CONFLICT DO UPDATE SET
+                    requests = requests + excluded.requests,
+                    failures = failures + excluded.failures,
+                    prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+                    completion_tokens = completion_tokens + excluded.completion_tokens,
+                    latency_ms = latency_ms + excluded.latency_ms,
+                    wait_ms = wait_ms + excluded.wait_ms
+            ''', rows)
+            conn.executemany('''
+                INSERT INTO api_latency (hour, method, le_ms, requests) VALUES (?, ?, ?, ?)
+                ON CONFLICT DO UPDATE SET requests = requests + excluded.requests
+            ''', [(row['hour'], row['method'], le_ms, count)
+                  for row in rows for le_ms, count in row['histogram'].items()])
+    
+    def get_api_usage(self, hours: int = 24) -> Dict[str, Dict]:
+        """Per-method DeepSeek requests, tokens and latency (average, p50/p95 bucket bounds) over the last hours"""
+        since = (f'-{hours} hours',)
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT method, SUM(requests) AS requests, SUM(failures) AS failures,
+                   SUM(prompt_tokens) AS prompt_tokens, SUM(completion_tokens) AS completion_tokens,
+                   SUM(latency_ms) AS latency_ms, SUM(wait_ms) AS wait_ms
+            FROM api_usage WHERE hour >= strftime('%Y-%m-%d %H:00', 'now', ?)
+            GROUP BY method ORDER BY method
+        ''', since)
+        result = {}
+        for row in cursor.fetchall():
+            requests = row['requests'] or 1
+            result[row['method']] = {
+                'requests': row['requests'],
+                'failures': row['failures'],
+                'prompt_tokens': row['prompt_tokens'],
+                'completion_tokens': row['completion_tokens'],
+                'avg_latency_ms': round(row['latency_ms'] / requests),
+                'avg_wait_ms': round(row['wait_ms'] / requests),
+            }
         
-        if row:
-            quote = dict(row)
+        # Slowest bucket (-1) sorts last
+        cursor.execute('''
+            SELECT method, le_ms, SUM(requests) AS requests
+            FROM api_latency WHERE hour >= strftime('%Y-%m-%d %H:00', 'now', ?)
+            GROUP BY method, le_ms ORDER BY method, le_ms = -1, le_ms
+        ''', since)
+        histograms: Dict[str, List] = {}
+        for row in cursor.fetchall():
+            histograms.setdefault(row['method'], []).append((row['le_ms'], row['requests']))
+        for method, buckets in histograms.items():
+            if method not in result:
+                continue
+            total = sum(count for _, count in buckets)
+            for name, quantile in (('p50_ms', 0.5), ('p95_ms', 0.95)):
+                seen = 0
+                for le_ms, count in buckets:
+                    seen += count
+                    if seen >= quantile * total:
+                        result[method][name] = le_ms
+                        break
+        return result
+    
+    def get_next_quote(self) -> Optional[Dict]:
+        """Get next quote for scheduled posting (no repeats until the deck cycles)"""
+        with self.pool.writer() as conn:
+            cursor = conn.cursor()
+            
+            # Everything already posted today -> let the caller fall back to AI
+            cursor.execute('''
+                SELECT 1 FROM quotes
+                WHERE last_used_day IS NULL OR last_used_day < date('now')
+                LIMIT 1
+            ''')
+            if not cursor.fetchone():
+                return None
+            
+            refilled = False
+            while True:
+                pos = self._claim_from_deck(cursor)
+                if pos is None:
+                    if refilled:
+                        return None
+                    self._refill_rotation_deck(cursor)
+                    refilled = True
+                    continue
+                
+                cursor.execute('''
+                    SELECT q.*, coalesce(q.last_used_day >= date('now'), 0) AS used_today
+                    FROM rotation_deck d JOIN quotes q ON q.id = d.quote_id
+                    WHERE d.pos = ?
+                ''', (pos,))
+                quote = dict(cursor.fetchone())
+                
+                # Posted today at the end of the previous cycle: skip it this time
+                if not quote.pop('used_today'):
+                    break
+            
             # Mark as used
             cursor.execute('''
                 UPDATE quotes 
-                SET used_count = used_count + 1, last_used_at = CURRENT_TIMESTAMP
+                SET used_count = used_count + 1,
+                    last_used_at = CURRENT_TIMESTAMP,
+                    last_used_day = date('now')
                 WHERE id = ?
             ''', (quote['id'],))
-            self.conn.commit()
-            return quote
-        
-        return None
+        if self.pool.corpus is not None:
+            self.pool.corpus.mark_used(quote['id'])
+        return quote
     
     def is_quote_similar(self, text: str, threshold: float = 0.85) -> bool:
         """Check if similar quote exists in database"""
+        keys = lsh_keys(text)
         cursor = self.conn.cursor()
-        cursor.execute("SELECT text FROM quotes")
-        existing_quotes = [row['text'] for row in cursor.fetchall()]
-        
-        for existing in existing_quotes:
-            # Check exact match first (normalized)
-            if text.strip().lower() == existing.strip().lower():
-                return True
-                
-            # Check similarity
-            ratio = difflib.SequenceMatcher(None, text, existing).ratio()
-            if ratio > threshold:
-                return True
-                
-        return False
+        cursor.execute(f'''
+            SELECT text FROM quotes WHERE id IN (
+                SELECT quote_id FROM quote_lsh WHERE key IN ({', '.join('?' * len(keys))})
+            )
+        ''', keys)
+        return any(texts_similar(text, row['text'], threshold) for row in cursor.fetchall())
 
-    def generate_and_save_ai_quote(self, topic: str = None, style: str = None) -> Optional[Dict]:
-        """Generate and save AI quote (with duplicate check)"""
-        if not deepseek_gen.enabled:
-            print("⚠️  AI generation disabled")
+    def generate_and_save_ai_quote(self, topic: str = None, style: str = None,
+                                   deadline: float = None, priority: int = PRIORITY_NORMAL) -> Optional[Dict]:
+        """Save an AI quote from the reserve, or generate one now (with duplicate check)"""
+        if not topic and not style:
+            quote = self.claim_reserved_ai_quote()
+            if quote:
+                return quote
+        
+        quote_data = self.generate_unique_ai_quote(topic, style, deadline, priority)
+        if not quote_data:
+            return None
+        return self.save_ai_quote(quote_data)
+    
+    def generate_unique_ai_quote(self, topic: str = None, style: str = None,
+                                 deadline: float = None, priority: int = PRIORITY_NORMAL) -> Optional[Dict]:
+        """
+        Generate an AI quote that is not similar to any stored quote (nothing is written).
+        
+        All attempts share one deadline (seconds, default: the generator's);
+        gives up at once when the API is unavailable instead of retrying.
+        priority is the rate limiter lane (rate_limiter.PRIORITY_*).
+        """
+        if not deepseek_gen.available:
+            print("⚠️  AI generation disabled or unavailable")
             return None
         
         max_retries = 3
+        budget = Deadline(deadline if deadline is not None else deepseek_gen.deadline)
         
         for attempt in range(max_retries):
+            if budget.expired:
+                break
             # Generate quote
-            quote_data = deepseek_gen.generate_motivational_quote(topic, style)
+            quote_data = deepseek_gen.generate_motivational_quote(topic, style, deadline=budget.remaining(),
+                                                                 priority=priority)
             
-            if not quote_data:
-                continue
+            # The generator's fallback means the API failed; retries were already made there
+            if not quote_data or quote_data.get('source') == 'fallback':
+                return None
                 
             # Check for duplicates
             if self.is_quote_similar(quote_data['text']):
                 print(f"♻️ Generated duplicate/similar quote, retrying... ({attempt + 1}/{max_retries})")
                 continue
             
-            # Save to database
-            cursor = self.conn.cursor()
+            return quote_data
+        
+        print("❌ Failed to generate unique quote after retries")
+        return None
+    
+    def save_ai_quote(self, quote_data: Dict) -> Optional[Dict]:
+        """Save a generated AI quote; returns None if a similar quote was saved meanwhile"""
+        quote_data['tags'] = normalize_tags(quote_data.get('tags'))
+        
+        with self.pool.writer() as conn:
+            # Checked under the write lock, so no other insert can slip in between
+            if self.is_quote_similar(quote_data['text']):
+                print("♻️ Similar quote was saved concurrently, skipping")
+                return None
+            
+            cursor = conn.cursor()
             cursor.execute('''
                 INSERT INTO quotes (text, author, category, tags, source, ai_model)
                 VALUES (?, ?, ?, ?, ?, ?)
@@ -253,39 +1365,129 @@ class QuoteDatabase:
                 quote_data['text'],
                 quote_data['author'],
                 quote_data['category'],
-                json.dumps(quote_data.get('tags', [])),
+                json.dumps(quote_data['tags']),
                 'ai',
                 quote_data.get('ai_model', 'deepseek-chat')
             ))
             
             quote_id = cursor.lastrowid
-            self.conn.commit()
+            self._index_quote_similarity(cursor, quote_id, quote_data['text'])
+        self.quotes_changed(added=[quote_id])
+        
+        quote_data['id'] = quote_id
+        quote_data['used_count'] = 0
+        print(f"✅ AI quote saved with ID: {quote_id}")
+        
+        return quote_data
+    
+    def save_ai_quotes(self, quotes: List[Dict], threshold: float = 0.85) -> List[Dict]:
+        """Save a batch of generated quotes in one transaction, skipping near-duplicates; returns saved ones"""
+        quotes = [q for q in quotes if q.get('text')]
+        if not quotes:
+            return []
+        for quote_data in quotes:
+            quote_data['tags'] = normalize_tags(quote_data.get('tags'))
+        # MinHash is computed before taking the write lock
+        keys = [lsh_keys(q['text']) for q in quotes]
+        
+        with self.pool.writer() as conn:
+            cursor = conn.cursor()
+            accepted = filter_similar(cursor, [q['text'] for q in quotes], keys, threshold)
+            saved = []
+            for index in accepted:
+                quote_data = quotes[index]
+                cursor.execute('''
+                    INSERT INTO quotes (text, author, category, tags, source, ai_model)
+                    VALUES (?, ?, ?, ?, 'ai', ?)
+                ''', (
+                    quote_data['text'],
+                    quote_data['author'],
+                    quote_data['category'],
+                    json.dumps(quote_data['tags']),
+                    quote_data.get('ai_model', 'deepseek-chat')
+                ))
+                quote_data['id'] = cursor.lastrowid
+                quote_data['used_count'] = 0
+                saved.append(quote_data)
+            cursor.executemany(
+                "INSERT OR IGNORE INTO quote_lsh (key, quote_id) VALUES (?, ?)",
+                [(key, quotes[index]['id']) for index in accepted for key in keys[index]]
+            )
+        if saved:
+            self.quotes_changed(added=[q['id'] for q in saved])
+            print(f"✅ AI batch saved: {len(saved)} of {len(quotes)} quotes")
+        return saved
+    
+    def reserve_size(self) -> int:
+        """Number of ready quotes in the AI reserve"""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT COUNT(*) AS size FROM ai_quote_reserve WHERE status = 'ready'")
+        return cursor.fetchone()['size']
+    
+    def add_to_reserve(self, quote_data: Dict) -> bool:
+        """Store a generated quote in the reserve unless it duplicates a saved or reserved one"""
+        tags = normalize_tags(quote_data.get('tags'))
+        with self.pool.writer() as conn:
+            if self.is_quote_similar(quote_data['text']):
+                return False
+            reserved = conn.execute("SELECT text FROM ai_quote_reserve WHERE status = 'ready'").fetchall()
+            if any(texts_similar(quote_data['text'], row['text']) for row in reserved):
+                return False
             
-            quote_data['id'] = quote_id
-            quote_data['used_count'] = 0
-            print(f"✅ AI quote saved with ID: {quote_id}")
+            conn.execute('''
+                INSERT INTO ai_quote_reserve (text, author, category, tags, ai_model)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (
+                quote_data['text'],
+                quote_data['author'],
+                quote_data['category'],
+                json.dumps(tags),
+                quote_data.get('ai_model', 'deepseek-chat')
+            ))
+        return True
+    
+    def claim_reserved_ai_quote(self) -> Optional[Dict]:
+        """Save the oldest reserved quote (no API call); None if the reserve is empty"""
+        while True:
+            # Claimed in its own transaction so save_ai_quote commits (and runs its hooks) normally
+            with self.pool.writer() as conn:
+                row = conn.execute('''
+                    UPDATE ai_quote_reserve SET status = 'claimed', updated_at = CURRENT_TIMESTAMP
+                    WHERE id = (SELECT id FROM ai_quote_reserve WHERE status = 'ready' ORDER BY id LIMIT 1)
+                    RETURNING *
+                ''').fetchone()
+            if not row:
+                return None
             
-            return quote_data
-        
-        print("❌ Failed to generate unique quote after retries")
-        return None
+            # Re-checked: quotes may have been added since it was generated
+            quote = self.save_ai_quote({
+                'text': row['text'],
+                'author': row['author'],
+                'category': row['category'],
+                'tags': _load_tags(row['tags']),
+                'ai_model': row['ai_model'],
+                'source': 'ai'
+            })
+            with self.pool.writer() as conn:
+                conn.execute('''
+                    UPDATE ai_quote_reserve
+                    SET status = ?, quote_id = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                ''', ('used' if quote else 'rejected', quote['id'] if quote else None, row['id']))
+            if quote:
+                return quote
     
     def get_ai_generation_stats(self) -> Dict:
         """Get AI generation statistics"""
-        cursor = self.conn.cursor()
+        counters = self._read_stats_counters()
         
-        cursor.execute("SELECT COUNT(*) as total FROM quotes WHERE source = 'ai'")
-        total_ai = cursor.fetchone()['total']
-        
-        cursor.execute("SELECT COUNT(*) as today FROM quotes WHERE source = 'ai' AND date(created_at) = date('now')")
-        today_ai = cursor.fetchone()['today']
-        
-        cursor.execute("SELECT COUNT(DISTINCT ai_model) as models FROM quotes WHERE source = 'ai' AND ai_model IS NOT NULL")
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT COUNT(*) as models FROM stats_ai_models WHERE quotes > 0")
         models = cursor.fetchone()['models']
         
         return {
-            'total_ai_quotes': total_ai,
-            'today_ai_quotes': today_ai,
+            'total_ai_quotes': counters.get('total_ai_quotes', 0),
+            'today_ai_quotes': counters.get('today_ai_generated', 0),
             'ai_models_used': models,
             'ai_enabled': deepseek_gen.enabled
         }
@@ -304,30 +1506,44 @@ class QuoteDatabase:
                 return quote_data
             else:
                 # If AI failed, get any old quote
-                cursor = self.conn.cursor()
-                cursor.execute('''
-                    SELECT * FROM quotes 
-                    ORDER BY used_count ASC, RANDOM()
-                    LIMIT 1
-                ''')
-                fallback = cursor.fetchone()
-                return dict(fallback) if fallback else None
+                return self.get_least_used_quote()
         
         return quote
     
-    def add_quote(self, text: str, author: str, category: str, tags: List[str] = None) -> int:
-        """Add a new quote manually"""
+    def get_least_used_quote(self) -> Optional[Dict]:
+        """Random quote among the least posted ones (last resort, so a full scan is fine)"""
         cursor = self.conn.cursor()
         cursor.execute('''
-            INSERT INTO quotes (text, author, category, tags, source)
-            VALUES (?, ?, ?, ?, 'manual')
-        ''', (text, author, category, json.dumps(tags or [])))
-        
-        quote_id = cursor.lastrowid
-        self.conn.commit()
+            SELECT * FROM quotes 
+            ORDER BY used_count ASC, RANDOM()
+            LIMIT 1
+        ''')
+        fallback = cursor.fetchone()
+        return dict(fallback) if fallback else None
+    
+    def add_quote(self, text: str, author: str, category: str, tags: List[str] = None) -> int:
+        """Add a new quote manually"""
+        with self.pool.writer() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO quotes (text, author, category, tags, source)
+                VALUES (?, ?, ?, ?, 'manual')
+            ''', (text, author, category, json.dumps(normalize_tags(tags))))
+            
+            quote_id = cursor.lastrowid
+            self._index_quote_similarity(cursor, quote_id, text)
+        self.quotes_changed(added=[quote_id])
         return quote_id
     
+    def delete_quote(self, quote_id: int) -> bool:
+        """Delete a quote together with its favorites"""
+        with self.pool.writer() as conn:
+            conn.execute("DELETE FROM user_favorites WHERE quote_id = ?", (quote_id,))
+            deleted = conn.execute("DELETE FROM quotes WHERE id = ?", (quote_id,)).rowcount > 0
+        if deleted:
+            self.quotes_changed(deleted=[quote_id])
+        return deleted
+    
     def close(self):
-        """Close database connection"""
-        if self.conn:
-            self.conn.close()
\ No newline at end of file
+        """Close the shared pool (call once, on shutdown)"""
+        self.pool.close()
\ No newline at end of file
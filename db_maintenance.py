@@ -0,0 +1,128 @@
+"""
+Periodic database maintenance: retention, compaction and vacuum.
+
+Old rows are deleted in small write transactions (the write lock is released
+between batches, so bot writes interleave with the job). Deleted interactions
+are appended to gzipped JSONL archives first; the ones the bot checks before
+acting (DEDUPE_INTERACTIONS) are never deleted. Raw usage events are only
+pruned once they are counted in the rollups, which are the long-term record.
+Freed pages are returned to the OS with incremental_vacuum (new databases
+are created with auto_vacuum=INCREMENTAL; an older file is switched by one
+full VACUUM on its first maintenance run, not at bot startup).
+"""
+import os
+import gzip
+import json
+import time
+import logging
+from typing import Dict, Optional
+
+from database import QuoteDatabase
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERACTIONS_DAYS = 365
+# Looked up by is_interaction_processed before replying/following: deleting one
+# (and the Bloom filter rebuilt from the table) would let the bot act again on
+# a comment or user still in the polled window
+DEDUPE_INTERACTIONS = ('comment_reply', 'dm_reply', 'follow')
+DEFAULT_USAGE_DAYS = 90
+BATCH_SIZE = 1000
+VACUUM_PAGES = 2000
+# Pause between batches so queued writers get the lock
+BATCH_PAUSE = 0.05
+
+
+def _archive(archive_dir: Optional[str], table: str, rows) -> None:
+    """Append deleted rows to <archive_dir>/<table>-<YYYY-MM>.jsonl.gz"""
+    if not archive_dir or not rows:
+        return
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"{table}-{time.strftime('%Y-%m', time.gmtime())}.jsonl.gz")
+    with gzip.open(path, 'at', encoding='utf-8') as f:
+        for row in rows:
+            f.write(json.dumps(dict(row), ensure_ascii=False) + '\n')
+
+
+def _prune(db: QuoteDatabase, table: str, where: str, params: tuple,
+           archive_dir: Optional[str] = None, batch_size: int = BATCH_SIZE) -> int:
+    """Delete matching rows batch by batch, archiving each batch; returns rows deleted"""
+    deleted = 0
+    while True:
+        with db.pool.writer() as conn:
+            rows = conn.execute(f'''
+                DELETE FROM {table} WHERE id IN (
+                    SELECT id FROM {table} WHERE {where} ORDER BY id LIMIT ?
+                )
+                RETURNING *
+            ''', (*params, batch_size)).fetchall()
+            # Written before commit: a failed archive rolls the batch back
+            _archive(archive_dir, table, rows)
+        deleted += len(rows)
+        if len(rows) < batch_size:
+            return deleted
+        time.sleep(BATCH_PAUSE)
+
+
+def prune_interactions(db: QuoteDatabase, days: int = DEFAULT_INTERACTIONS_DAYS,
+                       archive_dir: Optional[str] = 'archive') -> int:
+    """Archive and delete interactions older than days, except DEDUPE_INTERACTIONS"""
+    kept = ', '.join('?' * len(DEDUPE_INTERACTIONS))
+    return _prune(db, 'interactions', f"created_at < datetime('now', ?) AND interaction_type NOT IN ({kept})",
+                  (f'-{days} days', *DEDUPE_INTERACTIONS), archive_dir)
+
+
+def prune_usage(db: QuoteDatabase, days: int = DEFAULT_USAGE_DAYS) -> int:
+    """Delete raw usage events (already rolled up) and hourly rollups/API counters older than days"""
+    deleted = _prune(db, 'usage_stats', '''
+        used_at < datetime('now', ?)
+        AND id <= (SELECT last_event_id FROM usage_rollup_state WHERE id = 1)
+    ''', (f'-{days} days',))
+
+    # Daily rollups are kept; hourly ones are only useful for recent telemetry
+    with db.pool.writer() as conn:
+        for table in ('usage_hourly', 'api_usage', 'api_latency'):
+            deleted += conn.execute(
+                f"DELETE FROM {table} WHERE hour < strftime('%Y-%m-%d %H:00', 'now', ?)",
+                (f'-{days} days',)
+            ).rowcount
+    return deleted
+
+
+def prune_ai_reserve(db: QuoteDatabase, days: int = DEFAULT_USAGE_DAYS) -> int:
+    """Delete used/rejected AI reserve entries older than days (ready ones are kept)"""
+    return _prune(db, 'ai_quote_reserve', "status IN ('used', 'rejected') AND updated_at < datetime('now', ?)",
+                  (f'-{days} days',))
+
+
+def vacuum(db: QuoteDatabase, max_pages: int = VACUUM_PAGES) -> int:
+    """Release free pages (in max_pages steps), refresh planner stats, trim caches; returns pages freed"""
+    if db.pool.enable_incremental_vacuum():
+        logger.info("Database switched to auto_vacuum=INCREMENTAL (one-time full VACUUM)")
+    freed = 0
+    while True:
+        step = db.pool.incremental_vacuum(max_pages)
+        freed += step
+        if step < max_pages:
+            break
+        time.sleep(BATCH_PAUSE)
+
+    with db.pool.writer() as conn:
+        conn.execute("PRAGMA optimize")
+    db.pool.checkpoint()
+    return freed
+
+
+def run_maintenance(db: QuoteDatabase, interactions_days: int = DEFAULT_INTERACTIONS_DAYS,
+                    usage_days: int = DEFAULT_USAGE_DAYS, archive_dir: Optional[str] = 'archive') -> Dict:
+    """Full maintenance pass; returns what was done"""
+    # Count pending events first so pruning never drops unrolled ones
+    db.rollup_usage()
+    stats = {
+        'interactions_pruned': prune_interactions(db, interactions_days, archive_dir),
+        'usage_pruned': prune_usage(db, usage_days),
+        'ai_reserve_pruned': prune_ai_reserve(db, usage_days),
+    }
+    stats['pages_freed'] = vacuum(db)
+    logger.info(f"Database maintenance: {stats}")
+    return stats
@@ -0,0 +1,178 @@
+import os
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+# Connection tuning shared by every connection in the pool
+PRAGMAS = {
+    'synchronous': 'NORMAL',       # safe with WAL, avoids an fsync per commit
+    'cache_size': -16000,          # 16 MB page cache per connection
+    'mmap_size': 268435456,        # 256 MB memory-mapped reads
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000,          # ms to wait for another process' lock
+}
+
+# Minimum seconds between two changed_elsewhere() checks
+CHANGE_CHECK_INTERVAL = 1.0
+
+
+class ConnectionPool:
+    """
+    Process-wide SQLite connections for one database file.
+
+    The database runs in WAL mode so readers never wait for the writer.
+    Every thread gets its own read connection; all writes go through one
+    write connection guarded by a lock (see writer()).
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._write_lock = threading.RLock()
+        self.schema_ready = False
+
+        # In-memory category catalog shared by every QuoteDatabase handle
+        # (see QuoteDatabase.get_category_catalog); bump the version to invalidate
+        self.catalog_version = 0
+        self.catalog = None
+        # interaction_filter.InteractionFilter over the interactions table (built on first use)
+        self.interactions = None
+        # quote_cache.QuoteCorpus snapshot, if some handle asked for it (cache_corpus=True)
+        self.corpus = None
+
+        self._write_conn = self._connect()
+        # Freed pages are returned by incremental_vacuum (see db_maintenance).
+        # Applies to new files; existing ones switch in enable_incremental_vacuum().
+        self._write_conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self._write_conn.execute("PRAGMA journal_mode=WAL")
+
+        # The writer's data_version moves only on commits by other connections
+        self._data_version = self._write_conn.execute("PRAGMA data_version").fetchone()[0]
+        self._change_checked_at = time.monotonic()
+        self.change_check_interval = CHANGE_CHECK_INTERVAL
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        for name, value in PRAGMAS.items():
+            conn.execute(f"PRAGMA {name}={value}")
+        with self._connections_lock:
+            self._connections.append(conn)
+        return conn
+
+    def reader(self) -> sqlite3.Connection:
+        """Read connection owned by the current thread (autocommit)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """
+        Exclusive write transaction.
+
+        Commits when the block exits normally, rolls back on exception.
+        Nested use from the same thread joins the outer transaction.
+        """
+        with self._write_lock:
+            conn = self._write_conn
+            if conn.in_transaction:
+                yield conn
+                return
+
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def enable_incremental_vacuum(self) -> bool:
+        """
+        Switch a file created without auto_vacuum=INCREMENTAL with a full
+        VACUUM (rewrites the whole database under the write lock); True if it ran
+        """
+        with self._write_lock:
+            conn = self._write_conn
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+                return False
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.execute("VACUUM")
+            return True
+
+    def changed_elsewhere(self) -> bool:
+        """
+        True (once) if another process, e.g. quote_io, committed to the file
+        since the last call. Checked at most every change_check_interval
+        seconds, and skipped while a write of this process holds the lock.
+        """
+        now = time.monotonic()
+        if now - self._change_checked_at < self.change_check_interval:
+            return False
+        if not self._write_lock.acquire(blocking=False):
+            return False
+        try:
+            self._change_checked_at = now
+            version = self._write_conn.execute("PRAGMA data_version").fetchone()[0]
+            changed, self._data_version = version != self._data_version, version
+            return changed
+        finally:
+            self._write_lock.release()
+
+    def incremental_vacuum(self, pages: int) -> int:
+        """Return up to pages free pages to the OS; returns how many were freed"""
+        with self._write_lock:
+            conn = self._write_conn
+            before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            # executescript steps the pragma to completion (execute() frees one page)
+            conn.executescript(f"PRAGMA incremental_vacuum({int(pages)})")
+            return before - conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+    def checkpoint(self):
+        """Move the WAL into the main file, truncate it and trim the writer's page cache"""
+        with self._write_lock:
+            try:
+                self._write_conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                self._write_conn.execute("PRAGMA shrink_memory")
+            except sqlite3.Error:
+                pass
+
+    def close(self):
+        """Checkpoint the WAL back into the main file and close every connection"""
+        with self._write_lock:
+            self.checkpoint()
+            with self._connections_lock:
+                for conn in self._connections:
+                    conn.close()
+                self._connections.clear()
+            self._local = threading.local()
+
+        with _pools_lock:
+            if _pools.get(self._key()) is self:
+                del _pools[self._key()]
+
+    def _key(self) -> str:
+        return os.path.abspath(self.db_path)
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: str = 'quotes.db') -> ConnectionPool:
+    """Shared pool for a database file (created on first use)"""
+    key = os.path.abspath(db_path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(db_path)
+            _pools[key] = pool
+        return pool
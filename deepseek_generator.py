@@ -1,18 +1,115 @@
 # deepseek_generator.py
 import os
+import re
 import json
 import random
-import requests
+import asyncio
+import time
+import threading
+import httpx
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
 from dotenv import load_dotenv
+from resilience import CircuitBreaker, Deadline, backoff_delay, retry_after
+from rate_limiter import PRIORITY_BACKGROUND, PRIORITY_NORMAL, RateLimiter
+from api_metrics import ApiMetrics
 
 load_dotenv()
 
+SYSTEM_PROMPT = 'Ты помощник, генерирующий уникальные мотивационные цитаты. Отвечай на русском языке.'
+
+REPLY_SYSTEM_PROMPT = (
+    "Ты - мудрый и дружелюбный бот, который публикует мотивационные цитаты. "
+    "Твоя задача - отвечать на комментарии или сообщения пользователей. "
+    "Ответ должен быть кратким (не более 15 слов), вежливым и вдохновляющим. "
+    "Используй эмодзи. Не используй хештеги."
+)
+FALLBACK_REPLY = "Спасибо за ваш отклик! 🙏"
+
+# Responses worth retrying: rate limited or server-side trouble
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Rough prompt size estimate for the limiter (Cyrillic text runs ~3 characters per token);
+# the reservation is corrected with the real usage once the response arrives
+CHARS_PER_TOKEN = 3
+DEFAULT_COMPLETION_TOKENS = 500
+
+
+def _estimate_tokens(payload: Dict) -> int:
+    """Tokens a request may use: its prompt plus the completion budget"""
+    prompt = sum(len(message['content']) for message in payload['messages'])
+    return prompt // CHARS_PER_TOKEN + 1 + payload.get('max_tokens', DEFAULT_COMPLETION_TOKENS)
+
+
+# Batch generation: quotes per request and the completion budget per quote
+MAX_BATCH_QUOTES = 20
+BATCH_TOKENS_PER_QUOTE = 120
+# Generated quotes outside these bounds (characters) are dropped
+QUOTE_MIN_LENGTH = 10
+QUOTE_MAX_LENGTH = 300
+
+# "key": "string value" of a JSON object, the value possibly still unterminated (streaming)
+JSON_STRING_FIELD = re.compile(r'"[^"\\]+"\s*:\s*"((?:[^"\\]|\\.)*)')
+
+
+def _json_string(body: str) -> str:
+    """Decode the inside of a JSON string that may end in the middle of an escape sequence"""
+    for candidate in (body, body[:body.rfind('\\')]):
+        try:
+            return json.loads(f'"{candidate}"')
+        except ValueError:
+            continue
+    return body
+
+
+def _json_preview(partial: str) -> str:
+    """Readable text of a JSON object that is still arriving: its string values so far, one per paragraph"""
+    values = [_json_string(match.group(1)) for match in JSON_STRING_FIELD.finditer(partial)]
+    return '\n\n'.join(value.strip() for value in values if value.strip())
+
+
+class StreamInterrupted(Exception):
+    """A streamed answer did not arrive complete (API unavailable, deadline, broken stream)"""
+
+
 class DeepSeekGenerator:
-    def __init__(self):
+    """
+    DeepSeek client.
+    
+    Every request goes through one pooled httpx.AsyncClient (keep-alive, at
+    most max_concurrency requests in flight) living on a private event loop
+    thread. agenerate_* coroutines can be awaited from any event loop; the
+    generate_* methods are blocking wrappers around them. Each takes an
+    end-to-end deadline (seconds, retries included); when it runs out or
+    the circuit breaker is open the method returns its fallback instead.
+    Given on_text, a method streams the answer (astream_deepseek_api) and
+    awaits on_text with the text so far while it arrives.
+    """
+    
+    def __init__(self, max_concurrency: int = None, timeout: float = None, deadline: float = None):
         self.api_key = os.getenv('DEEPSEEK_API_KEY')
         self.api_url = os.getenv('DEEPSEEK_API_URL', 'https://api.deepseek.com/v1/chat/completions')
+        self.max_concurrency = max_concurrency or int(os.getenv('DEEPSEEK_MAX_CONCURRENCY', '4'))
+        # timeout: one HTTP attempt; deadline: default budget of a whole call, retries included
+        self.timeout = timeout or float(os.getenv('DEEPSEEK_TIMEOUT', '30'))
+        self.deadline = deadline if deadline is not None else float(os.getenv('DEEPSEEK_DEADLINE', '60'))
+        self.max_retries = int(os.getenv('DEEPSEEK_MAX_RETRIES', '3'))
+        # Shared by all generate_* calls: in-flight slots, requests/min and tokens/min (0 = no limit)
+        self.limiter = RateLimiter(
+            requests_per_minute=float(os.getenv('DEEPSEEK_RPM', '60')),
+            tokens_per_minute=float(os.getenv('DEEPSEEK_TPM', '120000')),
+            max_concurrency=self.max_concurrency
+        )
+        self.metrics = ApiMetrics()
+        self.breaker = CircuitBreaker(
+            failure_threshold=int(os.getenv('DEEPSEEK_BREAKER_FAILURES', '5')),
+            reset_timeout=float(os.getenv('DEEPSEEK_BREAKER_RESET', '60'))
+        )
+        
+        # Created on first request (see _client_loop)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop_lock = threading.Lock()
         
         if not self.api_key:
             print("⚠️  DEEPSEEK_API_KEY не установлен. AI генерация отключена.")
@@ -62,8 +159,143 @@ class DeepSeekGenerator:
             "Дейл Карнеги", "Робин Шарма", "Экхарт Толле"
         ]
     
-    def generate_motivational_quote(self, topic: str = None, style: str = None) -> Dict:
+    @property
+    def available(self) -> bool:
+        """AI is configured and the circuit breaker lets calls through"""
+        return self.enabled and self.breaker.state != CircuitBreaker.OPEN
+    
+    # ==================== HTTP CLIENT ====================
+    
+    def _client_loop(self) -> asyncio.AbstractEventLoop:
+        """Event loop that owns the pooled client, started on first use"""
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='deepseek-http', daemon=True).start()
+                self._loop = loop
+            return self._loop
+    
+    def _run_sync(self, coro: Awaitable):
+        """Run a coroutine on the client loop and wait for it (blocking API)"""
+        return asyncio.run_coroutine_threadsafe(coro, self._client_loop()).result()
+    
+    async def _in_client_loop(self, coro: Awaitable):
+        """Await a coroutine that must run on the client loop from any other loop"""
+        loop = self._client_loop()
+        if asyncio.get_running_loop() is loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+    
+    def _http_client(self) -> httpx.AsyncClient:
+        """The pooled client, created on first use (on the client loop)"""
+        if self._client is None:
+            limits = httpx.Limits(max_connections=self.max_concurrency,
+                                  max_keepalive_connections=self.max_concurrency)
+            self._client = httpx.AsyncClient(
+                headers={'Authorization': f'Bearer {self.api_key}'},
+                limits=limits,
+                timeout=self.timeout
+            )
+        return self._client
+    
+    async def _post(self, payload: Dict, timeout: float = None, method: str = 'chat',
+                    priority: int = PRIORITY_NORMAL) -> Dict:
+        """POST to the API through the shared pool and rate limiter (runs on the client loop)"""
+        client = self._http_client()
+        reserved = _estimate_tokens(payload)
+        waited = await self.limiter.acquire(reserved, priority)
+        started = time.monotonic()
+        try:
+            response = await client.post(self.api_url, json=payload, timeout=timeout or self.timeout)
+            response.raise_for_status()
+            result = response.json()
+        except BaseException:
+            # Failed or cancelled: the tokens were (mostly) not spent
+            self.limiter.settle(reserved, 0)
+            self.metrics.record(method, time.monotonic() - started, waited, ok=False)
+            raise
+        finally:
+            self.limiter.release()
+        
+        usage = result.get('usage') or {}
+        prompt_tokens = usage.get('prompt_tokens', 0)
+        completion_tokens = usage.get('completion_tokens', 0)
+        self.limiter.settle(reserved, usage.get('total_tokens', prompt_tokens + completion_tokens) or reserved)
+        self.metrics.record(method, time.monotonic() - started, waited, ok=True,
+                            prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        return result
+    
+    async def _post_stream(self, payload: Dict, emit: Callable[[str], None], timeout: float = None,
+                           method: str = 'chat', priority: int = PRIORITY_NORMAL) -> str:
+        """
+        _post with stream=True (runs on the client loop): reads the server-sent
+        events and calls emit(delta) for every piece of content as it arrives;
+        returns the whole text. Raises StreamInterrupted if the stream breaks
+        after content was emitted (a retry would repeat it).
+        """
+        client = self._http_client()
+        reserved = _estimate_tokens(payload)
+        waited = await self.limiter.acquire(reserved, priority)
+        started = time.monotonic()
+        parts, usage = [], {}
+        try:
+            async with client.stream('POST', self.api_url, json=payload,
+                                     timeout=timeout or self.timeout) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.startswith('data:'):
+                        continue
+                    data = line[len('data:'):].strip()
+                    # The body ends right after [DONE]; read it out rather than leave the iterator unfinished
+                    if data == '[DONE]':
+                        continue
+                    event = json.loads(data)
+                    # With include_usage the last event carries the usage block and no choices
+                    usage = event.get('usage') or usage
+                    for choice in event.get('choices') or []:
+                        delta = (choice.get('delta') or {}).get('content')
+                        if delta:
+                            parts.append(delta)
+                            emit(delta)
+        except BaseException as e:
+            # Tokens streamed before the failure were spent
+            self.limiter.settle(reserved, reserved if parts else 0)
+            self.metrics.record(method, time.monotonic() - started, waited, ok=False)
+            if parts and isinstance(e, Exception):
+                raise StreamInterrupted(f"поток прерван: {e!r}") from e
+            raise
+        finally:
+            self.limiter.release()
+        
+        prompt_tokens = usage.get('prompt_tokens', 0)
+        completion_tokens = usage.get('completion_tokens', 0)
+        self.limiter.settle(reserved, usage.get('total_tokens', prompt_tokens + completion_tokens) or reserved)
+        self.metrics.record(method, time.monotonic() - started, waited, ok=True,
+                            prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        return ''.join(parts)
+    
+    def close(self):
+        """Close pooled connections and stop the client loop"""
+        with self._loop_lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        if self._client is not None:
+            asyncio.run_coroutine_threadsafe(self._client.aclose(), loop).result()
+            self._client = None
+        loop.call_soon_threadsafe(loop.stop)
+    
+    # ==================== GENERATION ====================
+    
+    def generate_motivational_quote(self, topic: str = None, style: str = None, deadline: float = None,
+                                    priority: int = PRIORITY_NORMAL) -> Dict:
         """Генерирует уникальную мотивационную цитату"""
+        return self._run_sync(self.agenerate_motivational_quote(topic, style, deadline, priority))
+    
+    async def agenerate_motivational_quote(self, topic: str = None, style: str = None,
+                                           deadline: float = None, priority: int = PRIORITY_NORMAL,
+                                           on_text: Callable[[str], Awaitable] = None) -> Dict:
+        """Асинхронный вариант generate_motivational_quote (on_text: показывать текст по мере генерации)"""
         if not self.enabled:
             return self._get_fallback_quote()
         
@@ -73,7 +305,12 @@ class DeepSeekGenerator:
         prompt = self._create_quote_prompt(topic, style)
         
         try:
-            response = self._call_deepseek_api(prompt)
+            if on_text:
+                response = await self._astream_text(prompt, on_text, deadline=deadline,
+                                                    method='motivational_quote', priority=priority)
+            else:
+                response = await self._acall_deepseek_api(prompt, deadline=deadline, method='motivational_quote',
+                                                          priority=priority)
             
             if response:
                 return self._parse_quote_response(response, topic, style)
@@ -84,8 +321,61 @@ class DeepSeekGenerator:
             print(f"❌ Ошибка генерации цитаты: {e}")
             return self._get_fallback_quote()
     
-    def generate_quote_with_explanation(self) -> Dict:
+    def generate_quote_batch(self, count: int = 10, topics: List[str] = None, deadline: float = None) -> List[Dict]:
+        """Генерирует несколько цитат за один запрос"""
+        return self._run_sync(self.agenerate_quote_batch(count, topics, deadline))
+    
+    async def agenerate_quote_batch(self, count: int = 10, topics: List[str] = None,
+                                    deadline: float = None) -> List[Dict]:
+        """
+        Up to count (<= MAX_BATCH_QUOTES) quotes from one request, returned as
+        a JSON array. Invalid items and repeats within the reply are dropped,
+        so fewer may come back; [] if AI is disabled or the request failed.
+        """
+        if not self.enabled:
+            return []
+        
+        count = max(1, min(count, MAX_BATCH_QUOTES))
+        topics = topics or random.sample(self.topics, 3)
+        style = random.choice(self.styles)
+        
+        prompt = f"""Сгенерируй {count} разных оригинальных мотивационных цитат.
+
+Темы: {', '.join(topics)}
+Стиль: {style}
+Авторы для стилизации: {', '.join(random.sample(self.authors, 3))}
+
+Требования:
+1. Каждая цитата уникальна и не повторяет другие по смыслу
+2. Длина: 1-2 предложения
+3. Язык: русский
+
+Формат ответа JSON:
+{{
+  "quotes": [
+    {{"text": "Текст цитаты", "author": "Автор", "category": "Тема", "tags": ["тег1", "тег2", "тег3"]}}
+  ]
+}}"""
+        
+        try:
+            response = await self._acall_deepseek_api(
+                prompt, temperature=0.9, json_mode=True,
+                max_tokens=200 + count * BATCH_TOKENS_PER_QUOTE, deadline=deadline,
+                method='quote_batch', priority=PRIORITY_BACKGROUND
+            )
+            if not response:
+                return []
+            return self._parse_quote_batch(response, topics[0], style)
+        except Exception as e:
+            print(f"❌ Ошибка пакетной генерации: {e}")
+            return []
+    
+    def generate_quote_with_explanation(self, deadline: float = None) -> Dict:
         """Генерирует цитату с объяснением"""
+        return self._run_sync(self.agenerate_quote_with_explanation(deadline))
+    
+    async def agenerate_quote_with_explanation(self, deadline: float = None) -> Dict:
+        """Асинхронный вариант generate_quote_with_explanation"""
         if not self.enabled:
             return self._get_fallback_quote_with_explanation()
         
@@ -112,7 +402,8 @@ class DeepSeekGenerator:
 3. Не более 3 предложений"""
         
         try:
-            response = self._call_deepseek_api(prompt, json_mode=True)
+            response = await self._acall_deepseek_api(prompt, json_mode=True, deadline=deadline,
+                                                      method='quote_with_explanation')
             
             if response:
                 quote_data = self._parse_json_response(response)
@@ -125,8 +416,16 @@ class DeepSeekGenerator:
             print(f"❌ Ошибка генерации с объяснением: {e}")
             return self._get_fallback_quote_with_explanation()
     
-    def generate_daily_wisdom(self) -> Dict:
+    def generate_daily_wisdom(self, deadline: float = None, priority: int = PRIORITY_NORMAL) -> Dict:
         """Генерирует мудрость дня с практическим заданием"""
+        return self._run_sync(self.agenerate_daily_wisdom(deadline, priority))
+    
+    async def agenerate_daily_wisdom(self, deadline: float = None, priority: int = PRIORITY_NORMAL,
+                                     on_text: Callable[[str], Awaitable] = None) -> Dict:
+        """
+        Асинхронный вариант generate_daily_wisdom. With on_text the JSON answer
+        is streamed and on_text gets its text fields so far (_json_preview).
+        """
         if not self.enabled:
             return self._get_fallback_daily_wisdom()
         
@@ -144,10 +443,18 @@ class DeepSeekGenerator:
 Тема: {random.choice(self.topics)}
 Стиль: {random.choice(['практичный', 'философский', 'мотивационный'])}
 
-Верни ответ в JSON формате."""
+Верни ответ в JSON формате:
+{{"quote": "...", "analysis": "...", "task": "...", "key_thought": "...", "emoji": "..."}}"""
         
         try:
-            response = self._call_deepseek_api(prompt, temperature=0.8, json_mode=True)
+            if on_text:
+                response = await self._astream_text(prompt, on_text, preview=_json_preview, temperature=0.8,
+                                                    json_mode=True, deadline=deadline, method='daily_wisdom',
+                                                    priority=priority)
+            else:
+                response = await self._acall_deepseek_api(prompt, temperature=0.8, json_mode=True,
+                                                          deadline=deadline, method='daily_wisdom',
+                                                          priority=priority)
             
             if response:
                 wisdom_data = self._parse_json_response(response)
@@ -162,8 +469,12 @@ class DeepSeekGenerator:
             print(f"❌ Ошибка генерации мудрости дня: {e}")
             return self._get_fallback_daily_wisdom()
     
-    def generate_personalized_quote(self, user_context: Dict = None) -> Dict:
+    def generate_personalized_quote(self, user_context: Dict = None, deadline: float = None) -> Dict:
         """Генерирует персонализированную цитату"""
+        return self._run_sync(self.agenerate_personalized_quote(user_context, deadline))
+    
+    async def agenerate_personalized_quote(self, user_context: Dict = None, deadline: float = None) -> Dict:
+        """Асинхронный вариант generate_personalized_quote"""
         if not self.enabled:
             return self._get_fallback_quote()
         
@@ -185,7 +496,8 @@ class DeepSeekGenerator:
 Верни в JSON формате."""
         
         try:
-            response = self._call_deepseek_api(prompt, json_mode=True)
+            response = await self._acall_deepseek_api(prompt, json_mode=True, deadline=deadline,
+                                                      method='personalized_quote')
             
             if response:
                 personalized_data = self._parse_json_response(response)
@@ -240,37 +552,174 @@ class DeepSeekGenerator:
     
     def _call_deepseek_api(self, prompt: str, temperature: float = 0.7, json_mode: bool = False) -> Optional[str]:
         """Вызывает DeepSeek API"""
-        headers = {
-            'Authorization': f'Bearer {self.api_key}',
-            'Content-Type': 'application/json'
-        }
+        return self._run_sync(self._acall_deepseek_api(prompt, temperature, json_mode))
+    
+    async def _acall_deepseek_api(self, prompt: str, temperature: float = 0.7, json_mode: bool = False,
+                                  system_prompt: str = SYSTEM_PROMPT, max_tokens: Optional[int] = 500,
+                                  deadline: float = None, method: str = 'chat',
+                                  priority: int = PRIORITY_NORMAL) -> Optional[str]:
+        """
+        Вызывает DeepSeek API через общий пул соединений.
+        
+        Transient failures (timeouts, connection errors, 429/5xx) are retried
+        with jittered backoff (Retry-After on 429) until deadline seconds
+        (default self.deadline) run out; None if no answer came in time or
+        the circuit breaker is open. method labels the call in the usage
+        metrics; priority is its lane in the rate limiter queue.
+        """
+        data = self._chat_payload(prompt, temperature, json_mode, system_prompt, max_tokens)
+        
+        async def attempt(timeout: float) -> str:
+            result = await self._in_client_loop(self._post(data, timeout, method, priority))
+            return result['choices'][0]['message']['content']
+        
+        return await self._with_retries(attempt, deadline)
+    
+    async def astream_deepseek_api(self, prompt: str, temperature: float = 0.7, json_mode: bool = False,
+                                   system_prompt: str = SYSTEM_PROMPT, max_tokens: Optional[int] = 500,
+                                   deadline: float = None, method: str = 'chat',
+                                   priority: int = PRIORITY_NORMAL) -> AsyncIterator[str]:
+        """
+        Streaming _acall_deepseek_api: yields text deltas as they arrive.
+        
+        Failures before the first delta are retried the same way; raises
+        StreamInterrupted when no complete answer came (the deltas yielded
+        so far were then only its beginning).
+        """
+        data = self._chat_payload(prompt, temperature, json_mode, system_prompt, max_tokens)
+        data['stream'] = True
+        data['stream_options'] = {'include_usage': True}
+        
+        loop = asyncio.get_running_loop()
+        deltas: asyncio.Queue = asyncio.Queue()
+        
+        def emit(delta: Optional[str]):
+            # Called on the client loop, which is usually not the caller's
+            if asyncio.get_running_loop() is loop:
+                deltas.put_nowait(delta)
+            else:
+                loop.call_soon_threadsafe(deltas.put_nowait, delta)
+        
+        async def attempt(timeout: float) -> str:
+            return await self._in_client_loop(self._post_stream(data, emit, timeout, method, priority))
         
+        # Deltas are queued before the producer completes, so None always comes last
+        producer = asyncio.ensure_future(self._with_retries(attempt, deadline))
+        producer.add_done_callback(lambda _: deltas.put_nowait(None))
+        try:
+            while True:
+                delta = await deltas.get()
+                if delta is None:
+                    break
+                yield delta
+            if not producer.result():
+                raise StreamInterrupted("нет полного ответа DeepSeek")
+        finally:
+            # The caller stopped early: stop reading the stream and free its connection slot
+            producer.cancel()
+    
+    async def _astream_text(self, prompt: str, on_text: Callable[[str], Awaitable],
+                            preview: Callable[[str], str] = None, **kwargs) -> Optional[str]:
+        """Stream an answer, awaiting on_text(preview of the text so far) as it grows; None if it broke off"""
+        text = ''
+        try:
+            async for delta in self.astream_deepseek_api(prompt, **kwargs):
+                text += delta
+                await on_text(preview(text) if preview else text)
+        except StreamInterrupted as e:
+            print(f"⚠️  Потоковая генерация не удалась: {e}")
+            return None
+        return text
+    
+    def _chat_payload(self, prompt: str, temperature: float, json_mode: bool, system_prompt: str,
+                      max_tokens: Optional[int]) -> Dict:
+        """Тело запроса chat completions"""
         data = {
             'model': 'deepseek-chat',
             'messages': [
-                {'role': 'system', 'content': 'Ты помощник, генерирующий уникальные мотивационные цитаты. Отвечай на русском языке.'},
+                {'role': 'system', 'content': system_prompt},
                 {'role': 'user', 'content': prompt}
             ],
-            'temperature': temperature,
-            'max_tokens': 500
+            'temperature': temperature
         }
+        if max_tokens:
+            data['max_tokens'] = max_tokens
         
         if json_mode:
             data['response_format'] = {'type': 'json_object'}
-        
-        try:
-            response = requests.post(self.api_url, headers=headers, json=data, timeout=30)
-            response.raise_for_status()
+        return data
+    
+    async def _with_retries(self, attempt: Callable[[float], Awaitable[str]], deadline: float = None) -> Optional[str]:
+        """Await attempt(timeout of one HTTP attempt) under the retry policy, breaker and deadline; None on failure"""
+        budget = Deadline(deadline if deadline is not None else self.deadline)
+        for attempt_no in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                print("⚡ DeepSeek недоступен (circuit breaker открыт), используем запасной вариант")
+                return None
+            remaining = budget.remaining()
+            if remaining <= 0:
+                self.breaker.release()
+                break
             
-            result = response.json()
-            return result['choices'][0]['message']['content']
+            # A request cut short by the caller's deadline says nothing about the API's health
+            attempt_timeout = min(self.timeout, remaining)
+            delay = None
+            try:
+                # wait_for also bounds the wait for a free connection slot
+                content = await asyncio.wait_for(attempt(attempt_timeout), remaining)
+                self.breaker.record_success()
+                return content
             
-        except requests.exceptions.RequestException as e:
-            print(f"⚠️  Ошибка запроса к DeepSeek: {e}")
-            return None
-        except Exception as e:
-            print(f"⚠️  Ошибка обработки ответа: {e}")
-            return None
+            except asyncio.TimeoutError:
+                self.breaker.release()
+                break
+            except asyncio.CancelledError:
+                # The caller gave up (stream consumer stopped, outer timeout, shutdown):
+                # a half-open probe that neither succeeded nor failed must not stay taken
+                self.breaker.release()
+                raise
+            except httpx.HTTPStatusError as e:
+                status = e.response.status_code
+                if status not in RETRY_STATUSES:
+                    # Bad request / auth: retrying won't help and the API itself is up
+                    self.breaker.release()
+                    print(f"⚠️  Ошибка запроса к DeepSeek: {e!r}")
+                    return None
+                if status == 429:
+                    # Throttled, not broken: wait as told instead of opening the circuit
+                    self.breaker.release()
+                    delay = retry_after(e.response.headers)
+                else:
+                    self.breaker.record_failure()
+                print(f"⚠️  DeepSeek ответил {status} (попытка {attempt_no + 1})")
+            except httpx.TimeoutException as e:
+                if attempt_timeout < self.timeout:
+                    self.breaker.release()
+                    break
+                self.breaker.record_failure()
+                print(f"⚠️  Таймаут запроса к DeepSeek (попытка {attempt_no + 1}): {e!r}")
+            except httpx.HTTPError as e:
+                self.breaker.record_failure()
+                print(f"⚠️  Ошибка запроса к DeepSeek (попытка {attempt_no + 1}): {e!r}")
+            except StreamInterrupted as e:
+                # Content was already shown: retrying would repeat it
+                self.breaker.record_failure()
+                print(f"⚠️  Ошибка потока DeepSeek: {e}")
+                return None
+            except Exception as e:
+                self.breaker.release()
+                print(f"⚠️  Ошибка обработки ответа: {e}")
+                return None
+            
+            if attempt_no == self.max_retries:
+                break
+            delay = backoff_delay(attempt_no) if delay is None else delay
+            if delay >= budget.remaining():
+                break
+            await asyncio.sleep(delay)
+        
+        print("❌ Не удалось получить ответ DeepSeek (попытки или время исчерпаны)")
+        return None
     
     def _parse_quote_response(self, response: str, topic: str, style: str) -> Dict:
         """Парсит ответ от AI"""
@@ -321,6 +770,38 @@ class DeepSeekGenerator:
             print(f"⚠️  Ошибка парсинга: {e}")
             return self._get_fallback_quote()
     
+    def _parse_quote_batch(self, response: str, topic: str, style: str) -> List[Dict]:
+        """Валидирует JSON-массив цитат из пакетного ответа"""
+        data = self._parse_json_response(response)
+        items = data.get('quotes') if data else None
+        if not isinstance(items, list):
+            return []
+        
+        quotes = []
+        seen = set()
+        generated_at = datetime.now().isoformat()
+        for item in items:
+            if not isinstance(item, dict) or not isinstance(item.get('text'), str):
+                continue
+            text = item['text'].strip().strip('"«»').strip()
+            key = text.lower()
+            if not QUOTE_MIN_LENGTH <= len(text) <= QUOTE_MAX_LENGTH or key in seen:
+                continue
+            seen.add(key)
+            
+            tags = item.get('tags')
+            quotes.append({
+                'text': text,
+                'author': str(item.get('author') or '').strip() or 'Генератор мудрости',
+                'category': str(item.get('category') or '').strip() or topic,
+                'tags': [str(tag) for tag in tags] if isinstance(tags, list) else [],
+                'style': style,
+                'source': 'ai',
+                'ai_model': 'deepseek-chat',
+                'generated_at': generated_at
+            })
+        return quotes
+    
     def _parse_json_response(self, response: str) -> Optional[Dict]:
         """Парсит JSON ответ"""
         try:
@@ -332,6 +813,9 @@ class DeepSeekGenerator:
                 clean_response = clean_response.split('```')[1].split('```')[0].strip()
             
             data = json.loads(clean_response)
+            if not isinstance(data, dict):
+                print(f"⚠️  AI вернул не JSON-объект: {response}")
+                return None
             
             # Добавляем метаданные
             data['source'] = 'ai'
@@ -400,51 +884,52 @@ class DeepSeekGenerator:
             'generated_at': datetime.now().isoformat()
         }
 
-    def generate_interaction_reply(self, message_text: str, context_type: str = "comment") -> str:
+    def generate_interaction_reply(self, message_text: str, context_type: str = "comment",
+                                   deadline: float = None) -> str:
         """Generates a reply for a comment or DM"""
+        return self._run_sync(self.agenerate_interaction_reply(message_text, context_type, deadline))
+    
+    async def agenerate_interaction_reply(self, message_text: str, context_type: str = "comment",
+                                          deadline: float = None) -> str:
+        """Async variant of generate_interaction_reply"""
         if not self.enabled:
             return "Спасибо!"
-            
-        system_prompt = (
-            "Ты - мудрый и дружелюбный бот, который публикует мотивационные цитаты. "
-            "Твоя задача - отвечать на комментарии или сообщения пользователей. "
-            "Ответ должен быть кратким (не более 15 слов), вежливым и вдохновляющим. "
-            "Используй эмодзи. Не используй хештеги."
-        )
         
         user_prompt = f"Ответь на {context_type}: \"{message_text}\""
         
-        try:
-            headers = {
-                'Authorization': f'Bearer {self.api_key}',
-                'Content-Type': 'application/json'
-            }
-            
-            response = requests.post(
-                self.api_url,
-                headers=headers,
-                json={
-                    "model": "deepseek-chat",
-                    "messages": [
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_prompt}
-                    ],
-                    "temperature": 0.7
-                },
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                reply = result['choices'][0]['message']['content'].strip()
-                return reply
-            else:
-                print(f"DeepSeek API Error (Interaction): {response.status_code}")
-                return "Спасибо за ваш отклик! 🙏"
-                
-        except Exception as e:
-            print(f"Error generating interaction reply: {e}")
-            return "Спасибо! ✨"
+        reply = await self._acall_deepseek_api(user_prompt, system_prompt=REPLY_SYSTEM_PROMPT,
+                                               max_tokens=None, deadline=deadline,
+                                               method='interaction_reply', priority=PRIORITY_BACKGROUND)
+        if reply:
+            return reply.strip()
+        return FALLBACK_REPLY
+    
+    def generate_interaction_replies(self, message_text: str, context_type: str = "comment",
+                                     count: int = 3, deadline: float = None) -> List[str]:
+        """Several alternative replies from one request ([] if AI is unavailable)"""
+        return self._run_sync(self.agenerate_interaction_replies(message_text, context_type, count, deadline))
+    
+    async def agenerate_interaction_replies(self, message_text: str, context_type: str = "comment",
+                                            count: int = 3, deadline: float = None) -> List[str]:
+        """Async variant of generate_interaction_replies"""
+        if not self.enabled:
+            return []
+        
+        user_prompt = (
+            f"Ответь на {context_type}: \"{message_text}\"\n\n"
+            f"Предложи разные варианты ответа ({count} шт.). "
+            f'Формат ответа JSON: {{"replies": ["ответ 1", "ответ 2"]}}'
+        )
+        
+        response = await self._acall_deepseek_api(user_prompt, temperature=0.9, json_mode=True,
+                                                  system_prompt=REPLY_SYSTEM_PROMPT,
+                                                  max_tokens=100 * count, deadline=deadline,
+                                                  method='interaction_replies', priority=PRIORITY_BACKGROUND)
+        data = self._parse_json_response(response) if response else None
+        replies = data.get('replies') if data else None
+        if not isinstance(replies, list):
+            return []
+        return list(dict.fromkeys(r.strip() for r in replies if isinstance(r, str) and r.strip()))[:count]
 
 # Создаем глобальный экземпляр
 deepseek_gen = DeepSeekGenerator()
\ No newline at end of file
@@ -1,87 +1,132 @@
 import textwrap
 import os
-from PIL import Image, ImageDraw, ImageFont
+import threading
+from functools import lru_cache
+from PIL import Image, ImageDraw, ImageFont, ImageOps
 
-def create_quote_image(quote_text, author, category, output_path="quote_image.jpg"):
+# Tried in order; the first that exists is used, otherwise Pillow's default font
+FONT_CANDIDATES = (
+    "C:\\Windows\\Fonts\\arial.ttf",                      # Windows
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",    # Linux/Docker
+)
+
+BACKGROUNDS = ('solid', 'gradient', 'texture')
+
+
+class RenderContext:
+    """
+    Assets shared by every quote image: fonts and background templates.
+
+    Fonts are loaded once into an LRU cache keyed by (path, size) and the
+    backgrounds are built once per size, then copy()'d for each render.
+    Drawing text is serialized (a FreeType face is not safe to use from
+    several threads at once); saving the image is not.
+    """
+
+    def __init__(self, width=1080, height=1080, font_cache_size=16):
+        self.width = width
+        self.height = height  # Square for Instagram
+        self.bg_color = (0, 0, 0)  # Black
+        self.text_color = (255, 255, 255)  # White
+        self.footer_color = (150, 150, 150)  # Grey
+
+        self.font_path = next((path for path in FONT_CANDIDATES if os.path.exists(path)), None)
+        self.font = lru_cache(maxsize=font_cache_size)(self._load_font)
+        self._templates = {}
+        self._lock = threading.Lock()
+
+    def _load_font(self, path, size):
+        try:
+            if path:
+                return ImageFont.truetype(path, size)
+        except Exception as e:
+            print(f"Error loading font: {e}")
+        return ImageFont.load_default()
+
+    def background(self, name='solid'):
+        """Fresh canvas: a copy of the cached template"""
+        template = self._templates.get(name)
+        if template is None:
+            template = self._templates[name] = self._build_background(name)
+        return template.copy()
+
+    def _build_background(self, name):
+        size = (self.width, self.height)
+        if name == 'solid':
+            return Image.new('RGB', size, color=self.bg_color)
+        if name == 'gradient':
+            # Black at the top to dark blue-grey at the bottom
+            ramp = Image.linear_gradient('L').resize(size)
+            return ImageOps.colorize(ramp, black=self.bg_color, white=(40, 48, 72))
+        if name == 'texture':
+            # Fine dark noise, like matte paper
+            noise = Image.effect_noise(size, 12).point(lambda value: value // 6)
+            return Image.merge('RGB', (noise, noise, noise))
+        raise ValueError(f"Unknown background: {name!r} (expected one of {BACKGROUNDS})")
+
+    def render(self, quote_text, author, category, background='solid'):
+        """Quote image in memory"""
+        width, height = self.width, self.height
+        img = self.background(background)
+        draw = ImageDraw.Draw(img)
+
+        quote_font = self.font(self.font_path, 60)
+        author_font = self.font(self.font_path, 40)
+        category_font = self.font(self.font_path, 30)
+
+        # Wrap text
+        # Estimate chars per line based on width (approximate)
+        # 1080px / 30px per char (approx for size 60) ~= 36 chars
+        wrapper = textwrap.TextWrapper(width=30)
+        caption_new = '\n'.join(wrapper.wrap(text=quote_text))
+
+        with self._lock:
+            # Calculate text size and position to center it
+            # getbbox returns (left, top, right, bottom)
+            bbox = draw.multiline_textbbox((0, 0), caption_new, font=quote_font, align='center')
+            text_width = bbox[2] - bbox[0]
+            text_height = bbox[3] - bbox[1]
+
+            x_text = (width - text_width) / 2
+            y_text = (height - text_height) / 2 - 50  # Move up a bit to leave room for author
+
+            # Draw Quote
+            draw.multiline_text((x_text, y_text), caption_new, font=quote_font, fill=self.text_color,
+                                align='center')
+
+            # Draw Author
+            if author:
+                author_text = f"— {author}"
+                bbox_author = draw.textbbox((0, 0), author_text, font=author_font)
+                author_width = bbox_author[2] - bbox_author[0]
+
+                x_author = (width - author_width) / 2
+                y_author = y_text + text_height + 40
+
+                draw.text((x_author, y_author), author_text, font=author_font, fill=self.text_color)
+
+            # Draw Category/Footer
+            footer_text = f"#{category} #WisdomDaily"
+            bbox_footer = draw.textbbox((0, 0), footer_text, font=category_font)
+            footer_width = bbox_footer[2] - bbox_footer[0]
+
+            x_footer = (width - footer_width) / 2
+            y_footer = height - 100
+
+            draw.text((x_footer, y_footer), footer_text, font=category_font, fill=self.footer_color)
+
+        return img
+
+
+# Shared by all calls of create_quote_image
+render_context = RenderContext()
+
+
+def create_quote_image(quote_text, author, category, output_path="quote_image.jpg", background='solid'):
     """
     Creates an image with the quote text.
     """
-    # Image settings
-    width = 1080
-    height = 1080  # Square for Instagram
-    bg_color = (0, 0, 0)  # Black
-    text_color = (255, 255, 255)  # White
-    
-    # Create image
-    img = Image.new('RGB', (width, height), color=bg_color)
-    draw = ImageDraw.Draw(img)
-    
-    # Fonts
-    # Try to load a nice font, otherwise default
-    try:
-        # Windows path for Arial
-        font_path = "C:\\Windows\\Fonts\\arial.ttf"
-        if not os.path.exists(font_path):
-             # Linux/Docker fallback (often DejaVuSans)
-             font_path = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
-        
-        if not os.path.exists(font_path):
-            font_path = None # Use default
-
-        if font_path:
-            quote_font = ImageFont.truetype(font_path, 60)
-            author_font = ImageFont.truetype(font_path, 40)
-            category_font = ImageFont.truetype(font_path, 30)
-        else:
-            quote_font = ImageFont.load_default()
-            author_font = ImageFont.load_default()
-            category_font = ImageFont.load_default()
-            
-    except Exception as e:
-        print(f"Error loading font: {e}")
-        quote_font = ImageFont.load_default()
-        author_font = ImageFont.load_default()
-        category_font = ImageFont.load_default()
-
-    # Wrap text
-    # Estimate chars per line based on width (approximate)
-    # 1080px / 30px per char (approx for size 60) ~= 36 chars
-    wrapper = textwrap.TextWrapper(width=30) 
-    word_list = wrapper.wrap(text=quote_text)
-    caption_new = '\n'.join(word_list)
-
-    # Calculate text size and position to center it
-    # getbbox returns (left, top, right, bottom)
-    bbox = draw.multiline_textbbox((0, 0), caption_new, font=quote_font, align='center')
-    text_width = bbox[2] - bbox[0]
-    text_height = bbox[3] - bbox[1]
-    
-    x_text = (width - text_width) / 2
-    y_text = (height - text_height) / 2 - 50 # Move up a bit to leave room for author
-    
-    # Draw Quote
-    draw.multiline_text((x_text, y_text), caption_new, font=quote_font, fill=text_color, align='center')
-    
-    # Draw Author
-    if author:
-        author_text = f"— {author}"
-        bbox_author = draw.textbbox((0, 0), author_text, font=author_font)
-        author_width = bbox_author[2] - bbox_author[0]
-        
-        x_author = (width - author_width) / 2
-        y_author = y_text + text_height + 40
-        
-        draw.text((x_author, y_author), author_text, font=author_font, fill=text_color)
-
-    # Draw Category/Footer
-    footer_text = f"#{category} #WisdomDaily"
-    bbox_footer = draw.textbbox((0, 0), footer_text, font=category_font)
-    footer_width = bbox_footer[2] - bbox_footer[0]
-    
-    x_footer = (width - footer_width) / 2
-    y_footer = height - 100
-    
-    draw.text((x_footer, y_footer), footer_text, font=category_font, fill=(150, 150, 150)) # Grey
+    img = render_context.render(quote_text, author, category, background)
 
     # Save
     img.save(output_path)
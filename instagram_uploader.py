@@ -3,7 +3,7 @@ import logging
 from instagrapi import Client
 from dotenv import load_dotenv
 from database import QuoteDatabase
-from deepseek_generator import deepseek_gen
+from reply_cache import ReplyCache
 
 # Setup logging
 logger = logging.getLogger(__name__)
@@ -16,6 +16,7 @@ class InstagramUploader:
         self.cl = Client()
         self.session_file = "instagram_session.json"
         self.db = QuoteDatabase()
+        self.replies = ReplyCache(self.db, ttl_days=int(os.getenv('REPLY_CACHE_TTL_DAYS', '30')))
 
     def login(self):
         """Logs in to Instagram, using session if available."""
@@ -69,8 +70,11 @@ class InstagramUploader:
         logger.info("Processing Instagram interactions...")
         
         try:
-            self._process_comments()
-            # self._process_dms() # DM processing can be risky for new accounts, uncomment if needed
+            # Replies/follows of this cycle are written in one transaction at the end
+            with self.db.interaction_batch():
+                self._process_comments()
+                # self._process_dms() # DM processing can be risky for new accounts, uncomment if needed
+            logger.info(f"Reply cache: {self.replies.stats()}")
         except Exception as e:
             logger.error(f"Error processing interactions: {e}")
 
@@ -92,8 +96,8 @@ class InstagramUploader:
                     if self.db.is_interaction_processed('instagram', 'comment_reply', comment.pk):
                         continue
                     
-                    # Generate reply
-                    reply_text = deepseek_gen.generate_interaction_reply(comment.text, "comment")
+                    # Generate reply (short/common comments are answered from the reply cache)
+                    reply_text = self.replies.reply(comment.text, "comment")
                     
                     # Reply to comment
                     try:
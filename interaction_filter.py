@@ -0,0 +1,91 @@
+"""
+In-memory membership filter for the interactions table.
+
+A Bloom filter answers "never processed" without touching SQLite; a bounded
+LRU set remembers recent positives so repeated checks in one polling cycle
+don't need SQL either. A Bloom "maybe" is confirmed by the caller in SQL.
+"""
+import math
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Iterable
+
+DEFAULT_CAPACITY = 10000
+FALSE_POSITIVE_RATE = 0.01
+LRU_SIZE = 4096
+
+
+def interaction_key(platform: str, interaction_type: str, target_id) -> str:
+    """Filter key of one interactions row"""
+    return f"{platform}\x1f{interaction_type}\x1f{target_id}"
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter with double hashing over a blake2b digest"""
+
+    def __init__(self, capacity: int, error_rate: float = FALSE_POSITIVE_RATE):
+        self.capacity = max(capacity, 1)
+        self.num_bits = max(8, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / self.capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str) -> Iterable[int]:
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, key: str):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class InteractionFilter:
+    """
+    Bloom filter + LRU of known interactions, warm-loaded from the table.
+
+    Thread-safe: a lost bit would be a false negative (a repeated reply),
+    so every mutation happens under one lock.
+    """
+
+    def __init__(self, keys: Iterable[str], count: int, lru_size: int = LRU_SIZE):
+        self._lock = threading.Lock()
+        self._recent = OrderedDict()
+        self._lru_size = lru_size
+        self._bloom = BloomFilter(max(DEFAULT_CAPACITY, count * 2))
+        for key in keys:
+            self._bloom.add(key)
+
+    @property
+    def saturated(self) -> bool:
+        """More keys than the filter was sized for (false positives climb); rebuild it"""
+        return self._bloom.count > self._bloom.capacity
+
+    def might_contain(self, key: str) -> bool:
+        """False means definitely not processed; True needs confirmation unless known()"""
+        with self._lock:
+            return key in self._recent or key in self._bloom
+
+    def known(self, key: str) -> bool:
+        """Confirmed positive seen recently"""
+        with self._lock:
+            if key in self._recent:
+                self._recent.move_to_end(key)
+                return True
+            return False
+
+    def remember(self, key: str):
+        """Record a confirmed positive (new or found in SQL)"""
+        with self._lock:
+            if key not in self._bloom:
+                self._bloom.add(key)
+            self._recent[key] = True
+            self._recent.move_to_end(key)
+            if len(self._recent) > self._lru_size:
+                self._recent.popitem(last=False)
@@ -1,7 +1,5 @@
+from typing import Dict
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup, KeyboardButton
-from database import QuoteDatabase
-
-db = QuoteDatabase()
 
 def get_main_keyboard():
     """Основная клавиатура меню"""
@@ -12,26 +10,33 @@ def get_main_keyboard():
     ]
     return ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=False)
 
-def get_categories_keyboard():
-    """Клавиатура с категориями"""
-    categories = db.get_categories()
+# (catalog, markup) of the last rendered categories keyboard
+_categories_keyboard = (None, None)
+
+def get_categories_keyboard(catalog: Dict[str, int]):
+    """Клавиатура с категориями из каталога get_category_catalog (перестраивается только при его изменении)"""
+    global _categories_keyboard
+    if _categories_keyboard[0] is catalog:
+        return _categories_keyboard[1]
     
     # Группируем по 2 кнопки в ряд
     buttons = []
     row = []
     
-    for i, category in enumerate(categories):
+    for i, (category, count) in enumerate(catalog.items()):
         emoji = get_category_emoji(category)
-        row.append(InlineKeyboardButton(f"{emoji} {category.capitalize()}", callback_data=f"cat_{category}"))
+        row.append(InlineKeyboardButton(f"{emoji} {category.capitalize()} ({count})", callback_data=f"cat_{category}"))
         
-        if len(row) == 2 or i == len(categories) - 1:
+        if len(row) == 2 or i == len(catalog) - 1:
             buttons.append(row)
             row = []
     
     # Добавляем кнопку "Назад"
     buttons.append([InlineKeyboardButton("⬅️ Назад", callback_data="back_to_main")])
     
-    return InlineKeyboardMarkup(buttons)
+    markup = InlineKeyboardMarkup(buttons)
+    _categories_keyboard = (catalog, markup)
+    return markup
 
 def get_search_options_keyboard():
     """Клавиатура для поиска"""
@@ -62,6 +67,18 @@ def get_quote_actions_keyboard(quote_id: int, is_favorite: bool = False):
     ]
     return InlineKeyboardMarkup(keyboard)
 
+def get_pagination_keyboard(prefix: str, prev_cursor: str = None, next_cursor: str = None):
+    """Кнопки «назад/вперед» для постраничного списка (курсоры в callback_data)"""
+    nav = []
+    if prev_cursor:
+        nav.append(InlineKeyboardButton("◀️ Назад", callback_data=f"{prefix}:p:{prev_cursor}"))
+    if next_cursor:
+        nav.append(InlineKeyboardButton("Вперед ▶️", callback_data=f"{prefix}:n:{next_cursor}"))
+    
+    keyboard = [nav] if nav else []
+    keyboard.append([InlineKeyboardButton("🏠 В меню", callback_data="back_to_main")])
+    return InlineKeyboardMarkup(keyboard)
+
 def get_admin_keyboard():
     """Клавиатура для админа"""
     keyboard = [
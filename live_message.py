@@ -0,0 +1,71 @@
+"""
+A Telegram message that shows an answer while it is still being generated.
+
+The bot sends a placeholder right away and LiveMessage edits it as the
+streamed text grows. Telegram throttles edits (about one per second in a
+private chat, 20 per minute in a group), so intermediate updates are
+dropped until the edit interval has passed, and a RetryAfter pushes the
+next edit back. finish() always shows the final text.
+"""
+import time
+import asyncio
+
+from telegram import Message
+from telegram.error import BadRequest, RetryAfter, TelegramError
+
+# Telegram rejects longer message texts
+MAX_MESSAGE_LENGTH = 4096
+# Appended to intermediate text: the answer is still coming
+CURSOR = ' ▌'
+
+
+def _seconds(value) -> float:
+    """RetryAfter.retry_after is an int or a timedelta depending on the library version"""
+    return value.total_seconds() if hasattr(value, 'total_seconds') else float(value)
+
+
+class LiveMessage:
+    """Sent message edited in place with throttled progressive updates"""
+
+    def __init__(self, message: Message, interval: float = 1.0):
+        self.message = message
+        self.interval = interval
+        self.edits = 0
+        self._shown = message.text
+        self._next_edit_at = time.monotonic() + interval
+
+    async def update(self, text: str):
+        """Show text (generated so far) if the edit interval allows; otherwise skip it"""
+        if time.monotonic() < self._next_edit_at:
+            return
+        text = text.strip()[:MAX_MESSAGE_LENGTH - len(CURSOR)] + CURSOR
+        if text.strip() == CURSOR.strip() or text == self._shown:
+            return
+        await self._edit(text)
+
+    async def finish(self, text: str, **kwargs):
+        """Final edit (parse_mode, reply_markup...): waits out throttling instead of skipping"""
+        for _ in range(3):
+            delay = self._next_edit_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if await self._edit(text[:MAX_MESSAGE_LENGTH], **kwargs):
+                return
+
+    async def _edit(self, text: str, **kwargs) -> bool:
+        """One edit; False if Telegram asked to retry later"""
+        try:
+            await self.message.edit_text(text, **kwargs)
+        except RetryAfter as e:
+            self._next_edit_at = time.monotonic() + _seconds(e.retry_after)
+            return False
+        except BadRequest as e:
+            # The same text again is harmless; anything else would fail on retry too
+            if 'not modified' not in str(e).lower():
+                print(f"⚠️  Не удалось обновить сообщение: {e}")
+        except TelegramError as e:
+            print(f"⚠️  Не удалось обновить сообщение: {e}")
+        self._shown = text
+        self.edits += 1
+        self._next_edit_at = time.monotonic() + self.interval
+        return True
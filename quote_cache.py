@@ -0,0 +1,108 @@
+"""
+Memory-resident snapshot of the quotes corpus for read-heavy paths.
+
+Every quote is one QuoteRecord (__slots__, no per-instance dict); ids are
+kept in compact array('q') lists, one for the whole corpus and one per
+category, so random/by-category/by-id reads are served without SQL and
+return the same prebuilt record every time. Besides the static columns a
+record carries used_count, which mark_used() bumps when a quote is posted
+(a couple of times a day), so served quotes show the same count as the DB.
+"""
+import random
+import threading
+from array import array
+from typing import Dict, Iterable, Optional
+
+COLUMNS = ('id', 'text', 'author', 'category', 'tags', 'source', 'ai_model', 'created_at', 'used_count')
+
+
+class QuoteRecord:
+    """Read-only quote with dict-style access (quote['text'], quote.get(...), dict(quote))"""
+
+    __slots__ = COLUMNS
+
+    def __init__(self, *values):
+        for name, value in zip(COLUMNS, values):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("QuoteRecord is read-only")
+
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key: str) -> bool:
+        return key in COLUMNS
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default) if key in COLUMNS else default
+
+    def keys(self):
+        return COLUMNS
+
+    def __repr__(self) -> str:
+        return f"QuoteRecord(id={self.id}, author={self.author!r}, category={self.category!r})"
+
+
+class QuoteCorpus:
+    """In-process quote store; mutations and reads share one short lock"""
+
+    def __init__(self, rows: Iterable):
+        self._lock = threading.Lock()
+        self._by_id: Dict[int, QuoteRecord] = {}
+        self._ids = array('q')
+        self._by_category: Dict[str, array] = {}
+        self.add(rows)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, rows: Iterable):
+        """Add rows (anything indexable by COLUMNS, e.g. sqlite3.Row); existing ids are replaced"""
+        records = [QuoteRecord(*(row[name] for name in COLUMNS)) for row in rows]
+        with self._lock:
+            for record in records:
+                if record.id in self._by_id:
+                    self._remove(record.id)
+                self._by_id[record.id] = record
+                self._ids.append(record.id)
+                if record.category is not None:
+                    self._by_category.setdefault(record.category, array('q')).append(record.id)
+
+    def remove(self, quote_ids: Iterable[int]):
+        """Drop quotes (O(n) per id: deletes are rare admin actions)"""
+        with self._lock:
+            for quote_id in quote_ids:
+                self._remove(quote_id)
+
+    def _remove(self, quote_id: int):
+        record = self._by_id.pop(quote_id, None)
+        if record is None:
+            return
+        self._ids.remove(quote_id)
+        ids = self._by_category.get(record.category)
+        if ids is not None:
+            ids.remove(quote_id)
+            if not ids:
+                del self._by_category[record.category]
+
+    def get(self, quote_id: int) -> Optional[QuoteRecord]:
+        return self._by_id.get(quote_id)
+
+    def mark_used(self, quote_id: int):
+        """The quote was posted: bump its cached used_count (after the DB update committed)"""
+        with self._lock:
+            record = self._by_id.get(quote_id)
+            if record is not None:
+                object.__setattr__(record, 'used_count', (record.used_count or 0) + 1)
+
+    def random(self, category: str = None) -> Optional[QuoteRecord]:
+        """Uniform pick from the whole corpus or one category"""
+        with self._lock:
+            ids = self._ids if category is None else self._by_category.get(category)
+            if not ids:
+                return None
+            return self._by_id[ids[random.randrange(len(ids))]]
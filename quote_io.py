@@ -0,0 +1,261 @@
+"""
+Streaming bulk import/export of the quotes corpus (CSV or JSONL).
+
+Files are processed in chunks: LSH keys for a chunk are computed on a
+process pool, then the chunk is deduplicated in one batched pass (against
+itself and against the LSH index) and inserted with executemany inside a
+single write transaction.
+"""
+import os
+import csv
+import json
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional
+
+from database import QuoteDatabase, filter_similar, normalize_tags
+from quote_similarity import lsh_keys
+
+FORMATS = ('csv', 'jsonl')
+EXPORT_COLUMNS = ['id', 'text', 'author', 'category', 'tags', 'source', 'ai_model', 'created_at']
+
+ProgressCallback = Callable[[Dict], None]
+
+
+def detect_format(path: str, fmt: str = None) -> str:
+    """Format from the explicit argument or the file extension"""
+    fmt = (fmt or os.path.splitext(path)[1].lstrip('.')).lower()
+    if fmt == 'json':
+        fmt = 'jsonl'
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format: {fmt!r} (expected one of {FORMATS})")
+    return fmt
+
+
+def _parse_tags(value) -> List[str]:
+    """Tags as a list, a JSON array string or a comma/space separated string"""
+    if not value:
+        return []
+    if not isinstance(value, (str, list)):
+        value = str(value)
+    if isinstance(value, str):
+        value = value.strip()
+        if value.startswith('['):
+            try:
+                value = json.loads(value)
+            except json.JSONDecodeError:
+                pass
+    if isinstance(value, str):
+        value = value.replace(',', ' ').split()
+    return normalize_tags(value)
+
+
+def _iter_records(path: str, fmt: str) -> Iterator[Optional[Dict]]:
+    """Yield raw records one at a time without loading the file (None for a malformed JSONL line)"""
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        if fmt == 'csv':
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    yield None
+
+
+def _field(record: Dict, *keys: str) -> str:
+    """First non-empty value among keys as a stripped string ('' if none)"""
+    for key in keys:
+        value = record.get(key)
+        if value is not None and value != '':
+            return str(value).strip()
+    return ''
+
+
+def _clean_record(record) -> Optional[Dict]:
+    """Normalize one input record; None if it is not an object or has no text"""
+    if not isinstance(record, dict):
+        return None
+    text = _field(record, 'text', 'quote')
+    if not text:
+        return None
+    return {
+        'text': text,
+        'author': _field(record, 'author') or None,
+        'category': _field(record, 'category') or None,
+        'tags': _parse_tags(record.get('tags')),
+        'source': _field(record, 'source') or 'manual',
+        'ai_model': _field(record, 'ai_model') or None,
+    }
+
+
+def _chunk_keys(records: List[Dict], executor: Optional[Executor]) -> List[List[int]]:
+    """LSH keys for every record of a chunk (MinHash is CPU-bound, so use the pool if any)"""
+    texts = [record['text'] for record in records]
+    if executor is None:
+        return [lsh_keys(text) for text in texts]
+    return list(executor.map(lsh_keys, texts, chunksize=256))
+
+
+def _insert_chunk(db: QuoteDatabase, records: List[Dict], executor: Optional[Executor],
+                  skip_similar: bool, threshold: float) -> int:
+    """Dedupe and insert one chunk in a single transaction; returns rows inserted"""
+    # Computed before taking the write lock
+    keys = _chunk_keys(records, executor)
+
+    with db.pool.writer() as conn:
+        cursor = conn.cursor()
+        if skip_similar:
+            accepted = filter_similar(cursor, [r['text'] for r in records], keys, threshold)
+            records = [records[i] for i in accepted]
+            keys = [keys[i] for i in accepted]
+        if not records:
+            return 0
+
+        # Ids are sequential: we hold the only write connection for the whole transaction
+        cursor.execute('''
+            SELECT max(coalesce((SELECT seq FROM sqlite_sequence WHERE name = 'quotes'), 0),
+                       coalesce((SELECT max(id) FROM quotes), 0)) AS last_id
+        ''')
+        first_id = cursor.fetchone()['last_id'] + 1
+
+        cursor.executemany('''
+            INSERT INTO quotes (id, text, author, category, tags, source, ai_model)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', [
+            (first_id + i, r['text'], r['author'], r['category'],
+             json.dumps(r['tags']), r['source'], r['ai_model'])
+            for i, r in enumerate(records)
+        ])
+        cursor.executemany(
+            "INSERT OR IGNORE INTO quote_lsh (key, quote_id) VALUES (?, ?)",
+            [(key, first_id + i) for i, record_keys in enumerate(keys) for key in record_keys]
+        )
+    db.quotes_changed(added=range(first_id, first_id + len(records)))
+    return len(records)
+
+
+def import_quotes(db: QuoteDatabase, path: str, fmt: str = None, chunk_size: int = 5000,
+                  skip_similar: bool = True, threshold: float = 0.85,
+                  workers: int = None, progress: ProgressCallback = None) -> Dict:
+    """
+    Stream quotes from a CSV/JSONL file into the database.
+
+    CSV needs a header with at least a 'text' column (author, category, tags,
+    source, ai_model are optional); JSONL has one object per line with the
+    same keys. Rows that are malformed, not objects or without text are
+    counted as invalid and skipped. workers is the number of processes computing LSH keys
+    (default: CPU count, 1 = in-process). progress (if given) is called
+    after every chunk with the running totals, which are also returned.
+    """
+    fmt = detect_format(path, fmt)
+    workers = workers or os.cpu_count() or 1
+    stats = {'processed': 0, 'imported': 0, 'skipped': 0, 'invalid': 0}
+
+    def flush(chunk: List[Dict]):
+        inserted = _insert_chunk(db, chunk, executor, skip_similar, threshold)
+        stats['imported'] += inserted
+        stats['skipped'] += len(chunk) - inserted
+
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        chunk = []
+        for raw in _iter_records(path, fmt):
+            stats['processed'] += 1
+            try:
+                record = _clean_record(raw)
+            except (TypeError, ValueError):
+                # One bad row must not abort an import whose earlier chunks are committed
+                record = None
+            if record is None:
+                stats['invalid'] += 1
+                continue
+            chunk.append(record)
+
+            if len(chunk) >= chunk_size:
+                flush(chunk)
+                chunk = []
+                if progress:
+                    progress(dict(stats))
+
+        if chunk:
+            flush(chunk)
+    finally:
+        if executor:
+            executor.shutdown()
+
+    if progress:
+        progress(dict(stats))
+    return stats
+
+
+def export_quotes(db: QuoteDatabase, path: str, fmt: str = None, chunk_size: int = 5000,
+                  progress: ProgressCallback = None) -> int:
+    """Stream every quote to a CSV/JSONL file in id order; returns rows written"""
+    fmt = detect_format(path, fmt)
+    cursor = db.conn.cursor()
+    written = 0
+    last_id = 0
+
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = None
+        if fmt == 'csv':
+            writer = csv.DictWriter(f, fieldnames=EXPORT_COLUMNS)
+            writer.writeheader()
+
+        while True:
+            cursor.execute(f'''
+                SELECT {', '.join(EXPORT_COLUMNS)} FROM quotes
+                WHERE id > ? ORDER BY id LIMIT ?
+            ''', (last_id, chunk_size))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+
+            for row in rows:
+                record = dict(row)
+                try:
+                    tags = json.loads(record['tags'] or '[]')
+                except json.JSONDecodeError:
+                    tags = []
+                if writer:
+                    record['tags'] = ', '.join(tags)
+                    writer.writerow(record)
+                else:
+                    record['tags'] = tags
+                    f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+            written += len(rows)
+            last_id = rows[-1]['id']
+            if progress:
+                progress({'exported': written})
+
+    return written
+
+
+def main():
+    """python quote_io.py import|export <file> [db_path]"""
+    import sys
+
+    if len(sys.argv) < 3 or sys.argv[1] not in ('import', 'export'):
+        print("Usage: python quote_io.py import|export <file.csv|file.jsonl> [db_path]")
+        sys.exit(1)
+
+    command, path = sys.argv[1], sys.argv[2]
+    db = QuoteDatabase(sys.argv[3] if len(sys.argv) > 3 else None)
+    try:
+        if command == 'import':
+            stats = import_quotes(db, path, progress=lambda s: print(
+                f"  {s['processed']} processed, {s['imported']} imported, {s['skipped']} skipped", end='\r'))
+            print(f"\n✅ Import finished: {stats}")
+        else:
+            written = export_quotes(db, path)
+            print(f"✅ Exported {written} quotes to {path}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+MinHash-LSH signatures for near-duplicate quote detection.
+
+Each quote is reduced to a handful of integer bucket keys. Quotes that share
+at least one key are candidate duplicates; only those candidates get the
+exact difflib comparison in QuoteDatabase.is_quote_similar.
+"""
+import re
+import random
+import hashlib
+from typing import List
+
+SHINGLE_SIZE = 4
+NUM_BANDS = 16
+ROWS_PER_BAND = 4
+NUM_PERMUTATIONS = NUM_BANDS * ROWS_PER_BAND
+
+# Band id reserved for the exact (normalized) text key
+EXACT_BAND = NUM_BANDS
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(0x5EED)  # fixed seed: keys are persisted in the database
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERMUTATIONS)
+]
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace"""
+    return ' '.join(re.findall(r'\w+', text.lower()))
+
+
+def _hash64(data: str) -> int:
+    """Stable signed 64-bit hash (fits an SQLite INTEGER)"""
+    digest = hashlib.blake2b(data.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+def shingles(text: str) -> set:
+    """Character shingles of normalized text"""
+    normalized = normalize_text(text)
+    if len(normalized) <= SHINGLE_SIZE:
+        return {normalized}
+    return {normalized[i:i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1)}
+
+
+def minhash_signature(text: str) -> List[int]:
+    """MinHash signature of the quote's shingle set"""
+    hashes = [_hash64(shingle) & _MERSENNE_PRIME for shingle in shingles(text)]
+    return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def lsh_keys(text: str) -> List[int]:
+    """
+    Bucket keys for the LSH index: one per band plus one for the exact text.
+
+    With 16 bands of 4 rows, pairs with shingle Jaccard 0.6 collide with
+    ~89% probability and 0.7 with ~99%, while unrelated quotes (~0.1) almost
+    never do.
+    """
+    signature = minhash_signature(text)
+    keys = []
+    for band in range(NUM_BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        keys.append(_hash64(f"{band}:{','.join(map(str, rows))}"))
+    keys.append(_hash64(f"{EXACT_BAND}:{normalize_text(text)}"))
+    return keys
@@ -0,0 +1,144 @@
+"""
+Client-side rate limiting for API calls: concurrency, requests/min, tokens/min.
+
+Two token buckets (capacity = one minute's allowance) and an in-flight
+limit are shared by every call. Callers wait in one priority queue, so
+interactive requests always go before queued background ones (comment
+replies, batch generation), for the buckets and for a free slot. Token
+cost is not known until the response arrives: calls reserve an estimate
+and settle() corrects the bucket with the real usage afterwards.
+
+Not thread-safe: use a limiter from one event loop only.
+"""
+import math
+import time
+import heapq
+import asyncio
+import itertools
+from typing import List, Optional
+
+PRIORITY_INTERACTIVE = 0   # a user is waiting for the answer
+PRIORITY_NORMAL = 1        # scheduled posts, admin actions
+PRIORITY_BACKGROUND = 2    # comment replies, reserve refill, batch generation
+
+
+class TokenBucket:
+    """Refills at rate_per_minute/60 per second up to rate_per_minute; 0 = unlimited"""
+
+    def __init__(self, rate_per_minute: float):
+        self.capacity = float(rate_per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.capacity <= 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount can be taken (requests above capacity wait for a full bucket)"""
+        if self.unlimited:
+            return 0.0
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        """Consume amount; the level may go negative (a debt paid by later waits)"""
+        if not self.unlimited:
+            self._refill()
+            self.level -= amount
+
+    def put(self, amount: float):
+        """Return unused amount"""
+        if not self.unlimited:
+            self._refill()
+            self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimiter:
+    """Priority queue in front of an in-flight limit and requests/min, tokens/min buckets (0 = no limit)"""
+
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0, max_concurrency: int = 0):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        # (priority, seq, tokens, future): lowest priority value first, FIFO within a lane
+        self._waiters: List[tuple] = []
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def _wait_time(self, tokens: float) -> float:
+        """Seconds until a call may start; inf while every slot is busy (release() re-checks)"""
+        if self.max_concurrency and self.in_flight >= self.max_concurrency:
+            return math.inf
+        return max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+
+    def _grant(self, tokens: float):
+        self.in_flight += 1
+        self.requests.take(1)
+        self.tokens.take(tokens)
+
+    async def acquire(self, tokens: float, priority: int = PRIORITY_NORMAL) -> float:
+        """Wait for a free slot, a request and tokens; returns seconds spent waiting (call release() after)"""
+        if not self._waiters and self._wait_time(tokens) == 0:
+            self._grant(tokens)
+            return 0.0
+
+        started = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), tokens, future))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just before the cancellation: hand the slot on
+                self.release()
+            else:
+                # A cancelled head of the queue must not block the others
+                self._dispatch()
+            raise
+        return time.monotonic() - started
+
+    def _dispatch(self):
+        """Grant waiters in priority order while the buckets allow, then sleep until the next fits"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._waiters:
+            _, _, tokens, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            wait = self._wait_time(tokens)
+            if wait == math.inf:
+                return
+            if wait > 0:
+                self._timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                return
+            heapq.heappop(self._waiters)
+            self._grant(tokens)
+            future.set_result(None)
+
+    def release(self):
+        """A granted call finished: free its slot for the next waiter"""
+        self.in_flight -= 1
+        self._dispatch()
+
+    def settle(self, reserved: float, used: float):
+        """Correct the tokens bucket once the real usage of a call is known"""
+        if used < reserved:
+            self.tokens.put(reserved - used)
+        elif used > reserved:
+            self.tokens.take(used - reserved)
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for *_, future in self._waiters if not future.done())
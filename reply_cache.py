@@ -0,0 +1,129 @@
+"""
+Persistent cache of AI replies to comments and DMs (reply_cache table).
+
+Most comments are short and near-identical ("🔥", "спасибо", "класс!!!"),
+so replies are stored under a normalized key: casefolded, punctuation and
+emoji modifiers dropped, repeated characters/tokens and whitespace
+collapsed. A miss asks DeepSeek for several replies in one request; hits
+hand them out least-used first, so answers rotate instead of repeating.
+Replies expire after ttl_days and the least recently used keys are evicted
+beyond max_keys. Long comments are specific, so they bypass the cache.
+"""
+import re
+import threading
+import unicodedata
+from typing import Dict, Optional
+
+from database import QuoteDatabase
+from deepseek_generator import FALLBACK_REPLY, deepseek_gen
+
+DEFAULT_REPLIES_PER_KEY = 3
+DEFAULT_TTL_DAYS = 30
+DEFAULT_MAX_KEYS = 5000
+# Normalized comments longer than this (characters) are not cached
+MAX_KEY_LENGTH = 40
+
+_REPEATED_CHARS = re.compile(r'(.)\1+')
+_REPEATED_TOKENS = re.compile(r'(\S+)(?: \1)+')
+
+
+def normalize_comment(text: str) -> str:
+    """Cache key of a comment: 'Класс!!! 🔥🔥' and 'класс 🔥' both become 'клас 🔥'"""
+    kept = []
+    for char in (text or '').casefold().replace('ё', 'е'):
+        category = unicodedata.category(char)
+        # Letters, digits and emoji (So) are kept; punctuation, skin tones (Sk),
+        # variation selectors (Mn) and joiners (Cf) are dropped
+        if category[0] in 'LN' or category == 'So':
+            kept.append(char)
+        elif category[0] in 'ZC' and category != 'Cf':
+            kept.append(' ')
+    text = _REPEATED_CHARS.sub(r'\1', ' '.join(''.join(kept).split()))
+    return _REPEATED_TOKENS.sub(r'\1', text)
+
+
+class ReplyCache:
+    """Rotating cached replies per normalized comment, with hit/miss counters"""
+
+    def __init__(self, db: QuoteDatabase, replies_per_key: int = DEFAULT_REPLIES_PER_KEY,
+                 ttl_days: int = DEFAULT_TTL_DAYS, max_keys: int = DEFAULT_MAX_KEYS):
+        self.db = db
+        self.replies_per_key = replies_per_key
+        self.ttl_days = ttl_days
+        self.max_keys = max_keys
+
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self._lock = threading.Lock()
+
+    def _count(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def get(self, key: str) -> Optional[str]:
+        """Least used unexpired reply for key (its use is recorded); None on a miss"""
+        with self.db.pool.writer() as conn:
+            row = conn.execute('''
+                UPDATE reply_cache SET hits = hits + 1, last_used_at = CURRENT_TIMESTAMP
+                WHERE id = (
+                    SELECT id FROM reply_cache
+                    WHERE key = ? AND created_at > datetime('now', ?)
+                    ORDER BY hits, id LIMIT 1
+                )
+                RETURNING reply
+            ''', (key, f'-{self.ttl_days} days')).fetchone()
+        return row['reply'] if row else None
+
+    def put(self, key: str, replies) -> None:
+        """Replace the replies of key, then drop expired rows and keys beyond max_keys"""
+        with self.db.pool.writer() as conn:
+            conn.execute("DELETE FROM reply_cache WHERE key = ?", (key,))
+            # The first reply is sent right away, so it starts with one use
+            conn.executemany(
+                "INSERT INTO reply_cache (key, reply, hits) VALUES (?, ?, ?)",
+                [(key, reply, int(i == 0)) for i, reply in enumerate(replies)]
+            )
+            conn.execute("DELETE FROM reply_cache WHERE created_at <= datetime('now', ?)",
+                         (f'-{self.ttl_days} days',))
+            conn.execute('''
+                DELETE FROM reply_cache WHERE key IN (
+                    SELECT key FROM reply_cache GROUP BY key
+                    ORDER BY max(last_used_at) DESC, max(id) DESC LIMIT -1 OFFSET ?
+                )
+            ''', (self.max_keys,))
+
+    def reply(self, text: str, context_type: str = "comment") -> str:
+        """Reply to a comment/DM: cached for short ones, generated (and cached) otherwise"""
+        key = normalize_comment(text)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            self._count('bypassed')
+            return deepseek_gen.generate_interaction_reply(text, context_type)
+
+        cached = self.get(key)
+        if cached:
+            self._count('hits')
+            return cached
+
+        self._count('misses')
+        replies = deepseek_gen.generate_interaction_replies(text, context_type, self.replies_per_key)
+        if not replies:
+            return FALLBACK_REPLY
+        self.put(key, replies)
+        return replies[0]
+
+    def stats(self) -> Dict:
+        """Hit-rate counters of this process plus the cache size"""
+        row = self.db.conn.execute(
+            "SELECT COUNT(DISTINCT key) AS keys, COUNT(*) AS replies FROM reply_cache"
+        ).fetchone()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'bypassed': self.bypassed,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'keys': row['keys'],
+                'replies': row['replies'],
+            }
@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pytest
+
+# Modules live at the repository root (no package)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import QuoteDatabase
+
+
+@pytest.fixture
+def db(tmp_path):
+    """Empty database in a temporary directory; its pool is closed afterwards"""
+    database = QuoteDatabase(str(tmp_path / 'quotes.db'))
+    yield database
+    database.close()
+
+
+@pytest.fixture
+def add_quotes(db):
+    """add_quotes(n, **fields) -> ids of n distinct manual quotes"""
+    def add(count, category='motivation', tags=None):
+        return [db.add_quote(f'Цитата {n}: ' + ' '.join(f'слово{n}x{k}' for k in range(6)),
+                             f'Автор {n}', category, tags=tags)
+                for n in range(count)]
+    return add
@@ -0,0 +1,58 @@
+from database import QuoteDatabase
+
+
+def reserved(text, author='AI'):
+    return {'text': text, 'author': author, 'category': 'motivation', 'tags': ['#Успех']}
+
+
+def reserve_statuses(db):
+    return [row['status'] for row in db.conn.execute("SELECT status FROM ai_quote_reserve ORDER BY id")]
+
+
+def test_claim_saves_the_oldest_reserved_quote(db):
+    assert db.add_to_reserve(reserved('Первая мысль о движении вперёд'))
+    assert db.add_to_reserve(reserved('Вторая мысль о терпении и времени'))
+
+    quote = db.claim_reserved_ai_quote()
+
+    assert quote['text'] == 'Первая мысль о движении вперёд' and quote['tags'] == ['успех']
+    assert db.get_quote(quote['id'])['source'] == 'ai'
+    assert reserve_statuses(db) == ['used', 'ready']
+    assert db.reserve_size() == 1
+
+
+def test_claim_skips_a_quote_that_was_saved_meanwhile(db):
+    db.add_to_reserve(reserved('Дорогу осилит идущий'))
+    db.add_to_reserve(reserved('Терпение и труд всё перетрут'))
+    # Added after the reserve was generated
+    db.add_quote('Дорогу осилит идущий!', 'Народ', 'motivation')
+
+    quote = db.claim_reserved_ai_quote()
+
+    assert quote['text'] == 'Терпение и труд всё перетрут'
+    assert reserve_statuses(db) == ['rejected', 'used']
+    assert db.claim_reserved_ai_quote() is None
+
+
+def test_reserve_refuses_duplicates(db):
+    db.add_quote('Дорогу осилит идущий', 'Народ', 'motivation')
+
+    assert not db.add_to_reserve(reserved('Дорогу осилит идущий.'))
+    assert db.add_to_reserve(reserved('Терпение и труд всё перетрут'))
+    assert not db.add_to_reserve(reserved('Терпение и труд всё перетрут!'))
+    assert db.reserve_size() == 1
+
+
+def test_interrupted_claim_returns_to_the_reserve(tmp_path):
+    path = str(tmp_path / 'quotes.db')
+    db = QuoteDatabase(path)
+    db.add_to_reserve(reserved('Дорогу осилит идущий'))
+    with db.pool.writer() as conn:
+        conn.execute("UPDATE ai_quote_reserve SET status = 'claimed'")
+    db.close()
+
+    db = QuoteDatabase(path)
+    try:
+        assert db.reserve_size() == 1
+    finally:
+        db.close()
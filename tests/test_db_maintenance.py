@@ -0,0 +1,57 @@
+import gzip
+import json
+import sqlite3
+
+from database import QuoteDatabase
+from db_maintenance import prune_interactions, vacuum
+
+
+def age_interactions(db, days):
+    with db.pool.writer() as conn:
+        conn.execute("UPDATE interactions SET created_at = datetime('now', ?)", (f'-{days} days',))
+
+
+def test_dedupe_interactions_survive_pruning(db, tmp_path):
+    db.log_interaction('instagram', 'comment_reply', '1')
+    db.log_interaction('instagram', 'follow', '2')
+    db.log_interaction('instagram', 'story_view', '3')
+    age_interactions(db, 400)
+
+    assert prune_interactions(db, days=365, archive_dir=str(tmp_path / 'archive')) == 1
+
+    # Still known after a restart rebuilds the filter from the table
+    db.pool.interactions = None
+    assert db.is_interaction_processed('instagram', 'comment_reply', '1')
+    assert db.is_interaction_processed('instagram', 'follow', '2')
+    assert not db.is_interaction_processed('instagram', 'story_view', '3')
+    archive, = (tmp_path / 'archive').iterdir()
+    with gzip.open(archive, 'rt', encoding='utf-8') as f:
+        assert [json.loads(line)['target_id'] for line in f] == ['3']
+
+
+def test_recent_interactions_are_kept(db):
+    db.log_interaction('instagram', 'story_view', '3')
+    age_interactions(db, 10)
+
+    assert prune_interactions(db, days=365, archive_dir=None) == 0
+
+
+def test_old_file_switches_auto_vacuum_in_maintenance_not_at_startup(tmp_path):
+    path = str(tmp_path / 'quotes.db')
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE legacy (id INTEGER PRIMARY KEY)")
+
+    db = QuoteDatabase(path)
+    try:
+        # A fresh connection: open ones keep the mode they read when they connected
+        auto_vacuum = lambda: sqlite3.connect(path).execute("PRAGMA auto_vacuum").fetchone()[0]
+        assert auto_vacuum() == 0
+        vacuum(db)
+        assert auto_vacuum() == 2
+        assert not db.pool.enable_incremental_vacuum()
+    finally:
+        db.close()
+
+
+def test_new_file_starts_incremental(db):
+    assert db.conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
@@ -0,0 +1,44 @@
+import pytest
+
+from image_generator import BACKGROUNDS, RenderContext, create_quote_image
+
+QUOTE = ('Дорогу осилит идущий, а сидящий дома так и останется сидеть.', 'Народная мудрость', 'мотивация')
+
+
+@pytest.fixture
+def context():
+    return RenderContext(width=540, height=540)
+
+
+def test_fonts_are_loaded_once_per_size(context):
+    for _ in range(3):
+        context.render(*QUOTE)
+
+    info = context.font.cache_info()
+    assert info.misses == 3  # quote, author and footer sizes
+    assert info.hits == 6
+
+
+@pytest.mark.parametrize('background', BACKGROUNDS)
+def test_templates_are_built_once_and_never_drawn_on(context, background):
+    first = context.render(*QUOTE, background=background)
+    template = context._templates[background]
+    blank = template.tobytes()
+
+    second = context.render(*QUOTE, background=background)
+
+    assert context._templates[background] is template
+    assert template.tobytes() == blank
+    assert first is not second and first.tobytes() == second.tobytes()
+    assert first.size == (540, 540)
+
+
+def test_unknown_background_is_rejected(context):
+    with pytest.raises(ValueError):
+        context.render(*QUOTE, background='plaid')
+
+
+def test_create_quote_image_saves_the_render(tmp_path):
+    path = str(tmp_path / 'quote.jpg')
+    assert create_quote_image(*QUOTE, output_path=path) == path
+    assert (tmp_path / 'quote.jpg').stat().st_size > 0
@@ -0,0 +1,78 @@
+import pytest
+
+from database import QuoteDatabase
+
+
+def sql_calls(db):
+    """Statements run on this thread's read connection and the writer"""
+    statements = []
+    for conn in (db.conn, db.pool._write_conn):
+        conn.set_trace_callback(statements.append)
+    return statements
+
+
+def test_unknown_interaction_is_answered_without_sql(db):
+    db.log_interaction('instagram', 'comment_reply', '1')
+    db.is_interaction_processed('instagram', 'comment_reply', '1')  # filter is warm
+
+    statements = sql_calls(db)
+    assert not any(db.is_interaction_processed('instagram', 'comment_reply', str(n))
+                   for n in range(2, 200))
+    assert db.is_interaction_processed('instagram', 'comment_reply', '1')
+    # Bloom false positives (~1%) may cost a lookup; true negatives never do
+    assert len(statements) <= 5
+
+
+def test_filter_is_rebuilt_from_the_table_after_restart(tmp_path):
+    path = str(tmp_path / 'quotes.db')
+    db = QuoteDatabase(path)
+    db.log_interaction('instagram', 'follow', '42')
+    db.close()
+
+    db = QuoteDatabase(path)
+    try:
+        assert db.is_interaction_processed('instagram', 'follow', '42')
+        assert not db.is_interaction_processed('instagram', 'follow', '43')
+    finally:
+        db.close()
+
+
+def test_batch_is_written_in_one_transaction_on_exit(db):
+    def stored():
+        return db.conn.execute("SELECT COUNT(*) FROM interactions").fetchone()[0]
+
+    with db.interaction_batch():
+        db.log_interaction('instagram', 'comment_reply', '1')
+        db.log_interaction('instagram', 'comment_reply', '1')
+        db.log_interaction('instagram', 'follow', '7')
+        assert stored() == 0
+        # Visible to the bot before the commit
+        assert db.is_interaction_processed('instagram', 'comment_reply', '1')
+    assert stored() == 2
+
+
+def test_batch_keeps_what_was_logged_before_an_error(db):
+    # The reply was already sent, so its record must survive the failure that follows
+    with pytest.raises(RuntimeError):
+        with db.interaction_batch():
+            db.log_interaction('instagram', 'comment_reply', '1')
+            raise RuntimeError('instagram went away')
+
+    assert db._pending_interactions is None
+    row = db.conn.execute("SELECT target_id FROM interactions").fetchone()
+    assert row['target_id'] == '1'
+
+
+def test_failed_batch_write_rolls_back_every_row(db):
+    with db.pool.writer() as conn:
+        conn.execute('''
+            CREATE TRIGGER reject_follow BEFORE INSERT ON interactions
+            WHEN new.interaction_type = 'follow' BEGIN SELECT RAISE(ABORT, 'rejected'); END
+        ''')
+
+    with pytest.raises(Exception, match='rejected'):
+        with db.interaction_batch():
+            db.log_interaction('instagram', 'comment_reply', '1')
+            db.log_interaction('instagram', 'follow', '7')
+
+    assert db.conn.execute("SELECT COUNT(*) FROM interactions").fetchone()[0] == 0
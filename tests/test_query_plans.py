@@ -0,0 +1,84 @@
+"""EXPLAIN QUERY PLAN checks for the statistics and posting hot paths"""
+import sqlite3
+from contextlib import contextmanager
+
+import pytest
+
+from database import QuoteDatabase
+from db_pool import get_pool
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = QuoteDatabase(str(tmp_path / 'quotes.db'))
+    for i in range(20):
+        db.add_quote(f'Цитата номер {i} о пути и цели', f'Автор {i}', 'motivation')
+    yield db
+    db.pool.close()
+
+
+@contextmanager
+def traced(*connections: sqlite3.Connection):
+    """Collect the statements with a SELECT run on connections (parameters expanded)"""
+    statements = []
+    for conn in connections:
+        conn.set_trace_callback(statements.append)
+    try:
+        yield statements
+    finally:
+        for conn in connections:
+            conn.set_trace_callback(None)
+    statements[:] = [sql for sql in statements if 'SELECT' in sql.upper()]
+
+
+def plan(conn: sqlite3.Connection, sql: str) -> str:
+    return '\n'.join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}"))
+
+
+def test_daily_stats_read_counters_by_primary_key(db):
+    with traced(db.conn) as statements:
+        db.get_daily_stats()
+    assert statements
+    for sql in statements:
+        details = plan(db.conn, sql)
+        assert 'SCAN' not in details, details
+        assert 'stats_counters USING PRIMARY KEY' in details
+
+
+def test_daily_stats_follow_posts(db):
+    db.get_next_quote()
+    stats = db.get_daily_stats()
+    assert stats == {'total': 20, 'available': 19, 'used_today': 1, 'manual_requests': 0}
+
+
+def test_next_quote_checks_day_index(db):
+    with traced(db.pool._write_conn) as statements:
+        assert db.get_next_quote()
+    checks = [sql for sql in statements if 'last_used_day <' in sql]
+    assert checks
+    for sql in checks:
+        assert 'USING COVERING INDEX idx_quotes_last_used_day' in plan(db.conn, sql)
+
+
+def test_used_counter_rebuild_uses_day_index(db):
+    with db.pool.writer() as conn, traced(conn) as statements:
+        db._rebuild_stats_counters(conn.cursor())
+    used = [sql for sql in statements if "'used'" in sql]
+    assert used
+    assert 'USING COVERING INDEX idx_quotes_last_used_day' in plan(db.conn, used[0])
+
+
+def test_unused_usage_index_is_dropped(tmp_path):
+    path = str(tmp_path / 'old.db')
+    db = QuoteDatabase(path)
+    with db.pool.writer() as conn:
+        conn.execute("CREATE INDEX idx_quotes_usage ON quotes(used_count, last_used_day)")
+    db.pool.close()
+
+    db = QuoteDatabase(path)
+    try:
+        assert not db.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_quotes_usage'"
+        ).fetchone()
+    finally:
+        get_pool(path).close()
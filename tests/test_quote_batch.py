@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from deepseek_generator import QUOTE_MAX_LENGTH, DeepSeekGenerator
+
+
+@pytest.fixture
+def gen():
+    return DeepSeekGenerator()
+
+
+def parse(gen, payload) -> list:
+    response = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False)
+    return gen._parse_quote_batch(response, 'успех', 'практичный')
+
+
+def test_valid_items_are_normalized(gen):
+    quotes = parse(gen, {'quotes': [
+        {'text': ' «Дорогу осилит идущий» ', 'author': 'Народ', 'category': 'путь', 'tags': ['путь', 1]},
+        {'text': 'Терпение и труд всё перетрут'},
+    ]})
+
+    assert [q['text'] for q in quotes] == ['Дорогу осилит идущий', 'Терпение и труд всё перетрут']
+    assert quotes[0]['tags'] == ['путь', '1']
+    assert quotes[1]['author'] == 'Генератор мудрости' and quotes[1]['category'] == 'успех'
+    assert all(q['source'] == 'ai' and q['style'] == 'практичный' for q in quotes)
+
+
+def test_malformed_and_duplicate_items_are_dropped(gen):
+    quotes = parse(gen, {'quotes': [
+        'просто строка',
+        {'author': 'Без текста'},
+        {'text': 42},
+        {'text': 'Коротко'},
+        {'text': 'Длинно ' * QUOTE_MAX_LENGTH},
+        {'text': 'Дорогу осилит идущий', 'tags': 'не список'},
+        {'text': '"ДОРОГУ ОСИЛИТ ИДУЩИЙ"'},
+    ]})
+
+    assert [(q['text'], q['tags']) for q in quotes] == [('Дорогу осилит идущий', [])]
+
+
+@pytest.mark.parametrize('response', [
+    'не JSON',
+    '{"quotes": "не список"}',
+    '{"items": []}',
+    '[{"text": "Массив вместо объекта"}]',
+    '"строка"',
+])
+def test_unusable_responses_give_no_quotes(gen, response):
+    assert parse(gen, response) == []
+
+
+def test_markdown_fence_is_stripped(gen):
+    response = '```json\n{"quotes": [{"text": "Дорогу осилит идущий"}]}\n```'
+    assert [q['text'] for q in parse(gen, response)] == ['Дорогу осилит идущий']
@@ -0,0 +1,43 @@
+import sqlite3
+
+from database import QuoteDatabase
+
+
+def test_cached_quotes_carry_used_count(tmp_path):
+    db = QuoteDatabase(str(tmp_path / 'quotes.db'), cache_corpus=True)
+    quote_id = db.add_quote('Дорогу осилит идущий', 'Народная мудрость', 'motivation')
+
+    assert db.get_quote(quote_id)['used_count'] == 0
+    posted = db.get_next_quote()
+    assert posted['id'] == quote_id
+    # Served from the cache, yet matches the DB after the post
+    assert db.get_random_quote_for_button()['used_count'] == 1
+    row = db.conn.execute("SELECT used_count FROM quotes WHERE id = ?", (quote_id,)).fetchone()
+    assert row['used_count'] == 1
+
+
+def test_caches_follow_writes_from_another_process(tmp_path):
+    path = str(tmp_path / 'quotes.db')
+    db = QuoteDatabase(path, cache_corpus=True)
+    db.pool.change_check_interval = 0
+    try:
+        first = db.add_quote('Дорогу осилит идущий', 'Народная мудрость', 'motivation')
+        assert db.get_category_catalog() == {'motivation': 1}
+
+        # quote_io run from the command line: its own connection to the file
+        other = sqlite3.connect(path)
+        with other:
+            other.execute("INSERT INTO quotes (text, author, category) VALUES ('Терпение и труд', 'Народ', 'wisdom')")
+        other.close()
+
+        assert db.get_category_catalog() == {'motivation': 1, 'wisdom': 1}
+        assert db.get_quote_by_category('wisdom')['text'] == 'Терпение и труд'
+        assert db.get_quote(first)['text'] == 'Дорогу осилит идущий'
+    finally:
+        db.close()
+
+
+def test_own_writes_do_not_reload_the_corpus(db):
+    db.pool.change_check_interval = 0
+    db.add_quote('Дорогу осилит идущий', 'Народная мудрость', 'motivation')
+    assert not db.pool.changed_elsewhere()
@@ -0,0 +1,50 @@
+import json
+
+from quote_io import export_quotes, import_quotes
+
+
+def write_jsonl(path, lines):
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    return str(path)
+
+
+def test_bad_rows_are_counted_not_raised(db, tmp_path):
+    path = write_jsonl(tmp_path / 'quotes.jsonl', [
+        json.dumps({'text': 'Дорогу осилит идущий', 'author': 'Народ', 'tags': 'путь, труд'}),
+        '{"text": "обрыв',                        # malformed JSON
+        '[1, 2, 3]',                              # not an object
+        json.dumps({'text': 5, 'author': 7, 'tags': 3}),
+        json.dumps({'author': 'Без текста'}),
+        json.dumps({'quote': 'Терпение и труд всё перетрут', 'category': 'труд'}),
+    ])
+
+    stats = import_quotes(db, path, workers=1, chunk_size=2)
+
+    assert stats == {'processed': 6, 'imported': 3, 'skipped': 0, 'invalid': 3}
+    texts = {row['text']: dict(row) for row in db.conn.execute("SELECT * FROM quotes")}
+    assert texts['5']['author'] == '7' and json.loads(texts['5']['tags']) == ['3']
+    assert json.loads(texts['Дорогу осилит идущий']['tags']) == ['путь', 'труд']
+
+
+def test_duplicates_are_skipped_within_the_file_and_against_the_db(db, tmp_path):
+    db.add_quote('Дорогу осилит идущий', 'Народ', 'motivation')
+    path = write_jsonl(tmp_path / 'quotes.jsonl', [
+        json.dumps({'text': 'Дорогу осилит идущий!'}),
+        json.dumps({'text': 'Терпение и труд всё перетрут'}),
+        json.dumps({'text': 'Терпение и труд всё перетрут.'}),
+    ])
+
+    stats = import_quotes(db, path, workers=1)
+
+    assert stats['imported'] == 1 and stats['skipped'] == 2
+
+
+def test_export_round_trips_through_csv(db, tmp_path):
+    db.add_quote('Дорогу осилит идущий', 'Народ', 'motivation', tags=['путь'])
+    path = str(tmp_path / 'quotes.csv')
+    assert export_quotes(db, path) == 1
+
+    db.delete_quote(1)
+    assert import_quotes(db, path, workers=1)['imported'] == 1
+    row = db.conn.execute("SELECT author, tags FROM quotes").fetchone()
+    assert row['author'] == 'Народ' and json.loads(row['tags']) == ['путь']
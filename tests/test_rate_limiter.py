@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+import rate_limiter
+from rate_limiter import (PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, PRIORITY_NORMAL,
+                          RateLimiter, TokenBucket)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Frozen monotonic clock for the buckets; advance with clock[0] += seconds"""
+    now = [1000.0]
+    monkeypatch.setattr(rate_limiter.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_bucket_refills_at_the_per_minute_rate(clock):
+    bucket = TokenBucket(60)
+    bucket.take(60)
+    assert bucket.wait_time(1) == pytest.approx(1.0)
+
+    clock[0] += 30
+    assert bucket.wait_time(30) == 0
+    assert bucket.wait_time(31) == pytest.approx(1.0)
+    # More than capacity waits for a full bucket, not forever
+    assert bucket.wait_time(500) == pytest.approx(30.0)
+
+
+def test_bucket_debt_and_refund(clock):
+    bucket = TokenBucket(60)
+    bucket.take(90)
+    assert bucket.wait_time(1) == pytest.approx(31.0)
+    bucket.put(1000)
+    assert bucket.level == 60
+
+
+def test_zero_rate_is_unlimited():
+    bucket = TokenBucket(0)
+    bucket.take(10 ** 9)
+    assert bucket.wait_time(10 ** 9) == 0
+
+
+def test_settle_corrects_the_token_estimate(clock):
+    limiter = RateLimiter(tokens_per_minute=1000)
+    limiter.tokens.take(500)
+    limiter.settle(reserved=500, used=200)
+    assert limiter.tokens.level == 800
+    limiter.settle(reserved=100, used=400)
+    assert limiter.tokens.level == 500
+
+
+def test_waiters_are_granted_by_priority_then_fifo():
+    async def scenario():
+        limiter = RateLimiter(max_concurrency=1)
+        await limiter.acquire(0)
+        order = []
+
+        async def call(name, priority):
+            await limiter.acquire(0, priority)
+            order.append(name)
+            limiter.release()
+
+        tasks = [asyncio.ensure_future(call(name, priority)) for name, priority in (
+            ('reply', PRIORITY_BACKGROUND), ('post', PRIORITY_NORMAL),
+            ('user 1', PRIORITY_INTERACTIVE), ('batch', PRIORITY_BACKGROUND),
+            ('user 2', PRIORITY_INTERACTIVE),
+        )]
+        await asyncio.sleep(0)
+        assert limiter.queued == 5
+        limiter.release()
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(scenario()) == ['user 1', 'user 2', 'post', 'reply', 'batch']
+
+
+def test_requests_per_minute_delays_the_next_call():
+    async def scenario():
+        limiter = RateLimiter(requests_per_minute=600)
+        limiter.requests.level = 0
+        waited = await limiter.acquire(0)
+        limiter.release()
+        return waited
+
+    assert 0.05 <= asyncio.run(scenario()) < 1
+
+
+def test_cancelled_waiter_does_not_block_the_queue():
+    async def scenario():
+        limiter = RateLimiter(max_concurrency=1)
+        await limiter.acquire(0)
+        stuck = asyncio.ensure_future(limiter.acquire(0, PRIORITY_INTERACTIVE))
+        behind = asyncio.ensure_future(limiter.acquire(0, PRIORITY_BACKGROUND))
+        await asyncio.sleep(0)
+        stuck.cancel()
+        await asyncio.sleep(0)
+        limiter.release()
+        await asyncio.wait_for(behind, 1)
+        return limiter.in_flight, limiter.queued
+
+    assert asyncio.run(scenario()) == (1, 0)
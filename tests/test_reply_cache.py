@@ -0,0 +1,73 @@
+import pytest
+
+import reply_cache
+from reply_cache import ReplyCache, normalize_comment
+
+
+@pytest.mark.parametrize('text, key', [
+    ('Класс!!! 🔥🔥', 'клас 🔥'),
+    ('класс 🔥', 'клас 🔥'),
+    ('Спасибо спасибо спасибо!', 'спасибо'),
+    ('👍🏽', '👍'),
+    ('❤️❤️❤️', '❤'),
+    ('Ёлки, ЁЛКИ', 'елки'),
+    ('  ...  ', ''),
+])
+def test_normalize_comment(text, key):
+    assert normalize_comment(text) == key
+
+
+@pytest.fixture
+def generated(monkeypatch):
+    """Replaces DeepSeek: records requests and answers with numbered replies"""
+    calls = []
+
+    def replies(text, context_type, count):
+        calls.append(text)
+        return [f'{text} #{n}' for n in range(count)]
+
+    monkeypatch.setattr(reply_cache.deepseek_gen, 'generate_interaction_replies', replies)
+    monkeypatch.setattr(reply_cache.deepseek_gen, 'generate_interaction_reply',
+                        lambda text, context_type: f'{text} (long)')
+    return calls
+
+
+def test_similar_comments_share_rotating_replies(db, generated):
+    cache = ReplyCache(db, replies_per_key=3)
+
+    answers = [cache.reply(text) for text in ('Класс!!!', 'класс', 'КЛАСС', 'класс!', 'клааасс')]
+
+    assert generated == ['Класс!!!']
+    # The generated batch is handed out least-used first before any repeats
+    assert answers[:3] == ['Класс!!! #0', 'Класс!!! #1', 'Класс!!! #2']
+    assert answers[3] == 'Класс!!! #0'
+    assert cache.stats()['hits'] == 4 and cache.stats()['misses'] == 1
+
+
+def test_long_comments_bypass_the_cache(db, generated):
+    cache = ReplyCache(db)
+    text = 'Очень подробный комментарий про то, как эта цитата изменила мой день'
+
+    assert cache.reply(text) == f'{text} (long)'
+    assert cache.stats()['bypassed'] == 1 and cache.stats()['keys'] == 0
+
+
+def test_expired_replies_are_regenerated(db, generated):
+    cache = ReplyCache(db, ttl_days=30)
+    cache.reply('спасибо')
+    with db.pool.writer() as conn:
+        conn.execute("UPDATE reply_cache SET created_at = datetime('now', '-31 days')")
+
+    assert cache.get('спасибо') is None
+    cache.reply('спасибо')
+    assert generated == ['спасибо', 'спасибо']
+    assert cache.stats()['replies'] == 3
+
+
+def test_least_recently_used_keys_are_evicted(db, generated):
+    cache = ReplyCache(db, replies_per_key=1, max_keys=2)
+    for text in ('раз', 'два', 'три'):
+        cache.reply(text)
+
+    keys = {row['key'] for row in db.conn.execute("SELECT key FROM reply_cache")}
+    assert keys == {'два', 'три'}
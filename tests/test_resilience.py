@@ -0,0 +1,86 @@
+import asyncio
+
+import httpx
+
+from resilience import CircuitBreaker
+from deepseek_generator import DeepSeekGenerator
+
+
+def open_breaker(gen: DeepSeekGenerator):
+    """Trip the breaker with a zero reset timeout, so the next call is a half-open probe"""
+    gen.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    gen.breaker.record_failure()
+    assert gen.breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_cancelled_half_open_probe_is_released():
+    gen = DeepSeekGenerator(deadline=5)
+    open_breaker(gen)
+    probe_started = asyncio.Event()
+
+    async def hanging_attempt(timeout: float) -> str:
+        probe_started.set()
+        await asyncio.sleep(60)
+        return 'never'
+
+    async def ok_attempt(timeout: float) -> str:
+        return 'ok'
+
+    async def scenario():
+        task = asyncio.ensure_future(gen._with_retries(hanging_attempt))
+        await probe_started.wait()
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        # The cancelled probe gave its slot back: the next call probes again
+        assert gen.breaker.allow()
+        gen.breaker.release()
+        return await gen._with_retries(ok_attempt)
+
+    assert asyncio.run(scenario()) == 'ok'
+    assert gen.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_breaker_opens_and_recovers():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.allow()          # half-open probe
+    assert not breaker.allow()      # only one at a time
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_zero_deadline_is_not_the_default():
+    gen = DeepSeekGenerator(deadline=5)
+    calls = []
+
+    async def attempt(timeout: float) -> str:
+        calls.append(timeout)
+        return 'ok'
+
+    # An explicit 0 leaves no time at all; only None means "use the default budget"
+    assert asyncio.run(gen._with_retries(attempt, deadline=0)) is None
+    assert calls == []
+    assert asyncio.run(gen._with_retries(attempt, deadline=None)) == 'ok'
+    assert gen.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_throttling_waits_retry_after_without_opening_the_breaker():
+    gen = DeepSeekGenerator(deadline=5)
+    gen.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    request = httpx.Request('POST', 'https://api.example/chat')
+    answers = [429, 429, None]
+
+    async def attempt(timeout: float) -> str:
+        status = answers.pop(0)
+        if status:
+            response = httpx.Response(status, headers={'Retry-After': '0'}, request=request)
+            raise httpx.HTTPStatusError('throttled', request=request, response=response)
+        return 'ok'
+
+    assert asyncio.run(gen._with_retries(attempt)) == 'ok'
+    assert gen.breaker.state == CircuitBreaker.CLOSED
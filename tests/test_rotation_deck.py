@@ -0,0 +1,61 @@
+import threading
+
+from database import QuoteDatabase
+
+
+def posted_ids(db, count):
+    return [db.get_next_quote()['id'] for _ in range(count)]
+
+
+def test_cycle_posts_every_quote_once(db, add_quotes):
+    ids = add_quotes(20)
+    posted = posted_ids(db, 20)
+    assert sorted(posted) == ids
+    # Everything was posted today: the caller falls back to AI
+    assert db.get_next_quote() is None
+
+
+def test_new_quotes_are_shuffled_into_the_deck(db, add_quotes):
+    # Added one by one after the deck was created, as on a fresh DB or an import
+    ids = add_quotes(40)
+    posted = posted_ids(db, 40)
+    assert posted != ids
+    assert sorted(posted) == ids
+
+
+def test_quote_added_mid_cycle_is_still_posted(db, add_quotes):
+    ids = add_quotes(10)
+    posted = posted_ids(db, 5)
+    ids += add_quotes(1)
+    posted += posted_ids(db, 6)
+    assert sorted(posted) == sorted(ids)
+
+
+def test_concurrent_claims_never_hand_out_the_same_quote(db, add_quotes):
+    ids = add_quotes(40)
+    handles = [QuoteDatabase(db.db_path) for _ in range(8)]
+    posted, lock = [], threading.Lock()
+
+    def worker(handle):
+        for _ in range(5):
+            quote = handle.get_next_quote()
+            with lock:
+                posted.append(quote['id'])
+
+    threads = [threading.Thread(target=worker, args=(handle,)) for handle in handles]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(posted) == ids
+
+
+def test_exhausted_deck_falls_back_to_a_least_used_quote(db, add_quotes, monkeypatch):
+    ids = add_quotes(5)
+    posted_ids(db, 5)
+    with db.pool.writer() as conn:
+        conn.execute("UPDATE quotes SET used_count = 3 WHERE id != ?", (ids[2],))
+    # AI is unavailable too
+    monkeypatch.setattr(db, 'generate_and_save_ai_quote', lambda: None)
+
+    assert all(db.get_next_quote_with_ai_fallback()['id'] == ids[2] for _ in range(5))
@@ -0,0 +1,47 @@
+import pytest
+
+from database import build_search_match
+
+
+def test_more_relevant_quotes_rank_first(db):
+    diluted = db.add_quote('Успех приходит к тем, кто много работает и не сдаётся', 'Автор', 'motivation')
+    dense = db.add_quote('Успех за успехом', 'Автор', 'motivation')
+
+    page = db.search_quotes_page('успех', page_size=10)
+
+    assert [quote['id'] for quote in page['results']] == [dense, diluted]
+
+
+def test_author_matches_outweigh_text_matches(db):
+    in_text = db.add_quote('Успех прекрасен', 'Автор', 'motivation')
+    in_author = db.add_quote('Жизнь прекрасна', 'Успех', 'motivation')
+
+    page = db.search_quotes_page('успех', page_size=10)
+
+    assert [quote['id'] for quote in page['results']] == [in_author, in_text]
+
+
+def test_field_limits_the_match(db):
+    by_author = db.add_quote('Мир принадлежит оптимистам', 'Толстой', 'wisdom')
+    db.add_quote('Толстой писал много', 'Чехов', 'wisdom')
+
+    page = db.search_quotes_page('Толстого', field='author')
+
+    assert [quote['id'] for quote in page['results']] == [by_author]
+    with pytest.raises(ValueError):
+        build_search_match('Толстой', field='category')
+
+
+def test_cursor_pages_cover_every_match_once(db, add_quotes):
+    add_quotes(12)
+    db.add_quote('Совсем другое', 'Кто-то', 'motivation')
+
+    first = db.search_quotes_page('цитата', page_size=5)
+    second = db.search_quotes_page('цитата', cursor=first['next_cursor'], page_size=5)
+    third = db.search_quotes_page('цитата', cursor=second['next_cursor'], page_size=5)
+
+    seen = [quote['id'] for page in (first, second, third) for quote in page['results']]
+    assert sorted(seen) == list(range(1, 13))
+    assert first['prev_cursor'] is None and third['next_cursor'] is None
+    back = db.search_quotes_page('цитата', cursor=second['prev_cursor'], page_size=5, backward=True)
+    assert back['results'] == first['results']
@@ -0,0 +1,59 @@
+import random
+
+from database import texts_similar
+from quote_similarity import lsh_keys
+
+BASE = [
+    'Дорогу осилит идущий, а сидящий дома так и останется сидеть',
+    'Успех — это способность идти от неудачи к неудаче, не теряя энтузиазма',
+    'Единственный способ делать великие дела — любить то, что вы делаете',
+    'Не бойтесь совершенства, вам его не достичь',
+    'Жизнь — это то, что с тобой происходит, пока ты строишь планы',
+    'The only way to do great work is to love what you do',
+    'Терпение и труд всё перетрут, если не сидеть сложа руки',
+    'Кто хочет — ищет возможности, кто не хочет — ищет причины',
+]
+
+
+def mutate(text: str, rng: random.Random) -> str:
+    """A small edit: a typo, a dropped word, changed punctuation or case"""
+    words = text.split()
+    kind = rng.randrange(4)
+    if kind == 0:
+        i = rng.randrange(len(text))
+        return text[:i] + rng.choice('абвгдеёжзaeiou') + text[i + 1:]
+    if kind == 1 and len(words) > 6:
+        del words[rng.randrange(len(words))]
+        return ' '.join(words)
+    if kind == 2:
+        return text.rstrip('.!') + rng.choice(['.', '!', '...'])
+    return text.upper() if rng.random() < 0.5 else text.lower()
+
+
+def test_near_duplicates_above_threshold_share_a_bucket():
+    rng = random.Random(7)
+    pairs = [(text, mutate(mutate(text, rng), rng)) for text in BASE for _ in range(100)]
+    similar = [(a, b) for a, b in pairs if texts_similar(a, b, 0.85)]
+    assert len(similar) > len(pairs) // 2
+
+    # Banding is probabilistic: short quotes with two edits can fall to Jaccard ~0.65
+    found = sum(bool(set(lsh_keys(a)) & set(lsh_keys(b))) for a, b in similar)
+    assert found / len(similar) >= 0.98
+
+
+def test_unrelated_quotes_rarely_collide():
+    collisions = sum(bool(set(lsh_keys(a)) & set(lsh_keys(b)))
+                     for i, a in enumerate(BASE) for b in BASE[i + 1:])
+    assert collisions == 0
+
+
+def test_database_check_matches_the_exact_comparison(db):
+    for text in BASE:
+        db.add_quote(text, 'Автор', 'wisdom')
+
+    rng = random.Random(11)
+    for text in BASE:
+        candidate = mutate(text, rng)
+        expected = any(texts_similar(candidate, stored, 0.85) for stored in BASE)
+        assert db.is_quote_similar(candidate) == expected
+    assert not db.is_quote_similar('Совершенно новая мысль о смысле бытия и утреннем кофе')
@@ -0,0 +1,104 @@
+import json
+import asyncio
+
+import httpx
+import pytest
+
+import deepseek_generator
+from deepseek_generator import DeepSeekGenerator, StreamInterrupted, _json_preview
+from resilience import CircuitBreaker
+
+
+def sse(*events) -> list:
+    """Server-sent event lines of chat.completion.chunk deltas (str) or raw dicts"""
+    lines = [': keep-alive', '']
+    for event in events:
+        if isinstance(event, str):
+            event = {'choices': [{'index': 0, 'delta': {'content': event}}]}
+        lines += [f'data: {json.dumps(event, ensure_ascii=False)}', '']
+    return lines
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """Generator whose HTTP client answers with the queued responses (lists of SSE lines or a status)"""
+    monkeypatch.setenv('DEEPSEEK_API_KEY', 'test')
+    monkeypatch.setattr(deepseek_generator, 'backoff_delay', lambda attempt: 0)
+    gen = DeepSeekGenerator(deadline=5)
+    gen.responses, gen.requests = [], []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        gen.requests.append(json.loads(request.content))
+        answer = gen.responses.pop(0)
+        if isinstance(answer, int):
+            return httpx.Response(answer)
+
+        async def body():
+            for line in answer:
+                if isinstance(line, Exception):
+                    raise line
+                yield (line + '\n').encode('utf-8')
+        return httpx.Response(200, content=body())
+
+    gen._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    yield gen
+    gen.close()
+
+
+def stream(gen) -> tuple:
+    """(deltas received, exception raised or None)"""
+    async def consume():
+        deltas = []
+        try:
+            async for delta in gen.astream_deepseek_api('prompt'):
+                deltas.append(delta)
+        except StreamInterrupted as e:
+            return deltas, e
+        return deltas, None
+    return asyncio.run(consume())
+
+
+def test_deltas_are_parsed_from_server_sent_events(api):
+    api.responses.append(sse(
+        {'choices': [{'index': 0, 'delta': {'role': 'assistant'}}]},
+        'Дорогу ', 'осилит ', 'идущий',
+        {'choices': [], 'usage': {'prompt_tokens': 20, 'completion_tokens': 5, 'total_tokens': 25}},
+    ) + ['data: [DONE]', ''])
+
+    deltas, error = stream(api)
+
+    assert deltas == ['Дорогу ', 'осилит ', 'идущий'] and error is None
+    assert api.requests[0]['stream'] is True
+    assert api.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_failure_before_the_first_delta_is_retried(api):
+    api.responses += [503, sse('Дорогу осилит идущий')]
+
+    deltas, error = stream(api)
+
+    assert deltas == ['Дорогу осилит идущий'] and error is None
+    assert len(api.requests) == 2
+
+
+def test_stream_broken_after_content_is_not_retried(api):
+    api.responses.append(sse('Дорогу ', 'осилит ') + [httpx.ReadError('connection reset')])
+
+    deltas, error = stream(api)
+
+    assert deltas == ['Дорогу ', 'осилит ']
+    assert isinstance(error, StreamInterrupted)
+    assert len(api.requests) == 1
+
+
+def test_stream_text_reports_progress_and_none_on_interruption(api):
+    api.responses.append(sse('{"quote": "Дорогу ', 'осилит", "task": "Иди') + [httpx.ReadError('reset')])
+    shown = []
+
+    async def on_text(text):
+        shown.append(text)
+
+    result = asyncio.run(api._astream_text('prompt', on_text, preview=_json_preview))
+
+    assert result is None
+    assert shown == ['Дорогу', 'Дорогу осилит\n\nИди']
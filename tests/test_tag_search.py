@@ -0,0 +1,60 @@
+import json
+
+from database import QuoteDatabase
+
+
+def test_tag_search_pages_through_every_match(tmp_path):
+    db = QuoteDatabase(str(tmp_path / 'quotes.db'))
+    ids = [db.add_quote(f'Цитата номер {n}', 'Автор', 'motivation', tags=['успех', 'труд'])
+           for n in range(7)]
+    db.add_quote('Без нужных тегов', 'Автор', 'motivation', tags=['успех'])
+
+    first = db.get_quotes_by_tags_page(['успех', 'труд'], page_size=5)
+    assert [q['id'] for q in first['results']] == ids[:1:-1]
+    assert first['prev_cursor'] is None and first['next_cursor']
+
+    second = db.get_quotes_by_tags_page(['успех', 'труд'], cursor=first['next_cursor'], page_size=5)
+    assert [q['id'] for q in second['results']] == ids[1::-1]
+    assert second['next_cursor'] is None
+
+    back = db.get_quotes_by_tags_page(['успех', 'труд'], cursor=second['prev_cursor'], page_size=5,
+                                      backward=True)
+    assert back['results'] == first['results']
+
+
+def test_tag_search_needs_every_tag(db):
+    both = db.add_quote('Оба тега', 'Автор', 'motivation', tags=['#Успех', 'труд'])
+    db.add_quote('Только успех', 'Автор', 'motivation', tags=['успех'])
+    db.add_quote('Только труд', 'Автор', 'motivation', tags=['труд'])
+
+    assert [q['id'] for q in db.get_quotes_by_tags(['успех', 'ТРУД'])] == [both]
+    assert len(db.get_quotes_by_tag('успех')) == 2
+    assert db.get_quotes_by_tags(['успех', 'лень']) == []
+
+
+def test_retagging_updates_the_index(db):
+    quote_id = db.add_quote('Цитата', 'Автор', 'motivation', tags=['успех'])
+    with db.pool.writer() as conn:
+        conn.execute("UPDATE quotes SET tags = ? WHERE id = ?", ('["труд"]', quote_id))
+
+    assert db.get_quotes_by_tag('успех') == []
+    assert [q['id'] for q in db.get_quotes_by_tag('труд')] == [quote_id]
+
+
+def test_untagged_index_is_backfilled_on_startup(tmp_path):
+    path = str(tmp_path / 'quotes.db')
+    db = QuoteDatabase(path)
+    quote_id = db.add_quote('Цитата', 'Автор', 'motivation')
+    # A database from before quote_tags: raw tags, empty index
+    with db.pool.writer() as conn:
+        conn.execute("DROP TRIGGER quotes_tags_au")
+        conn.execute("UPDATE quotes SET tags = ? WHERE id = ?", ('["#Успех", "Труд"]', quote_id))
+        conn.execute("DELETE FROM quote_tags")
+    db.close()
+
+    db = QuoteDatabase(path)
+    try:
+        assert [q['id'] for q in db.get_quotes_by_tags(['успех', 'труд'])] == [quote_id]
+        assert json.loads(db.get_quote(quote_id)['tags']) == ['успех', 'труд']
+    finally:
+        db.close()
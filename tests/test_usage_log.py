@@ -0,0 +1,18 @@
+from database import QuoteDatabase
+from usage_log import UsageRecorder
+
+
+def test_manual_requests_are_buffered_until_flush(tmp_path):
+    db = QuoteDatabase(str(tmp_path / 'quotes.db'))
+    recorder = UsageRecorder(db, flush_interval=3600)
+    try:
+        for _ in range(3):
+            recorder.record_manual_request()
+        assert db.get_daily_stats()['manual_requests'] == 0
+
+        recorder.flush()
+        assert db.get_daily_stats()['manual_requests'] == 3
+        db.record_manual_request()
+        assert db.get_daily_stats()['manual_requests'] == 4
+    finally:
+        recorder.close()
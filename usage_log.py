@@ -0,0 +1,86 @@
+"""
+Buffered, append-only usage event log (usage_stats).
+
+Handlers call UsageRecorder.record(), which only appends to an in-memory
+buffer, and record_manual_request(), which bumps an in-memory per-day
+count. A background thread writes the buffer with one executemany when it
+reaches max_batch events or every flush_interval seconds, together with
+the counts; close() flushes whatever is left. Analytics read the hourly/daily rollups built by
+QuoteDatabase.rollup_usage, never the raw events.
+"""
+import time
+import logging
+import threading
+from typing import Dict, List, Tuple
+
+from database import QuoteDatabase
+
+logger = logging.getLogger(__name__)
+
+
+class UsageRecorder:
+    """Collects (quote_id, context) events and flushes them in batches"""
+
+    def __init__(self, db: QuoteDatabase, max_batch: int = 500, flush_interval: float = 5.0):
+        self.db = db
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+
+        self._buffer: List[Tuple[int, str, str]] = []
+        # day -> user quote requests not yet added to stats_counters
+        self._manual_requests: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name='usage-log-flush', daemon=True)
+        self._thread.start()
+
+    def record(self, quote_id: int, context: str):
+        """Queue one usage event (never touches the database)"""
+        used_at = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())
+        with self._lock:
+            self._buffer.append((quote_id, used_at, context))
+            full = len(self._buffer) >= self.max_batch
+        if full:
+            self._wakeup.set()
+
+    def record_manual_request(self):
+        """Count one user quote request for today's stats (never touches the database)"""
+        day = time.strftime('%Y-%m-%d', time.gmtime())
+        with self._lock:
+            self._manual_requests[day] = self._manual_requests.get(day, 0) + 1
+
+    def flush(self) -> int:
+        """Write buffered events and request counts now; returns how many events were written"""
+        with self._lock:
+            events, self._buffer = self._buffer, []
+            manual_requests, self._manual_requests = self._manual_requests, {}
+        if not events and not manual_requests:
+            return 0
+        try:
+            with self.db.pool.writer():
+                if events:
+                    self.db.log_usage_events(events)
+                if manual_requests:
+                    self.db.record_manual_requests(manual_requests)
+        except Exception as e:
+            logger.error(f"Usage log flush failed, keeping {len(events)} events: {e}")
+            with self._lock:
+                self._buffer[:0] = events
+                for day, count in manual_requests.items():
+                    self._manual_requests[day] = self._manual_requests.get(day, 0) + count
+            return 0
+        return len(events)
+
+    def _run(self):
+        while not self._stopped:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def close(self):
+        """Stop the flush thread and write the remaining events"""
+        self._stopped = True
+        self._wakeup.set()
+        self._thread.join()
+        self.flush()